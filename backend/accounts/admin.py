@@ -1,3 +1,11 @@
 from django.contrib import admin
 
+from .models import ApiToken
+
 # Registra tus modelos aquí.
+
+
+@admin.register(ApiToken)
+class ApiTokenAdmin(admin.ModelAdmin):
+    list_display = ('prefijo', 'user', 'nombre', 'created_at', 'last_used_at', 'revocado_en')
+    readonly_fields = ('prefijo', 'clave_hash', 'created_at', 'last_used_at')
@@ -1,4 +1,8 @@
-from rest_framework.authentication import SessionAuthentication
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, SessionAuthentication, get_authorization_header
+
+from one_backend.metricas import medir
+from .tokens import usuario_de_token
 
 class CsrfExemptSessionAuthentication(SessionAuthentication):
     """
@@ -11,3 +15,33 @@ class CsrfExemptSessionAuthentication(SessionAuthentication):
 
     def enforce_csrf(self, request):
         return  # Omitir verificación CSRF completamente
+
+
+class ApiTokenAuthentication(BaseAuthentication):
+    """
+    Autorización: `Authorization: Token one_...` (también acepta `Bearer`).
+    La búsqueda del token pasa por caché (ver accounts/tokens.py), así que
+    una petición autenticada normalmente no toca la base de datos.
+    """
+    palabras = (b'token', b'bearer')
+
+    def authenticate(self, request):
+        partes = get_authorization_header(request).split()
+        if not partes or partes[0].lower() not in self.palabras:
+            return None
+        if len(partes) != 2:
+            raise exceptions.AuthenticationFailed('Encabezado de token inválido')
+
+        try:
+            clave = partes[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed('Encabezado de token inválido')
+
+        with medir('auth'):
+            user = usuario_de_token(clave)
+        if user is None:
+            raise exceptions.AuthenticationFailed('Token inválido o revocado')
+        return user, clave
+
+    def authenticate_header(self, request):
+        return 'Token'
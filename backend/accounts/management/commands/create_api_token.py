@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import User
+from accounts.tokens import crear
+
+
+class Command(BaseCommand):
+    help = 'Crea un token de API para un usuario (para integraciones y workers)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('--nombre', default='', help='Para reconocer el token después')
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options['username']).first()
+        if user is None:
+            raise CommandError(f"No existe el usuario {options['username']}")
+        token, clave = crear(user, options['nombre'])
+        # La clave solo se puede ver ahora
+        self.stdout.write(clave)
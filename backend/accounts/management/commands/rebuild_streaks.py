@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from accounts.models import User
+from accounts.streaks import reconstruir_usuario
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye desde cero las rachas de tareas y hábitos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('usuarios', nargs='*', help='Usernames a reconstruir (por defecto, todos)')
+
+    def handle(self, *args, **options):
+        usuarios = User.objects.order_by('pk')
+        if options['usuarios']:
+            usuarios = usuarios.filter(username__in=options['usuarios'])
+
+        total = 0
+        for user in usuarios.iterator():
+            reconstruir_usuario(user)
+            total += 1
+        self.stdout.write(self.style.SUCCESS(f'Rachas reconstruidas para {total} usuario(s)'))
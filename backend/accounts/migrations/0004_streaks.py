@@ -0,0 +1,42 @@
+# Generated by Django 4.2.30 on 2026-10-18 20:01
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_user_nombre_user_preferences_alter_user_groups_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StreakDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=60)),
+                ('fecha', models.DateField()),
+                ('total', models.IntegerField(default=0)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='streak_days', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StreakRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=60)),
+                ('inicio', models.DateField()),
+                ('fin', models.DateField()),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='streak_runs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['owner', 'fin'], name='streak_run_owner_fin_idx'), models.Index(fields=['owner', 'clave', 'inicio'], name='streak_run_clave_inicio_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='streakday',
+            constraint=models.UniqueConstraint(fields=('owner', 'clave', 'fecha'), name='unique_streak_day'),
+        ),
+    ]
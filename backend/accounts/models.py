@@ -10,3 +10,56 @@ class User(AbstractUser):
     
     def __str__(self):
         return self.username
+
+
+class StreakDay(models.Model):
+    """
+    Cuántos registros cuentan para la racha en un día.
+    clave: 'tasks' (tareas hechas), 'habits' (cualquier hábito) o 'habit:<id>'.
+    Solo guardamos los días con total > 0.
+    """
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='streak_days')
+    clave = models.CharField(max_length=60)
+    fecha = models.DateField()
+    total = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'clave', 'fecha'], name='unique_streak_day'),
+        ]
+
+
+class StreakRun(models.Model):
+    """
+    Tramo de días consecutivos activos (inicio..fin, inclusivo).
+    La racha actual es el tramo que llega a hoy o a ayer, así que leerla es
+    una sola consulta sin recorrer el historial.
+    """
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='streak_runs')
+    clave = models.CharField(max_length=60)
+    inicio = models.DateField()
+    fin = models.DateField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['owner', 'fin'], name='streak_run_owner_fin_idx'),
+            models.Index(fields=['owner', 'clave', 'inicio'], name='streak_run_clave_inicio_idx'),
+        ]
+
+
+class ApiToken(models.Model):
+    """
+    Token para integraciones y workers de sincronización.
+    Solo guardamos el SHA-256 de la clave: el token completo se muestra una
+    vez al crearlo. El prefijo sirve para reconocerlo en la lista.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='api_tokens')
+    nombre = models.CharField(max_length=100, blank=True)
+    prefijo = models.CharField(max_length=12)
+    clave_hash = models.CharField(max_length=64, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(null=True, blank=True)
+    revocado_en = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.user} - {self.nombre or self.prefijo}"
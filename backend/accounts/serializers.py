@@ -1,7 +1,8 @@
 from rest_framework import serializers
-from .models import User
+from one_backend.metricas import MedirSerializerMixin
+from .models import ApiToken, User
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(MedirSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'nombre', 'email', 'streak', 'energy_level', 'preferences', 'password']
@@ -13,3 +14,10 @@ class UserSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         user = User.objects.create_user(**validated_data)
         return user
+
+
+class ApiTokenSerializer(MedirSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = ApiToken
+        fields = ['id', 'nombre', 'prefijo', 'created_at', 'last_used_at', 'revocado_en']
+        read_only_fields = ['prefijo', 'created_at', 'last_used_at', 'revocado_en']
@@ -0,0 +1,72 @@
+from collections import Counter
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.dateparse import parse_date
+
+from habits.models import Habit
+from tasks.models import Task
+from . import streaks, tokens
+from .models import User
+
+
+def _borrando_cuenta(origin):
+    # Al borrar la cuenta completa las rachas se van en cascada
+    return isinstance(origin, User) or getattr(origin, 'model', None) is User
+
+
+def _estado_tarea(tarea):
+    fecha = parse_date(tarea.date) if isinstance(tarea.date, str) else tarea.date
+    return fecha, tarea.status == 'done' and not tarea.deleted
+
+
+@receiver(post_save, sender=Task)
+def racha_tarea_guardada(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    cambios = Counter()
+    original = getattr(instance, '_racha_original', None)
+    if original and original[1]:
+        cambios[original[0]] -= 1
+    fecha, activa = _estado_tarea(instance)
+    if activa:
+        cambios[fecha] += 1
+    streaks.aplicar(instance.owner_id, streaks.TAREAS, cambios)
+    instance._racha_original = (fecha, activa)
+
+
+@receiver(post_delete, sender=Task)
+def racha_tarea_borrada(sender, instance, origin=None, **kwargs):
+    if _borrando_cuenta(origin):
+        return
+    fecha, activa = getattr(instance, '_racha_original', None) or _estado_tarea(instance)
+    if activa:
+        streaks.aplicar(instance.owner_id, streaks.TAREAS, {fecha: -1})
+
+
+@receiver(post_delete, sender=Habit)
+def racha_habito_borrado(sender, instance, origin=None, **kwargs):
+    if _borrando_cuenta(origin):
+        return
+    _olvidar_habito(instance)
+
+
+@receiver(post_save, sender=Habit)
+def racha_habito_guardado(sender, instance, update_fields=None, raw=False, **kwargs):
+    # Borrado lógico: sus registros se quedan, pero ya no cuentan para la racha
+    if not raw and instance.deleted and update_fields and 'deleted' in update_fields:
+        _olvidar_habito(instance)
+
+
+def _olvidar_habito(habit):
+    streaks.olvidar(habit.owner_id, streaks.clave_habito(habit.pk))
+    streaks.reconstruir(habit.owner_id, streaks.HABITOS)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def olvidar_usuario_de_tokens(sender, instance, update_fields=None, **kwargs):
+    # Iniciar sesión solo cambia last_login, no hace falta volver a leerlo
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    tokens.olvidar_usuario(instance.pk)
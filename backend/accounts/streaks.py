@@ -0,0 +1,194 @@
+"""
+Rachas mantenidas de forma incremental.
+
+Antes habitos.js y dashboard.js recorrían el historial día por día hacia atrás.
+Ahora cada escritura de una tarea o de un registro de hábito ajusta el conteo
+del día (StreakDay) y, si el día pasa de inactivo a activo o al revés, une o
+parte los tramos de días consecutivos (StreakRun). Leer la racha actual es
+una sola consulta.
+"""
+import datetime
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import StreakDay, StreakRun
+
+TAREAS = 'tasks'
+HABITOS = 'habits'
+
+# Si un cambio toca más días que esto, sale más barato reconstruir la clave completa
+MAX_DIAS_INCREMENTAL = 31
+
+UN_DIA = datetime.timedelta(days=1)
+
+
+def clave_habito(habit_id):
+    return f'habit:{habit_id}'
+
+
+def aplicar(owner_id, clave, cambios):
+    """Suma los deltas por fecha ({fecha: +1/-1}) al conteo de la clave."""
+    cambios = {fecha: delta for fecha, delta in cambios.items() if delta}
+    if not cambios:
+        return
+    if len(cambios) > MAX_DIAS_INCREMENTAL:
+        reconstruir(owner_id, clave)
+        return
+
+    # Sin savepoint propio: corre dentro de la transacción de la escritura que lo dispara
+    with transaction.atomic(savepoint=False):
+        dias = {
+            dia.fecha: dia
+            for dia in StreakDay.objects.select_for_update().filter(owner_id=owner_id, clave=clave, fecha__in=cambios)
+        }
+        for fecha, delta in sorted(cambios.items()):
+            dia = dias.get(fecha)
+            antes = dia.total if dia else 0
+            despues = max(antes + delta, 0)
+
+            if dia is None:
+                if despues:
+                    StreakDay.objects.create(owner_id=owner_id, clave=clave, fecha=fecha, total=despues)
+            elif despues:
+                dia.total = despues
+                dia.save(update_fields=['total'])
+            else:
+                dia.delete()
+
+            if not antes and despues:
+                _activar(owner_id, clave, fecha)
+            elif antes and not despues:
+                _desactivar(owner_id, clave, fecha)
+
+
+def _tramos_cerca(owner_id, clave, fecha):
+    """
+    Tramos que tocan [fecha - 1, fecha + 1], bloqueados hasta que termine la
+    transacción: dos escrituras de días vecinos no pueden unir o partir el
+    mismo tramo a la vez.
+    """
+    return StreakRun.objects.select_for_update().filter(
+        owner_id=owner_id, clave=clave, inicio__lte=fecha + UN_DIA, fin__gte=fecha - UN_DIA
+    )
+
+
+def _activar(owner_id, clave, fecha):
+    # Los tramos vecinos (el que termina ayer y el que empieza mañana) en una sola consulta
+    anterior = siguiente = None
+    for tramo in _tramos_cerca(owner_id, clave, fecha):
+        if tramo.fin == fecha - UN_DIA:
+            anterior = tramo
+        elif tramo.inicio == fecha + UN_DIA:
+            siguiente = tramo
+
+    if anterior and siguiente:
+        anterior.fin = siguiente.fin
+        anterior.save(update_fields=['fin'])
+        siguiente.delete()
+    elif anterior:
+        anterior.fin = fecha
+        anterior.save(update_fields=['fin'])
+    elif siguiente:
+        siguiente.inicio = fecha
+        siguiente.save(update_fields=['inicio'])
+    else:
+        StreakRun.objects.create(owner_id=owner_id, clave=clave, inicio=fecha, fin=fecha)
+
+
+def _desactivar(owner_id, clave, fecha):
+    tramo = next((t for t in _tramos_cerca(owner_id, clave, fecha) if t.inicio <= fecha <= t.fin), None)
+    if tramo is None:
+        return
+
+    if tramo.inicio == tramo.fin:
+        tramo.delete()
+    elif fecha == tramo.inicio:
+        tramo.inicio = fecha + UN_DIA
+        tramo.save(update_fields=['inicio'])
+    elif fecha == tramo.fin:
+        tramo.fin = fecha - UN_DIA
+        tramo.save(update_fields=['fin'])
+    else:
+        # El día borrado parte el tramo en dos
+        StreakRun.objects.create(owner_id=owner_id, clave=clave, inicio=fecha + UN_DIA, fin=tramo.fin)
+        tramo.fin = fecha - UN_DIA
+        tramo.save(update_fields=['fin'])
+
+
+def conteos_desde_cero(owner_id, clave):
+    """Conteo por fecha calculado directamente de las tablas de origen."""
+    from tasks.models import Task
+    from habits.models import HabitLog
+
+    if clave == TAREAS:
+        filas = Task.objects.filter(owner_id=owner_id, status='done', deleted=False)
+        filas = filas.values('date').annotate(total=Count('pk')).values_list('date', 'total')
+    elif clave == HABITOS:
+        filas = HabitLog.objects.filter(habit__owner_id=owner_id, habit__deleted=False, done=True)
+        filas = filas.values('date').annotate(total=Count('pk')).values_list('date', 'total')
+    else:
+        habit_id = clave.split(':', 1)[1]
+        filas = HabitLog.objects.filter(habit_id=habit_id, habit__deleted=False, done=True)
+        filas = filas.values('date').annotate(total=Count('pk')).values_list('date', 'total')
+    return Counter(dict(filas))
+
+
+def reconstruir(owner_id, clave):
+    conteos = conteos_desde_cero(owner_id, clave)
+
+    tramos = []
+    for fecha in sorted(conteos):
+        if tramos and tramos[-1].fin == fecha - UN_DIA:
+            tramos[-1].fin = fecha
+        else:
+            tramos.append(StreakRun(owner_id=owner_id, clave=clave, inicio=fecha, fin=fecha))
+
+    with transaction.atomic():
+        StreakDay.objects.filter(owner_id=owner_id, clave=clave).delete()
+        StreakRun.objects.filter(owner_id=owner_id, clave=clave).delete()
+        StreakDay.objects.bulk_create([
+            StreakDay(owner_id=owner_id, clave=clave, fecha=fecha, total=total)
+            for fecha, total in conteos.items()
+        ])
+        StreakRun.objects.bulk_create(tramos)
+
+
+def reconstruir_usuario(user):
+    from habits.models import Habit
+
+    StreakDay.objects.filter(owner=user).delete()
+    StreakRun.objects.filter(owner=user).delete()
+    reconstruir(user.pk, TAREAS)
+    reconstruir(user.pk, HABITOS)
+    for habit_id in Habit.objects.filter(owner=user, deleted=False).values_list('pk', flat=True):
+        reconstruir(user.pk, clave_habito(habit_id))
+
+
+def olvidar(owner_id, clave):
+    StreakDay.objects.filter(owner_id=owner_id, clave=clave).delete()
+    StreakRun.objects.filter(owner_id=owner_id, clave=clave).delete()
+
+
+def tramos_vigentes(user, hoy):
+    # Una racha sigue viva si su tramo llega a hoy o a ayer (hoy todavía no
+    # termina, igual que en el dashboard)
+    return StreakRun.objects.filter(owner=user, fin__gte=hoy - UN_DIA, inicio__lte=hoy)
+
+
+def _contar(tramos, hoy):
+    return {tramo.clave: (min(tramo.fin, hoy) - tramo.inicio).days + 1 for tramo in tramos}
+
+
+def rachas_actuales(user, hoy=None):
+    """Rachas vigentes por clave: {'tasks': 5, 'habits': 2, 'habit:<id>': 2}."""
+    hoy = hoy or timezone.localdate()
+    return _contar(tramos_vigentes(user, hoy), hoy)
+
+
+async def arachas_actuales(user, hoy=None):
+    """Igual que rachas_actuales, con el ORM async (vistas ASGI)."""
+    hoy = hoy or timezone.localdate()
+    return _contar([tramo async for tramo in tramos_vigentes(user, hoy)], hoy)
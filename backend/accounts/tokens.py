@@ -0,0 +1,148 @@
+"""
+Tokens de API con búsqueda en caché.
+
+BasicAuthentication corría el hash PBKDF2 de la contraseña en cada petición.
+Los tokens son aleatorios y largos, así que basta con SHA-256 para guardarlos
+y compararlos. Además la búsqueda token -> usuario pasa por dos cachés:
+
+1. Un diccionario en el proceso (TTL corto, API_TOKEN_LOCAL_TTL).
+2. La caché de Django (API_TOKEN_CACHE_TTL).
+
+Solo si ninguna lo tiene se consulta la base de datos. Revocar un token lo
+borra de la caché de Django y de la copia de este proceso. Con una caché
+compartida (Redis o archivos) los demás procesos lo dejan de aceptar en
+cuanto vence su copia local, a lo más API_TOKEN_LOCAL_TTL. Con la caché en
+memoria cada proceso tiene la suya y no se entera del borrado, así que ahí
+la segunda caché dura lo mismo que la primera: el límite sigue siendo
+API_TOKEN_LOCAL_TTL.
+"""
+import copy
+import hashlib
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import ApiToken, User
+
+PREFIJO = 'one_'
+MAX_LOCALES = 1024
+
+_locales = OrderedDict()
+_candado = threading.Lock()
+
+
+def _ttl_cache():
+    ttl = getattr(settings, 'API_TOKEN_CACHE_TTL', 300)
+    if not getattr(settings, 'CACHE_COMPARTIDA', False):
+        # Una revocación en otro proceso no borraría esta copia
+        return min(ttl, _ttl_local())
+    return ttl
+
+
+def _ttl_local():
+    return getattr(settings, 'API_TOKEN_LOCAL_TTL', 30)
+
+
+def hash_de(clave):
+    return hashlib.sha256(clave.encode()).hexdigest()
+
+
+def clave_cache(digest):
+    return f'token:{digest}'
+
+
+def clave_usuario(user_id):
+    return f'token:user:{user_id}'
+
+
+def crear(user, nombre=''):
+    """Crea un token y regresa (ApiToken, clave en claro). La clave no se vuelve a mostrar."""
+    clave = PREFIJO + secrets.token_urlsafe(32)
+    token = ApiToken.objects.create(
+        user=user, nombre=nombre, prefijo=clave[:len(PREFIJO) + 8], clave_hash=hash_de(clave)
+    )
+    return token, clave
+
+
+def _leer_local(digest):
+    with _candado:
+        entrada = _locales.get(digest)
+        if entrada is None:
+            return None
+        user, vence = entrada
+        if vence < time.monotonic():
+            del _locales[digest]
+            return None
+        _locales.move_to_end(digest)
+        return user
+
+
+def _guardar_local(digest, user):
+    with _candado:
+        _locales[digest] = (user, time.monotonic() + _ttl_local())
+        _locales.move_to_end(digest)
+        while len(_locales) > MAX_LOCALES:
+            _locales.popitem(last=False)
+
+
+def _olvidar_local(condicion):
+    with _candado:
+        for digest in [d for d, (user, _) in _locales.items() if condicion(d, user)]:
+            del _locales[digest]
+
+
+def usuario_de_token(clave):
+    """Usuario activo dueño del token, o None si no existe o está revocado."""
+    digest = hash_de(clave)
+
+    user = _leer_local(digest)
+    if user is None:
+        user_id = cache.get(clave_cache(digest))
+        if user_id is not None:
+            user = cache.get(clave_usuario(user_id))
+        if user is None:
+            user = _buscar(digest)
+            if user is None:
+                return None
+        _guardar_local(digest, user)
+
+    # Cada petición recibe su propia copia: las vistas pueden modificar request.user
+    return copy.copy(user) if user.is_active else None
+
+
+def _buscar(digest):
+    token = (
+        ApiToken.objects.select_related('user')
+        .filter(clave_hash=digest, revocado_en__isnull=True)
+        .first()
+    )
+    if token is None:
+        return None
+    # last_used_at solo se actualiza cuando la caché se vence, no en cada petición
+    ApiToken.objects.filter(pk=token.pk).update(last_used_at=timezone.now())
+    cache.set(clave_cache(digest), token.user_id, _ttl_cache())
+    cache.set(clave_usuario(token.user_id), token.user, _ttl_cache())
+    return token.user
+
+
+def revocar(token):
+    token.revocado_en = timezone.now()
+    token.save(update_fields=['revocado_en'])
+    cache.delete(clave_cache(token.clave_hash))
+    _olvidar_local(lambda digest, user: digest == token.clave_hash)
+
+
+def olvidar_usuario(user_id):
+    """El usuario cambió (o se borró): sus tokens vuelven a leerlo de la base."""
+    cache.delete(clave_usuario(user_id))
+    _olvidar_local(lambda digest, user: user.pk == user_id)
+
+
+def limpiar_locales():
+    with _candado:
+        _locales.clear()
@@ -1,14 +1,17 @@
-from rest_framework import status, views, viewsets, permissions
+from rest_framework import mixins, status, views, viewsets, permissions
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from .serializers import UserSerializer
+from .serializers import ApiTokenSerializer, UserSerializer
 from django.contrib.auth import authenticate, login
-from .models import User
+from .models import ApiToken, User
+from . import tokens
+from .streaks import HABITOS, TAREAS, rachas_actuales
 
 class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [AllowAny] # Simplificado para la demostración
+    cursor_ordering = ('id',) # User no tiene updated_at
 
     def get_queryset(self):
         # Opcional: filtrar por usuario actual si fuera producción
@@ -59,11 +62,56 @@ class UserMeView(views.APIView):
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+
+def datos_racha(user, rachas):
+    habitos = {
+        clave.split(':', 1)[1]: dias
+        for clave, dias in rachas.items()
+        if clave.startswith('habit:')
+    }
+    return {
+        "streak": rachas.get(TAREAS, 0),
+        "energy": user.energy_level,
+        "habitosStreak": rachas.get(HABITOS, 0),
+        "habitos": habitos,
+    }
+
+
+# Respuesta para quien no ha iniciado sesión
+RACHA_VACIA = {"streak": 0, "energy": 100, "habitosStreak": 0, "habitos": {}}
+
+
 class StreakView(views.APIView):
     # Solo para usuarios que han iniciado sesión
     def get(self, request):
         # Si no está logueado, podríamos devolver error aquí
-        return Response({
-            "streak": request.user.streak if request.user.is_authenticated else 0,
-            "energy": request.user.energy_level if request.user.is_authenticated else 100
-        })
+        if not request.user.is_authenticated:
+            return Response(RACHA_VACIA)
+
+        # Las rachas se mantienen al escribir (ver accounts/streaks.py); aquí solo se leen
+        return Response(datos_racha(request.user, rachas_actuales(request.user)))
+
+
+class ApiTokenViewSet(mixins.ListModelMixin, mixins.CreateModelMixin,
+                      mixins.DestroyModelMixin, viewsets.GenericViewSet):
+    """
+    Tokens de API del usuario: listar, crear (la clave solo se muestra en la
+    respuesta de creación) y revocar con DELETE.
+    """
+    serializer_class = ApiTokenSerializer
+    permission_classes = [IsAuthenticated]
+    cursor_ordering = ('-created_at', 'id')
+
+    def get_queryset(self):
+        return ApiToken.objects.filter(user=self.request.user, revocado_en__isnull=True)
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        token, clave = tokens.crear(request.user, serializer.validated_data.get('nombre', ''))
+        data = ApiTokenSerializer(token).data
+        data['token'] = clave
+        return Response(data, status=status.HTTP_201_CREATED)
+
+    def perform_destroy(self, instance):
+        tokens.revocar(instance)
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Gasto, Presupuesto
+from .models import Gasto, Presupuesto, ResumenMensual
 
 admin.site.register(Gasto)
 admin.site.register(Presupuesto)
+admin.site.register(ResumenMensual)
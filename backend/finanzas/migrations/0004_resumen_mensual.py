@@ -0,0 +1,54 @@
+# Generated by Django 4.2.30 on 2026-10-18 20:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+
+def llenar_resumenes(apps, schema_editor):
+    # Los gastos que ya existen entran al resumen de una sola vez
+    Gasto = apps.get_model('finanzas', 'Gasto')
+    ResumenMensual = apps.get_model('finanzas', 'ResumenMensual')
+    filas = (
+        Gasto.objects.filter(deleted=False)
+        .annotate(anio=ExtractYear('fecha'), mes=ExtractMonth('fecha'))
+        .values('owner_id', 'space_id', 'anio', 'mes', 'categoria')
+        .annotate(total=Sum('monto'), cantidad=Count('pk'))
+        .order_by()
+    )
+    ResumenMensual.objects.bulk_create([ResumenMensual(**fila) for fila in filas], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('spaces', '0004_unique_owner_name'),
+        ('finanzas', '0003_date_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenMensual',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('anio', models.IntegerField()),
+                ('mes', models.IntegerField()),
+                ('categoria', models.CharField(blank=True, max_length=60)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('cantidad', models.IntegerField(default=0)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_mensuales', to=settings.AUTH_USER_MODEL)),
+                ('space', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_mensuales', to='spaces.space')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['owner', 'anio', 'mes'], name='resumen_owner_mes_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='resumenmensual',
+            constraint=models.UniqueConstraint(fields=('owner', 'space', 'anio', 'mes', 'categoria'), name='unique_resumen_mensual'),
+        ),
+        migrations.RunPython(llenar_resumenes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-18 20:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finanzas', '0004_resumen_mensual'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='gasto',
+            name='gasto_owner_fecha_idx',
+        ),
+        migrations.AddIndex(
+            model_name='gasto',
+            index=models.Index(condition=models.Q(('deleted', False)), fields=['owner', 'updated_at'], name='gasto_owner_vivos_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gasto',
+            index=models.Index(condition=models.Q(('deleted', False)), fields=['owner', 'fecha'], name='gasto_owner_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gasto',
+            index=models.Index(condition=models.Q(('deleted', True)), fields=['updated_at'], name='gasto_borrados_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='presupuesto',
+            index=models.Index(condition=models.Q(('deleted', False)), fields=['owner', 'updated_at'], name='presupuesto_owner_vivos_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='presupuesto',
+            index=models.Index(condition=models.Q(('deleted', True)), fields=['updated_at'], name='presupuesto_borrados_idx'),
+        ),
+    ]
@@ -2,6 +2,8 @@ from django.db import models
 from django.conf import settings
 import uuid
 
+from one_backend.readcache import InvalidaCacheQuerySet
+
 
 class Gasto(models.Model):
     id = models.CharField(max_length=50, primary_key=True, default=uuid.uuid4, editable=False)
@@ -19,6 +21,26 @@ class Gasto(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     deleted = models.BooleanField(default=False)
 
+    objects = InvalidaCacheQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['owner', 'updated_at'], name='gasto_owner_updated_idx'),
+            models.Index(fields=['owner', 'updated_at'], condition=models.Q(deleted=False), name='gasto_owner_vivos_idx'),
+            models.Index(fields=['owner', 'fecha'], condition=models.Q(deleted=False), name='gasto_owner_fecha_idx'),
+            models.Index(fields=['updated_at'], condition=models.Q(deleted=True), name='gasto_borrados_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lo que aportaba el gasto al resumen mensual cuando se cargó
+        if {'space_id', 'fecha', 'categoria', 'monto', 'deleted'} <= set(field_names):
+            instance._resumen_original = (
+                instance.space_id, instance.fecha, instance.categoria, instance.monto, instance.deleted
+            )
+        return instance
+
     def __str__(self):
         return f"{self.descripcion} - ${self.monto}"
 
@@ -38,8 +60,43 @@ class Presupuesto(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     deleted = models.BooleanField(default=False)
 
+    objects = InvalidaCacheQuerySet.as_manager()
+
     class Meta:
         unique_together = ('owner', 'space', 'mes', 'anio')
+        indexes = [
+            models.Index(fields=['owner', 'updated_at'], name='presupuesto_owner_updated_idx'),
+            models.Index(fields=['owner', 'updated_at'], condition=models.Q(deleted=False), name='presupuesto_owner_vivos_idx'),
+            models.Index(fields=['updated_at'], condition=models.Q(deleted=True), name='presupuesto_borrados_idx'),
+        ]
 
     def __str__(self):
         return f"{self.mes}/{self.anio} - ${self.monto}"
+
+
+class ResumenMensual(models.Model):
+    """
+    Total gastado por (dueño, espacio, año, mes, categoría).
+    Se mantiene al guardar o borrar cada Gasto (ver finanzas/resumen.py).
+    """
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='resumenes_mensuales')
+    space = models.ForeignKey('spaces.Space', on_delete=models.CASCADE, related_name='resumenes_mensuales')
+
+    anio = models.IntegerField()
+    mes = models.IntegerField()
+    categoria = models.CharField(max_length=60, blank=True)
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    cantidad = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['owner', 'space', 'anio', 'mes', 'categoria'], name='unique_resumen_mensual'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['owner', 'anio', 'mes'], name='resumen_owner_mes_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.mes}/{self.anio} {self.categoria} - ${self.total}"
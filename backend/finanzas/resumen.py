@@ -0,0 +1,162 @@
+"""
+Resumen mensual de gastos mantenido de forma incremental.
+
+finanzas.js sumaba en el navegador todo el historial de gastos para sacar el
+total del mes y el desglose por categoría. Ahora cada alta, cambio o borrado
+de un Gasto suma o resta su monto en la fila de ResumenMensual que le toca,
+y el tablero lee unas cuantas filas ya agregadas.
+"""
+import calendar
+import datetime
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import Gasto, Presupuesto, ResumenMensual
+
+CERO = Decimal('0')
+
+
+def aportacion(gasto):
+    """Clave del resumen y monto con que cuenta un gasto, o None si no cuenta."""
+    if gasto.deleted:
+        return None
+    fecha = parse_date(gasto.fecha) if isinstance(gasto.fecha, str) else gasto.fecha
+    clave = (gasto.owner_id, gasto.space_id, fecha.year, fecha.month, gasto.categoria or '')
+    return clave, Decimal(str(gasto.monto))
+
+
+def aplicar(cambios):
+    """Suma {(owner, space, anio, mes, categoria): (monto, cantidad)} a los resúmenes."""
+    for clave, (monto, cantidad) in cambios.items():
+        if not monto and not cantidad:
+            continue
+        owner_id, space_id, anio, mes, categoria = clave
+        filas = ResumenMensual.objects.filter(
+            owner_id=owner_id, space_id=space_id, anio=anio, mes=mes, categoria=categoria
+        )
+        if not filas.update(total=F('total') + monto, cantidad=F('cantidad') + cantidad):
+            try:
+                with transaction.atomic():
+                    ResumenMensual.objects.create(
+                        owner_id=owner_id, space_id=space_id, anio=anio, mes=mes,
+                        categoria=categoria, total=monto, cantidad=cantidad,
+                    )
+            except IntegrityError:
+                # Otra petición creó la fila al mismo tiempo
+                filas.update(total=F('total') + monto, cantidad=F('cantidad') + cantidad)
+        if cantidad < 0:
+            filas.filter(cantidad__lte=0).delete()
+
+
+def cambios_de_gasto(gasto, original=None, borrado=False):
+    """Diferencia entre lo que aportaba el gasto al cargarse y lo que aporta ahora."""
+    cambios = defaultdict(lambda: (CERO, 0))
+
+    def sumar(aporte, signo):
+        if aporte is None:
+            return
+        clave, monto = aporte
+        total, cantidad = cambios[clave]
+        cambios[clave] = (total + signo * monto, cantidad + signo)
+
+    if original is not None:
+        space_id, fecha, categoria, monto, deleted = original
+        anterior = Gasto(
+            owner_id=gasto.owner_id, space_id=space_id, fecha=fecha,
+            categoria=categoria, monto=monto, deleted=deleted,
+        )
+        sumar(aportacion(anterior), -1)
+    if not borrado:
+        sumar(aportacion(gasto), 1)
+    return cambios
+
+
+def reconstruir(user):
+    """Recalcula desde cero todos los resúmenes de un usuario."""
+    filas = (
+        Gasto.objects.filter(owner=user, deleted=False)
+        .annotate(anio=ExtractYear('fecha'), mes=ExtractMonth('fecha'))
+        .values('space_id', 'anio', 'mes', 'categoria')
+        .annotate(total=Sum('monto'), cantidad=Count('pk'))
+        .order_by()
+    )
+    with transaction.atomic():
+        ResumenMensual.objects.filter(owner=user).delete()
+        ResumenMensual.objects.bulk_create([
+            ResumenMensual(owner=user, **fila) for fila in filas
+        ])
+
+
+def resumen_del_mes(user, anio, mes, espacio=None, hoy=None):
+    """
+    Gasto contra presupuesto por espacio para un mes.
+    El ritmo diario usa los días transcurridos (todos si el mes ya pasó) y la
+    proyección estima cuánto se habrá gastado al cerrar el mes a ese ritmo.
+    """
+    hoy = hoy or timezone.localdate()
+    dias_mes = calendar.monthrange(anio, mes)[1]
+    if (anio, mes) == (hoy.year, hoy.month):
+        transcurridos = hoy.day
+    elif datetime.date(anio, mes, 1) > hoy:
+        transcurridos = 0
+    else:
+        transcurridos = dias_mes
+
+    resumenes = ResumenMensual.objects.filter(owner=user, anio=anio, mes=mes).select_related('space')
+    presupuestos = Presupuesto.objects.filter(owner=user, anio=anio, mes=mes, deleted=False).select_related('space')
+    if espacio:
+        resumenes = resumenes.filter(space__name=espacio)
+        presupuestos = presupuestos.filter(space__name=espacio)
+
+    espacios = {}
+
+    def de_espacio(space):
+        if space.name not in espacios:
+            espacios[space.name] = {
+                'espacio': space.name, 'presupuesto': None,
+                'totalGasto': CERO, 'cantidad': 0, 'categorias': {},
+            }
+        return espacios[space.name]
+
+    for fila in resumenes:
+        datos = de_espacio(fila.space)
+        datos['totalGasto'] += fila.total
+        datos['cantidad'] += fila.cantidad
+        datos['categorias'][fila.categoria or 'Sin categoría'] = {'total': fila.total, 'cantidad': fila.cantidad}
+    for presupuesto in presupuestos:
+        de_espacio(presupuesto.space)['presupuesto'] = presupuesto.monto
+
+    for datos in espacios.values():
+        _calcular_ritmo(datos, transcurridos, dias_mes)
+
+    total = {
+        'presupuesto': sum((d['presupuesto'] or CERO for d in espacios.values()), CERO) if presupuestos else None,
+        'totalGasto': sum((d['totalGasto'] for d in espacios.values()), CERO),
+        'cantidad': sum(d['cantidad'] for d in espacios.values()),
+    }
+    _calcular_ritmo(total, transcurridos, dias_mes)
+
+    return {
+        'anio': anio,
+        'mes': mes,
+        'diasTranscurridos': transcurridos,
+        'diasMes': dias_mes,
+        'total': total,
+        'espacios': sorted(espacios.values(), key=lambda datos: datos['espacio']),
+    }
+
+
+def _calcular_ritmo(datos, transcurridos, dias_mes):
+    gastado = datos['totalGasto']
+    presupuesto = datos['presupuesto']
+    ritmo = (gastado / transcurridos).quantize(Decimal('0.01')) if transcurridos else CERO
+    datos['ritmoDiario'] = ritmo
+    datos['proyeccion'] = (ritmo * dias_mes).quantize(Decimal('0.01')) if transcurridos else gastado
+    datos['disponible'] = presupuesto - gastado if presupuesto is not None else None
+    datos['porcentajeUsado'] = round(float(gastado / presupuesto) * 100, 1) if presupuesto else None
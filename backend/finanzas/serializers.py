@@ -1,9 +1,13 @@
+from django.db.models.signals import post_save
 from rest_framework import serializers
+from one_backend.metricas import MedirSerializerMixin
+from one_backend.upsert import Existente, IdOcupado, UpsertSerializerMixin
+from one_backend.versiones import BORRADO, Conflicto, VersionSerializerMixin, actualizar
 from .models import Gasto, Presupuesto
-from spaces.models import Space
+from spaces.services import resolver_espacio
 
 
-class GastoSerializer(serializers.ModelSerializer):
+class GastoSerializer(MedirSerializerMixin, VersionSerializerMixin, UpsertSerializerMixin, serializers.ModelSerializer):
     id = serializers.CharField(required=False)
     espacio = serializers.CharField(write_only=True, required=False)
     espacio_nombre = serializers.CharField(source='space.name', read_only=True)
@@ -19,7 +23,8 @@ class GastoSerializer(serializers.ModelSerializer):
             'monto',
             'espacio',
             'espacio_nombre',
-            'owner_email'
+            'owner_email',
+            'version'
         ]
 
     def to_internal_value(self, data):
@@ -30,7 +35,7 @@ class GastoSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         user = self.context['request'].user
         espacio_nombre = validated_data.pop('espacio', 'Personal')
-        espacio, _ = Space.objects.get_or_create(owner=user, name=espacio_nombre)
+        espacio = resolver_espacio(self.context['request'], espacio_nombre)
 
         validated_data['space'] = espacio
         validated_data['owner'] = user
@@ -39,9 +44,8 @@ class GastoSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         if 'espacio' in validated_data:
             espacio_nombre = validated_data.pop('espacio')
-            user = self.context['request'].user
-            espacio, _ = Space.objects.get_or_create(owner=user, name=espacio_nombre)
-            instance.space = espacio
+            espacio = resolver_espacio(self.context['request'], espacio_nombre)
+            validated_data['space'] = espacio
         return super().update(instance, validated_data)
 
     def to_representation(self, instance):
@@ -50,7 +54,7 @@ class GastoSerializer(serializers.ModelSerializer):
         return ret
 
 
-class PresupuestoSerializer(serializers.ModelSerializer):
+class PresupuestoSerializer(MedirSerializerMixin, VersionSerializerMixin, serializers.ModelSerializer):
     id = serializers.CharField(required=False)
     espacio = serializers.CharField(write_only=True, required=False)
     espacio_nombre = serializers.CharField(source='space.name', read_only=True)
@@ -65,7 +69,8 @@ class PresupuestoSerializer(serializers.ModelSerializer):
             'monto',
             'espacio',
             'espacio_nombre',
-            'owner_email'
+            'owner_email',
+            'version'
         ]
 
     def to_internal_value(self, data):
@@ -76,28 +81,49 @@ class PresupuestoSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         user = self.context['request'].user
         espacio_nombre = validated_data.pop('espacio', 'Personal')
-        espacio, _ = Space.objects.get_or_create(owner=user, name=espacio_nombre)
-
-        mes = validated_data.get('mes')
-        anio = validated_data.get('anio')
-        monto = validated_data.get('monto')
-
-        existente = Presupuesto.objects.filter(owner=user, space=espacio, mes=mes, anio=anio).first()
-        if existente:
-            existente.monto = monto
-            existente.save()
+        espacio = resolver_espacio(self.context['request'], espacio_nombre)
+
+        # Un presupuesto por mes y espacio: si ya existe solo cambia el monto,
+        # con el mismo UPDATE condicionado a la versión que cualquier cambio.
+        # El alta es un INSERT ... ON CONFLICT DO NOTHING, así dos altas a la
+        # vez del mismo mes no chocan; luego leemos la fila que quedó
+        validated_data.pop('version', None)
+        nuevo = Presupuesto(owner=user, space=espacio, **validated_data)
+        Presupuesto.objects.bulk_create([nuevo], ignore_conflicts=True)
+        existente = self._del_mes(nuevo)
+        if existente is None:
+            # El id ya es de otro presupuesto (de otro mes, borrado o ajeno)
+            if self.context.get('upsert'):
+                raise Existente(nuevo.pk)
+            raise IdOcupado()
+        if existente.pk == str(nuevo.pk) and existente.created_at == nuevo.created_at:
+            # bulk_create no manda señales: los avisos de sincronización las esperan
+            post_save.send(
+                sender=Presupuesto, instance=existente, created=True,
+                update_fields=None, raw=False, using=existente._state.db,
+            )
             return existente
 
-        validated_data['space'] = espacio
-        validated_data['owner'] = user
-        return super().create(validated_data)
+        if existente.pk == str(nuevo.pk):
+            if existente.deleted:
+                # Un cambio viejo sobre un presupuesto que otro dispositivo borró
+                raise Conflicto(None, BORRADO)
+            if self.context.get('upsert'):
+                # PUT sobre un presupuesto que ya existía: sigue como actualización
+                raise Existente(existente.pk)
+        # Un alta nueva para un mes ya ocupado (o borrado) se queda con esa fila
+        return actualizar(existente, {'monto': nuevo.monto, 'deleted': False})
+
+    def _del_mes(self, presupuesto):
+        return Presupuesto._base_manager.select_related('space', 'owner').filter(
+            owner=presupuesto.owner, space=presupuesto.space, mes=presupuesto.mes, anio=presupuesto.anio
+        ).first()
 
     def update(self, instance, validated_data):
         if 'espacio' in validated_data:
             espacio_nombre = validated_data.pop('espacio')
-            user = self.context['request'].user
-            espacio, _ = Space.objects.get_or_create(owner=user, name=espacio_nombre)
-            instance.space = espacio
+            espacio = resolver_espacio(self.context['request'], espacio_nombre)
+            validated_data['space'] = espacio
         return super().update(instance, validated_data)
 
     def to_representation(self, instance):
@@ -0,0 +1,31 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import resumen
+from .models import Gasto
+
+
+def _en_cascada(origin):
+    # Al borrar un espacio o la cuenta, sus resúmenes se van en cascada con ellos
+    model = getattr(origin, 'model', None) or type(origin)
+    return origin is not None and model is not Gasto
+
+
+@receiver(post_save, sender=Gasto)
+def actualizar_resumen_guardado(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    resumen.aplicar(resumen.cambios_de_gasto(instance, getattr(instance, '_resumen_original', None)))
+    instance._resumen_original = (
+        instance.space_id, instance.fecha, instance.categoria, instance.monto, instance.deleted
+    )
+
+
+@receiver(post_delete, sender=Gasto)
+def actualizar_resumen_borrado(sender, instance, origin=None, **kwargs):
+    if _en_cascada(origin):
+        return
+    original = getattr(instance, '_resumen_original', None) or (
+        instance.space_id, instance.fecha, instance.categoria, instance.monto, instance.deleted
+    )
+    resumen.aplicar(resumen.cambios_de_gasto(instance, original, borrado=True))
@@ -1,3 +1,216 @@
-from django.test import TestCase
+import datetime
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from accounts.models import User
+from finanzas.models import Gasto, Presupuesto, ResumenMensual
+from one_backend.testing import PerfTestCase
+from spaces.models import Space
+
+
+class GastoPerfTests(PerfTestCase):
+    def test_list(self):
+        response = self.medir('gasto-list', 'get', reverse('gasto-list'), max_consultas=4)
+        self.assertEqual(len(response.data), 60)
+
+    def test_list_month_filter(self):
+        url = reverse('gasto-list') + '?anio=2025&mes=2&categoria=comida'
+        response = self.medir('gasto-list-month', 'get', url, max_consultas=4)
+        self.assertTrue(response.data)
+        for gasto in response.data:
+            self.assertTrue(gasto['fecha'].startswith('2025-02'))
+            self.assertEqual(gasto['categoria'], 'comida')
+
+    def test_retrieve(self):
+        self.medir('gasto-detail', 'get', reverse('gasto-detail', args=['perf-gasto-1']), max_consultas=3)
+
+    def test_create(self):
+        data = {'id': 1735689600000, 'descripcion': 'Camión', 'categoria': 'transporte', 'fecha': '2025-03-01', 'monto': 12}
+        self.medir('gasto-create', 'post', reverse('gasto-list'), max_consultas=8, data=data, esperado=201)
+
+    def test_update(self):
+        data = {'monto': '99.90', 'espacio': 'Trabajo'}
+        self.medir('gasto-update', 'patch', reverse('gasto-detail', args=['perf-gasto-1']), max_consultas=11, data=data)
+
+    def test_delete(self):
+        self.medir('gasto-delete', 'delete', reverse('gasto-detail', args=['perf-gasto-1']), max_consultas=6, esperado=204)
+
+
+class PresupuestoPerfTests(PerfTestCase):
+    def test_list(self):
+        response = self.medir('presupuesto-list', 'get', reverse('presupuesto-list'), max_consultas=4)
+        self.assertEqual(len(response.data), 6)
+
+    def test_retrieve(self):
+        url = reverse('presupuesto-detail', args=['perf-presupuesto-1'])
+        self.medir('presupuesto-detail', 'get', url, max_consultas=3)
+
+    def test_create(self):
+        data = {'id': 1735689600000, 'mes': 12, 'anio': 2025, 'monto': 4000}
+        self.medir('presupuesto-create', 'post', reverse('presupuesto-list'), max_consultas=5, data=data, esperado=201)
+
+    def test_update(self):
+        url = reverse('presupuesto-detail', args=['perf-presupuesto-1'])
+        self.medir('presupuesto-update', 'patch', url, max_consultas=4, data={'monto': 4500})
+
+    def test_delete(self):
+        url = reverse('presupuesto-detail', args=['perf-presupuesto-1'])
+        self.medir('presupuesto-delete', 'delete', url, max_consultas=4, esperado=204)
+
+
+class ResumenFinanzasPerfTests(PerfTestCase):
+    def test_resumen(self):
+        url = reverse('finanzas-resumen') + '?anio=2025&mes=1'
+        response = self.medir('finanzas-resumen', 'get', url, max_consultas=4)
+        self.assertEqual(response.data['total']['presupuesto'], Decimal('5000'))
+
+
+class FinanzasTestCase(APITestCase):
+    def setUp(self):
+        # Los ids de usuario se reciclan entre pruebas y la caché de espacios no
+        cache.clear()
+        self.user = User.objects.create_user(username='ana', email='ana@one.mx')
+        self.client.force_authenticate(self.user)
+        self.personal = Space.objects.create(id='ana-personal', owner=self.user, name='Personal')
+        self.escuela = Space.objects.create(id='ana-escuela', owner=self.user, name='Escuela')
+        Presupuesto.objects.create(id='p1', owner=self.user, space=self.personal, mes=1, anio=2025, monto=Decimal('5000'))
+
+    def crear_gasto(self, pk, espacio, categoria, fecha, monto):
+        return Gasto.objects.create(
+            id=pk, owner=self.user, space=espacio, descripcion=pk, categoria=categoria,
+            fecha=fecha, monto=Decimal(monto),
+        )
+
+
+class GastoTests(FinanzasTestCase):
+    def test_list_month_filter(self):
+        self.crear_gasto('g1', self.personal, 'comida', datetime.date(2025, 2, 3), '10')
+        self.crear_gasto('g2', self.personal, 'transporte', datetime.date(2025, 2, 4), '10')
+        self.crear_gasto('g3', self.personal, 'comida', datetime.date(2025, 3, 1), '10')
+        response = self.client.get(reverse('gasto-list') + '?anio=2025&mes=2&categoria=comida')
+        self.assertEqual([gasto['id'] for gasto in response.data], ['g1'])
+
+    def test_list_invalid_month(self):
+        response = self.client.get(reverse('gasto-list') + '?anio=2025&mes=13')
+        self.assertEqual(response.status_code, 400)
+
+
+class PresupuestoTests(FinanzasTestCase):
+    url = reverse('presupuesto-detail', args=['p1'])
+    enero = {'mes': 1, 'anio': 2025, 'monto': 4200, 'espacio': 'Personal'}
+
+    def test_create_existing_month_updates_amount(self):
+        response = self.client.post(reverse('presupuesto-list'), {'id': 'otro-id', **self.enero}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['id'], 'p1')
+        self.assertEqual(Presupuesto.objects.get(pk='p1').monto, Decimal('4200'))
+        self.assertFalse(Presupuesto.objects.filter(pk='otro-id').exists())
+
+    def test_put_creates_then_updates(self):
+        url = reverse('presupuesto-detail', args=['1735689600000'])
+        data = {'mes': 12, 'anio': 2025, 'monto': 4000}
+        self.assertEqual(self.client.put(url, data, format='json').status_code, 201)
+        response = self.client.put(url, {**data, 'monto': 3500}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Presupuesto.objects.get(pk='1735689600000').monto, Decimal('3500'))
+
+    def test_existing_month_bumps_version(self):
+        response = self.client.post(reverse('presupuesto-list'), {'id': 'otro-id', **self.enero}, format='json')
+        self.assertEqual(response.data['version'], 2)
+
+        # Quien tenía la versión anterior ya no puede pisar el monto nuevo
+        response = self.client.patch(self.url, {'monto': 100, 'version': 1}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Presupuesto.objects.get(pk='p1').monto, Decimal('4200'))
+
+    def test_put_on_deleted_budget(self):
+        self.client.delete(self.url)
+        response = self.client.put(self.url, self.enero, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertIsNone(response.data['actual'])
+        self.assertTrue(Presupuesto.objects.get(pk='p1').deleted)
+
+    def test_new_budget_for_deleted_month(self):
+        self.client.delete(self.url)
+        response = self.client.post(reverse('presupuesto-list'), {'id': 'nuevo-id', **self.enero}, format='json')
+        self.assertEqual(response.status_code, 201)
+        presupuesto = Presupuesto.objects.get(pk='p1')
+        self.assertEqual((presupuesto.deleted, presupuesto.version, presupuesto.monto), (False, 3, Decimal('4200')))
+
+
+class ResumenFinanzasTests(FinanzasTestCase):
+    def setUp(self):
+        super().setUp()
+        self.crear_gasto('g1', self.personal, 'comida', datetime.date(2025, 1, 5), '100.00')
+        self.crear_gasto('g2', self.personal, 'comida', datetime.date(2025, 1, 20), '50.50')
+        self.crear_gasto('g3', self.escuela, 'escuela', datetime.date(2025, 1, 8), '200.00')
+        self.crear_gasto('g4', self.escuela, 'escuela', datetime.date(2025, 2, 2), '30.00')
+
+    def resumenes(self):
+        return sorted(
+            ResumenMensual.objects.filter(owner=self.user)
+            .values_list('space_id', 'anio', 'mes', 'categoria', 'total', 'cantidad')
+        )
+
+    def assertIgualAReconstruir(self):
+        # Lo incremental debe quedar idéntico a recalcular todo desde cero
+        incremental = self.resumenes()
+        call_command('rebuild_resumenes', 'ana', stdout=StringIO())
+        self.assertEqual(incremental, self.resumenes())
+
+    def test_resumen(self):
+        response = self.client.get(reverse('finanzas-resumen') + '?anio=2025&mes=1')
+        total = response.data['total']
+        self.assertEqual(total['totalGasto'], Decimal('350.50'))
+        self.assertEqual(total['presupuesto'], Decimal('5000'))
+        self.assertEqual(total['disponible'], Decimal('4649.50'))
+        # Enero ya terminó: el ritmo se reparte en sus 31 días
+        self.assertEqual(response.data['diasTranscurridos'], 31)
+        self.assertEqual(total['ritmoDiario'], Decimal('11.31'))
+
+        personal = next(datos for datos in response.data['espacios'] if datos['espacio'] == 'Personal')
+        self.assertEqual(personal['presupuesto'], Decimal('5000'))
+        self.assertEqual(set(personal['categorias']), {'comida'})
+
+    def test_resumen_filtra_espacio(self):
+        url = reverse('finanzas-resumen') + '?anio=2025&mes=2&espacio=Escuela'
+        response = self.client.get(url)
+        self.assertEqual([datos['espacio'] for datos in response.data['espacios']], ['Escuela'])
+        self.assertIsNone(response.data['total']['presupuesto'])
+
+    def test_resumen_mes_invalido(self):
+        response = self.client.get(reverse('finanzas-resumen') + '?anio=2025&mes=13')
+        self.assertEqual(response.status_code, 400)
+
+    def test_cambios_incrementales(self):
+        self.assertIgualAReconstruir()
+        self.client.post(reverse('gasto-list'), {
+            'id': 'nuevo', 'descripcion': 'Libro', 'categoria': 'escuela', 'fecha': '2024-11-30', 'monto': '250.00',
+        }, format='json')
+        self.assertIgualAReconstruir()
+
+        # Cambiar de mes, de espacio y de monto mueve el gasto de una fila a otra
+        url = reverse('gasto-detail', args=['nuevo'])
+        self.client.patch(url, {'fecha': '2024-12-01', 'espacio': 'Trabajo', 'monto': '300'}, format='json')
+        self.assertIgualAReconstruir()
+        self.assertFalse(ResumenMensual.objects.filter(owner=self.user, anio=2024, mes=11).exists())
+
+        self.client.delete(url)
+        self.assertIgualAReconstruir()
+        self.assertFalse(ResumenMensual.objects.filter(owner=self.user, anio=2024, mes=12).exists())
+
+    def test_borrado_logico(self):
+        gasto = Gasto.objects.get(pk='g4')
+        gasto.deleted = True
+        gasto.save()
+        self.assertIgualAReconstruir()
+
+        gasto.fecha = datetime.date(2025, 1, 15)
+        gasto.deleted = False
+        gasto.save()
+        self.assertIgualAReconstruir()
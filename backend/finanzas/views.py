@@ -1,19 +1,66 @@
-from rest_framework import viewsets, permissions
+import datetime
+
+from django.utils import timezone
+from rest_framework import viewsets, permissions, views
+from rest_framework.response import Response
+from one_backend.borrado import BorradoLogicoMixin
+from one_backend.conditional import ConditionalGetMixin
+from one_backend.readcache import CachedReadMixin
+from one_backend.upsert import UpsertMixin
+from one_backend.versiones import VersionMixin
+from one_backend.filters import parametro_entero
 from .models import Gasto, Presupuesto
+from .resumen import resumen_del_mes
 from .serializers import GastoSerializer, PresupuestoSerializer
 
 
-class GastoViewSet(viewsets.ModelViewSet):
+class GastoViewSet(BorradoLogicoMixin, VersionMixin, UpsertMixin, CachedReadMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = GastoSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Gasto.objects.filter(owner=self.request.user)
+        queryset = Gasto.objects.filter(owner=self.request.user, deleted=False).select_related('space', 'owner')
+        if self.action != 'list':
+            return queryset
+
+        # Filtros opcionales: ?anio=2025&mes=3&categoria=comida
+        # Mes y año se convierten en un rango de fechas para usar el índice (owner, fecha)
+        anio = parametro_entero(self.request, 'anio', minimo=1, maximo=9999)
+        mes = parametro_entero(self.request, 'mes', minimo=1, maximo=12)
+        if anio and mes:
+            inicio = datetime.date(anio, mes, 1)
+            fin = datetime.date(anio + 1, 1, 1) if mes == 12 else datetime.date(anio, mes + 1, 1)
+            queryset = queryset.filter(fecha__gte=inicio, fecha__lt=fin)
+        elif anio:
+            queryset = queryset.filter(fecha__gte=datetime.date(anio, 1, 1), fecha__lt=datetime.date(anio + 1, 1, 1))
+        elif mes:
+            queryset = queryset.filter(fecha__month=mes)
 
+        categoria = self.request.query_params.get('categoria')
+        if categoria:
+            queryset = queryset.filter(categoria=categoria)
+        return queryset
 
-class PresupuestoViewSet(viewsets.ModelViewSet):
+
+class PresupuestoViewSet(BorradoLogicoMixin, VersionMixin, UpsertMixin, CachedReadMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = PresupuestoSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Presupuesto.objects.filter(owner=self.request.user)
+        return Presupuesto.objects.filter(owner=self.request.user, deleted=False).select_related('space', 'owner')
+
+
+class ResumenFinanzasView(views.APIView):
+    """
+    Gasto contra presupuesto del mes: /api/finanzas/resumen/?anio=2025&mes=3&espacio=Personal
+    Sin anio/mes usa el mes actual. Lee el resumen mensual ya agregado en
+    lugar de sumar los gastos uno por uno.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        hoy = timezone.localdate()
+        anio = parametro_entero(request, 'anio', minimo=1, maximo=9999) or hoy.year
+        mes = parametro_entero(request, 'mes', minimo=1, maximo=12) or hoy.month
+        espacio = request.query_params.get('espacio')
+        return Response(resumen_del_mes(request.user, anio, mes, espacio=espacio, hoy=hoy))
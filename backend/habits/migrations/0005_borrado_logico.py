@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-18 20:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habits', '0004_owner_updated_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='habit',
+            index=models.Index(condition=models.Q(('deleted', False)), fields=['owner', 'updated_at'], name='habit_owner_vivos_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='habit',
+            index=models.Index(condition=models.Q(('deleted', True)), fields=['updated_at'], name='habit_borrados_idx'),
+        ),
+    ]
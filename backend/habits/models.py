@@ -1,7 +1,14 @@
+from collections import Counter
+
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 import uuid
 
+from one_backend import readcache
+from one_backend.readcache import InvalidaCacheQuerySet
+
 class Habit(models.Model):
     id = models.CharField(max_length=50, primary_key=True, default=uuid.uuid4, editable=False)
     owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='habits')
@@ -17,6 +24,15 @@ class Habit(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     deleted = models.BooleanField(default=False)
 
+    objects = InvalidaCacheQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['owner', 'updated_at'], name='habit_owner_updated_idx'),
+            models.Index(fields=['owner', 'updated_at'], condition=models.Q(deleted=False), name='habit_owner_vivos_idx'),
+            models.Index(fields=['updated_at'], condition=models.Q(deleted=True), name='habit_borrados_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -30,5 +46,63 @@ class HabitLog(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = InvalidaCacheQuerySet.as_manager()
+    # Para la caché de lectura: el dueño es el del hábito
+    campo_dueno = 'habit__owner'
+
     class Meta:
         unique_together = ('habit', 'date')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Estado cargado, para ajustar la racha solo con la diferencia
+        if {'date', 'done'} <= set(field_names):
+            instance._racha_original = (instance.date, instance.done)
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.tocar_habito()
+
+        cambios = Counter()
+        original = getattr(self, '_racha_original', None)
+        if original and original[1]:
+            cambios[original[0]] -= 1
+        fecha = parse_date(self.date) if isinstance(self.date, str) else self.date
+        if self.done:
+            cambios[fecha] += 1
+        self.actualizar_rachas(cambios)
+        self._racha_original = (fecha, self.done)
+
+    def delete(self, *args, **kwargs):
+        resultado = super().delete(*args, **kwargs)
+        self.tocar_habito()
+        fecha, done = getattr(self, '_racha_original', None) or (self.date, self.done)
+        if done:
+            self.actualizar_rachas({fecha: -1})
+        return resultado
+
+    def actualizar_rachas(self, cambios):
+        from accounts import streaks
+
+        if not any(cambios.values()):
+            return
+        owner_id = self.habit.owner_id
+        streaks.aplicar(owner_id, streaks.clave_habito(self.habit_id), cambios)
+        streaks.aplicar(owner_id, streaks.HABITOS, cambios)
+
+    def tocar_habito(self):
+        # Los registros viajan dentro del hábito, así que el feed de cambios
+        # tiene que ver al hábito como modificado (y con otra versión, para
+        # que un cambio viejo del hábito completo no pise este registro).
+        # El dueño ya lo conocemos: invalidamos la caché de lectura directo
+        # en lugar de buscarlo otra vez
+        from sync.broker import notificar
+
+        ahora = timezone.now()
+        Habit._base_manager.filter(pk=self.habit_id).update(updated_at=ahora, version=models.F('version') + 1)
+        self.habit.version += 1
+        self.habit.updated_at = ahora
+        readcache.invalidar(self.habit.owner_id, HabitLog)
+        notificar(self.habit.owner_id, 'habits', self.habit_id, self.habit.version, ahora)
@@ -1,12 +1,21 @@
+import datetime
+from collections import Counter
+
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import serializers
+from accounts import streaks
+from one_backend.metricas import MedirSerializerMixin
+from one_backend.upsert import UpsertSerializerMixin
+from one_backend.versiones import VersionSerializerMixin, actualizar
 from .models import Habit, HabitLog
 
-class HabitLogSerializer(serializers.ModelSerializer):
+class HabitLogSerializer(MedirSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = HabitLog
         fields = ['date', 'done', 'note']
 
-class HabitSerializer(serializers.ModelSerializer):
+class HabitSerializer(MedirSerializerMixin, VersionSerializerMixin, UpsertSerializerMixin, serializers.ModelSerializer):
     id = serializers.CharField(required=False)
     # Aplanar registros para el frontend: { '2023-01-01': { completado: true, nota: '' } }
     registros = serializers.SerializerMethodField()
@@ -16,7 +25,7 @@ class HabitSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Habit
-        fields = ['id', 'nombre', 'registros', 'registros_input', 'owner_email']
+        fields = ['id', 'nombre', 'registros', 'registros_input', 'owner_email', 'version']
 
     def get_registros(self, obj):
         logs = obj.logs.all()
@@ -42,36 +51,80 @@ class HabitSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         user = self.context['request'].user
         registros_data = validated_data.pop('registros_input', None)
-        
-        habit = Habit.objects.create(owner=user, **validated_data)
-        
-        # Manejar la creación de registros
-        self._update_logs(habit, registros_data)
+
+        with transaction.atomic():
+            habit = super().create({**validated_data, 'owner': user})
+
+            # Manejar la creación de registros
+            self._guardar_logs(habit, self._diferencia_logs(habit, registros_data))
         return habit
 
     def update(self, instance, validated_data):
         registros_data = validated_data.pop('registros_input', None)
-        instance = super().update(instance, validated_data)
-        self._update_logs(instance, registros_data)
+        esperada = validated_data.pop('version', None)
+        with transaction.atomic():
+            diferencia = self._diferencia_logs(instance, registros_data)
+            # Los registros viajan dentro del hábito: si cambian, el hábito
+            # sube de versión en el mismo UPDATE condicionado, antes de tocarlos
+            instance = actualizar(instance, validated_data, esperada, tocar=diferencia is not None)
+            self._guardar_logs(instance, diferencia)
         return instance
 
-    def _update_logs(self, habit, registros_data):
+    def _diferencia_logs(self, habit, registros_data):
+        # El frontend manda siempre el diccionario completo de registros, así que
+        # comparamos por conjuntos: una lectura y a lo más un INSERT, un UPDATE
+        # y un DELETE, sin importar cuántos días tenga el hábito.
+        # Regresa (nuevos, modificados, borrados, cambios_racha) o None si no cambia nada
         if registros_data is None:
-            return
-
-        existing_logs = {log.date.isoformat(): log for log in habit.logs.all()}
-        incoming_dates = set(registros_data.keys())
+            return None
 
+        entrantes = {}
         for date_iso, data in registros_data.items():
-            done = data.get('completado', True)
-            note = data.get('nota', '')
-            
-            HabitLog.objects.update_or_create(
-                habit=habit,
-                date=date_iso,
-                defaults={'done': done, 'note': note}
-            )
-
-        for date_iso, log in existing_logs.items():
-            if date_iso not in incoming_dates:
-                log.delete()
+            try:
+                fecha = datetime.date.fromisoformat(date_iso)
+            except ValueError:
+                raise serializers.ValidationError({'registros': f'Fecha inválida: {date_iso}'})
+            entrantes[fecha] = (data.get('completado', True), data.get('nota', ''))
+
+        existentes = {log.date: log for log in habit.logs.only('id', 'habit_id', 'date', 'done', 'note')}
+        ahora = timezone.now()
+
+        nuevos = []
+        modificados = []
+        # Diferencia de días completados, para actualizar las rachas de forma incremental
+        cambios_racha = Counter()
+        for fecha, (done, note) in entrantes.items():
+            log = existentes.get(fecha)
+            if log is None:
+                nuevos.append(HabitLog(habit=habit, date=fecha, done=done, note=note))
+                cambios_racha[fecha] += 1 if done else 0
+            elif (log.done, log.note) != (done, note):
+                cambios_racha[fecha] += int(bool(done)) - int(log.done)
+                log.done = done
+                log.note = note
+                log.updated_at = ahora
+                modificados.append(log)
+
+        borrados = []
+        for fecha, log in existentes.items():
+            if fecha not in entrantes:
+                borrados.append(log.pk)
+                cambios_racha[fecha] -= 1 if log.done else 0
+
+        if not (nuevos or modificados or borrados):
+            return None
+        return nuevos, modificados, borrados, cambios_racha
+
+    def _guardar_logs(self, habit, diferencia):
+        if diferencia is None:
+            return
+        nuevos, modificados, borrados, cambios_racha = diferencia
+        if nuevos:
+            HabitLog.objects.bulk_create(nuevos)
+        if modificados:
+            HabitLog.objects.bulk_update(modificados, ['done', 'note', 'updated_at'])
+        if borrados:
+            HabitLog.objects.filter(pk__in=borrados).delete()
+
+        streaks.aplicar(habit.owner_id, streaks.clave_habito(habit.pk), cambios_racha)
+        streaks.aplicar(habit.owner_id, streaks.HABITOS, cambios_racha)
@@ -1,3 +1,157 @@
-from django.test import TestCase
+import datetime
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db.models import F
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from accounts.models import User
+from habits.models import Habit, HabitLog
+from one_backend.testing import PerfTestCase
+from spaces.models import Space
+
+
+class HabitPerfTests(PerfTestCase):
+    def test_list(self):
+        response = self.medir('habit-list', 'get', reverse('habit-list'), max_consultas=5)
+        self.assertEqual(len(response.data), 5)
+        self.assertEqual(len(response.data[0]['registros']), 120)
+
+    def test_retrieve(self):
+        self.medir('habit-detail', 'get', reverse('habit-detail', args=['perf-habit-1']), max_consultas=4)
+
+    def test_create(self):
+        data = {'id': 1735689600000, 'nombre': 'Leer', 'registros': {'2025-03-01': {'completado': True, 'nota': ''}}}
+        self.medir('habit-create', 'post', reverse('habit-list'), max_consultas=16, data=data, esperado=201)
+
+    def test_update(self):
+        # El frontend siempre manda el diccionario completo de registros
+        registros = self.client.get(reverse('habit-detail', args=['perf-habit-1'])).data['registros']
+        registros['2025-03-02'] = {'completado': True, 'nota': 'nuevo'}
+        data = {'nombre': 'Meditar', 'registros': registros}
+        self.medir('habit-update', 'patch', reverse('habit-detail', args=['perf-habit-1']), max_consultas=18, data=data)
+
+    def test_delete(self):
+        self.medir('habit-delete', 'delete', reverse('habit-detail', args=['perf-habit-1']), max_consultas=14, esperado=204)
+
+
+class HabitLogPerfTests(PerfTestCase):
+    def test_list(self):
+        response = self.medir('habit-log-list', 'get', reverse('habit-log-list'), max_consultas=4)
+        self.assertEqual(len(response.data), 600)
+
+    def test_retrieve(self):
+        url = reverse('habit-log-detail', args=['perf-habit-1-log-3'])
+        self.medir('habit-log-detail', 'get', url, max_consultas=3)
+
+    def test_update(self):
+        url = reverse('habit-log-detail', args=['perf-habit-1-log-3'])
+        self.medir('habit-log-update', 'patch', url, max_consultas=12, data={'done': False, 'note': 'cansado'})
+
+    def test_delete(self):
+        url = reverse('habit-log-detail', args=['perf-habit-1-log-3'])
+        self.medir('habit-log-delete', 'delete', url, max_consultas=12, esperado=204)
+
+
+class HabitTestCase(APITestCase):
+    url = reverse('habit-detail', args=['h1'])
+
+    def setUp(self):
+        # Los ids de usuario se reciclan entre pruebas y la caché de espacios no
+        cache.clear()
+        self.user = User.objects.create_user(username='ana', email='ana@one.mx')
+        self.client.force_authenticate(self.user)
+        espacio = Space.objects.create(id='ana-personal', owner=self.user, name='Personal')
+        Habit.objects.create(id='h1', owner=self.user, space=espacio, name='Leer')
+        for dia in (26, 27, 28):
+            HabitLog.objects.create(id=f'h1-{dia}', habit_id='h1', date=datetime.date(2025, 2, dia), done=dia != 27)
+        # Escritos hace rato: la última página del feed repite lo de los últimos segundos
+        Habit.objects.filter(owner=self.user).update(updated_at=F('updated_at') - datetime.timedelta(minutes=1))
+
+    def registros(self):
+        return self.client.get(self.url).data['registros']
+
+
+class HabitTests(HabitTestCase):
+    def test_registros(self):
+        self.assertEqual(self.registros(), {
+            '2025-02-26': {'completado': True, 'nota': ''},
+            '2025-02-27': {'completado': False, 'nota': ''},
+            '2025-02-28': {'completado': True, 'nota': ''},
+        })
+
+    def test_update_applies_log_diff(self):
+        registros = self.registros()
+        del registros['2025-02-26']
+        registros['2025-02-28'] = {'completado': False, 'nota': 'enfermo'}
+        registros['2025-03-05'] = {'completado': True, 'nota': ''}
+
+        response = self.client.patch(self.url, {'registros': registros}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['registros'], registros)
+        # Los días que siguen se actualizan en su misma fila
+        self.assertFalse(HabitLog.objects.filter(pk='h1-26').exists())
+        self.assertEqual(HabitLog.objects.get(pk='h1-28').note, 'enfermo')
+
+    def test_update_rejects_invalid_dates(self):
+        response = self.client.patch(self.url, {'registros': {'ayer': {'completado': True}}}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(self.registros()), 3)
+
+
+class HabitRegistrosVersionTests(HabitTestCase):
+    def marcar(self, fecha, **extra):
+        registros = self.registros()
+        registros[fecha] = {'completado': True, 'nota': ''}
+        return self.client.patch(self.url, {'registros': registros, **extra}, format='json')
+
+    def test_tick_reaches_feed_and_conditional_get(self):
+        cursor = self.client.get(reverse('sync-changes')).data['cursor']
+        etag = self.client.get(reverse('habit-list'))['ETag']
+        version = Habit.objects.get(pk='h1').version
+
+        response = self.marcar('2025-03-01')
+        self.assertEqual(response.data['version'], version + 1)
+
+        cambios = self.client.get(reverse('sync-changes'), {'since': cursor}).data['changes']
+        self.assertEqual([(c['type'], c['id'], c['version']) for c in cambios], [('habits', 'h1', version + 1)])
+        response = self.client.get(reverse('habit-list'), headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data[0]['registros']['2025-03-01']['completado'])
+
+    def test_stale_registros_conflict(self):
+        viejo = self.client.get(self.url).data
+        self.marcar('2025-03-01', version=viejo['version'])
+
+        # Otro dispositivo con el diccionario viejo no borra el día marcado
+        registros = {**viejo['registros'], '2025-03-02': {'completado': True, 'nota': ''}}
+        response = self.client.patch(self.url, {'registros': registros, 'version': viejo['version']}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertIn('2025-03-01', response.data['actual']['registros'])
+        self.assertFalse(HabitLog.objects.filter(habit_id='h1', date='2025-03-02').exists())
+
+    def test_unchanged_registros_keep_version(self):
+        version = Habit.objects.get(pk='h1').version
+        response = self.client.patch(self.url, {'registros': self.registros()}, format='json')
+        self.assertEqual(response.data['version'], version)
+
+
+@override_settings(LECTURA_CACHE=True)
+class HabitReadCacheTests(HabitTestCase):
+    def test_log_changes_invalidate_habit(self):
+        self.client.get(self.url)
+
+        # Un registro suelto por su propio endpoint también cambia al hábito
+        self.client.patch(reverse('habit-log-detail', args=['h1-27']), {'note': 'leído'}, format='json')
+        self.assertEqual(self.registros()['2025-02-27']['nota'], 'leído')
+
+    def test_bulk_log_delete_invalidates(self):
+        Habit.objects.create(id='h2', owner=self.user, space_id='ana-personal', name='Correr')
+        HabitLog.objects.create(id='h2-28', habit_id='h2', date=datetime.date(2025, 2, 28))
+        self.assertEqual(len(self.client.get(reverse('habit-log-list')).data), 4)
+        self.client.get(self.url)
+
+        HabitLog.objects.filter(habit_id='h1').delete()
+        self.assertEqual(len(self.client.get(reverse('habit-log-list')).data), 1)
+        self.assertEqual(self.registros(), {})
@@ -1,18 +1,24 @@
 from rest_framework import viewsets, permissions
+from one_backend.borrado import BorradoLogicoMixin
+from one_backend.conditional import ConditionalGetMixin
+from one_backend.readcache import CachedReadMixin
+from one_backend.upsert import UpsertMixin
+from one_backend.versiones import VersionMixin
 from .models import Habit, HabitLog
 from .serializers import HabitSerializer, HabitLogSerializer
 
-class HabitViewSet(viewsets.ModelViewSet):
+class HabitViewSet(BorradoLogicoMixin, VersionMixin, UpsertMixin, CachedReadMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = HabitSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Habit.objects.filter(owner=self.request.user)
+        # Los registros se traen en una sola consulta para todos los hábitos
+        return Habit.objects.filter(owner=self.request.user, deleted=False).select_related('owner').prefetch_related('logs')
 
-class HabitLogViewSet(viewsets.ModelViewSet):
+class HabitLogViewSet(CachedReadMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = HabitLogSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
         # Devolver registros de hábitos del usuario actual
-        return HabitLog.objects.filter(habit__owner=self.request.user)
+        return HabitLog.objects.filter(habit__owner=self.request.user, habit__deleted=False)
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-18 20:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('horarios', '0003_date_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='clase',
+            name='clase_owner_dia_idx',
+        ),
+        migrations.AddIndex(
+            model_name='clase',
+            index=models.Index(condition=models.Q(('deleted', False)), fields=['owner', 'updated_at'], name='clase_owner_vivos_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='clase',
+            index=models.Index(condition=models.Q(('deleted', False)), fields=['owner', 'dia_semana'], name='clase_owner_dia_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='clase',
+            index=models.Index(condition=models.Q(('deleted', True)), fields=['updated_at'], name='clase_borrados_idx'),
+        ),
+    ]
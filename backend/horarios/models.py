@@ -2,6 +2,8 @@ from django.db import models
 from django.conf import settings
 import uuid
 
+from one_backend.readcache import InvalidaCacheQuerySet
+
 
 class Clase(models.Model):
     id = models.CharField(max_length=50, primary_key=True, default=uuid.uuid4, editable=False)
@@ -22,5 +24,15 @@ class Clase(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     deleted = models.BooleanField(default=False)
 
+    objects = InvalidaCacheQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['owner', 'updated_at'], name='clase_owner_updated_idx'),
+            models.Index(fields=['owner', 'updated_at'], condition=models.Q(deleted=False), name='clase_owner_vivos_idx'),
+            models.Index(fields=['owner', 'dia_semana'], condition=models.Q(deleted=False), name='clase_owner_dia_idx'),
+            models.Index(fields=['updated_at'], condition=models.Q(deleted=True), name='clase_borrados_idx'),
+        ]
+
     def __str__(self):
         return f"{self.materia} ({self.dia_semana} {self.hora_inicio}-{self.hora_fin})"
@@ -1,9 +1,12 @@
 from rest_framework import serializers
+from one_backend.metricas import MedirSerializerMixin
+from one_backend.upsert import UpsertSerializerMixin
+from one_backend.versiones import VersionSerializerMixin
 from .models import Clase
-from spaces.models import Space
+from spaces.services import resolver_espacio
 
 
-class ClaseSerializer(serializers.ModelSerializer):
+class ClaseSerializer(MedirSerializerMixin, VersionSerializerMixin, UpsertSerializerMixin, serializers.ModelSerializer):
     id = serializers.CharField(required=False)
     diaSemana = serializers.IntegerField(source='dia_semana', required=False)
     horaInicio = serializers.TimeField(
@@ -37,7 +40,8 @@ class ClaseSerializer(serializers.ModelSerializer):
             'color',
             'espacio',
             'espacio_nombre',
-            'owner_email'
+            'owner_email',
+            'version'
         ]
 
     def to_internal_value(self, data):
@@ -48,7 +52,7 @@ class ClaseSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         user = self.context['request'].user
         espacio_nombre = validated_data.pop('espacio', 'Escuela')
-        espacio, _ = Space.objects.get_or_create(owner=user, name=espacio_nombre)
+        espacio = resolver_espacio(self.context['request'], espacio_nombre)
 
         validated_data['space'] = espacio
         validated_data['owner'] = user
@@ -57,9 +61,8 @@ class ClaseSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         if 'espacio' in validated_data:
             espacio_nombre = validated_data.pop('espacio')
-            user = self.context['request'].user
-            espacio, _ = Space.objects.get_or_create(owner=user, name=espacio_nombre)
-            instance.space = espacio
+            espacio = resolver_espacio(self.context['request'], espacio_nombre)
+            validated_data['space'] = espacio
         return super().update(instance, validated_data)
 
     def to_representation(self, instance):
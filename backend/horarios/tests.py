@@ -1,3 +1,26 @@
-from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from one_backend.testing import PerfTestCase
+
+
+class ClasePerfTests(PerfTestCase):
+    def test_list(self):
+        response = self.medir('clase-list', 'get', reverse('clase-list'), max_consultas=4)
+        self.assertEqual(len(response.data), 10)
+
+    def test_retrieve(self):
+        self.medir('clase-detail', 'get', reverse('clase-detail', args=['perf-clase-1']), max_consultas=3)
+
+    def test_create(self):
+        data = {
+            'id': 1735689600000, 'materia': 'Cálculo', 'profesor': 'Ruiz', 'salon': 'A-12',
+            'diaSemana': 2, 'horaInicio': '10:00', 'horaFin': '11:30',
+        }
+        self.medir('clase-create', 'post', reverse('clase-list'), max_consultas=4, data=data, esperado=201)
+
+    def test_update(self):
+        data = {'salon': 'B-3', 'horaFin': '12:00'}
+        self.medir('clase-update', 'patch', reverse('clase-detail', args=['perf-clase-1']), max_consultas=4, data=data)
+
+    def test_delete(self):
+        self.medir('clase-delete', 'delete', reverse('clase-detail', args=['perf-clase-1']), max_consultas=4, esperado=204)
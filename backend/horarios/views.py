@@ -1,11 +1,25 @@
 from rest_framework import viewsets, permissions
+from one_backend.borrado import BorradoLogicoMixin
+from one_backend.conditional import ConditionalGetMixin
+from one_backend.readcache import CachedReadMixin
+from one_backend.upsert import UpsertMixin
+from one_backend.versiones import VersionMixin
+from one_backend.filters import parametro_entero
 from .models import Clase
 from .serializers import ClaseSerializer
 
 
-class ClaseViewSet(viewsets.ModelViewSet):
+class ClaseViewSet(BorradoLogicoMixin, VersionMixin, UpsertMixin, CachedReadMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = ClaseSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Clase.objects.filter(owner=self.request.user)
+        queryset = Clase.objects.filter(owner=self.request.user, deleted=False).select_related('space', 'owner')
+        if self.action != 'list':
+            return queryset
+
+        # Filtro opcional: ?dia=1 (mismo número que diaSemana); usa el índice (owner, dia_semana)
+        dia = parametro_entero(self.request, 'dia', minimo=0, maximo=6)
+        if dia is not None:
+            queryset = queryset.filter(dia_semana=dia)
+        return queryset
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'one_backend.settings')
+# Rutas de sincronización async (ver sync/async_views.py); SYNC_ASYNC=0 las apaga
+os.environ.setdefault('SYNC_ASYNC', '1')
 
 application = get_asgi_application()
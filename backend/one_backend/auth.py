@@ -1,5 +1,12 @@
-from rest_framework.authentication import SessionAuthentication
+from rest_framework import authentication
 
-class CsrfExemptSessionAuthentication(SessionAuthentication):
+from .metricas import MedirAutenticacionMixin
+
+
+class CsrfExemptSessionAuthentication(MedirAutenticacionMixin, authentication.SessionAuthentication):
     def enforce_csrf(self, request):
         return  # To not perform the csrf check previously happening
+
+
+class BasicAuthentication(MedirAutenticacionMixin, authentication.BasicAuthentication):
+    """Basic de DRF, con su tiempo en las métricas (solo con API_BASIC_AUTH=1)."""
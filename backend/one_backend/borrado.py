@@ -0,0 +1,43 @@
+"""
+Borrado lógico de los modelos sincronizados (Space, Project, Task, Habit,
+Gasto, Presupuesto y Clase).
+
+Un DELETE ya no borra la fila: la marca con deleted = True en un solo UPDATE
+(el mismo compare-and-swap de versiones.actualizar, que sube version y
+updated_at). Antes cada borrado pasaba por el recolector de Django, que busca
+en Python todo lo que cuelga del registro, y dejaba un Tombstone aparte.
+Ahora la fila borrada es su propio tombstone: el feed de cambios la manda
+como borrada y los ViewSets la esconden.
+
+Las señales de siempre ven el borrado como un guardado con deleted = True
+(las rachas, el resumen de gastos y la capacidad ya no cuentan esas filas).
+`manage.py compactar_borrados` quita de verdad las filas borradas hace más
+de SYNC_RETENCION_DIAS.
+"""
+from django.db.models import F
+from django.utils import timezone
+
+from .versiones import actualizar
+
+
+def borrar(instance, esperada=None):
+    """Marca el registro como borrado (Conflicto si la versión ya no es `esperada`)."""
+    return actualizar(instance, {'deleted': True}, esperada)
+
+
+def borrar_en_bloque(queryset):
+    """Borrado lógico de varias filas en un solo UPDATE. No manda señales."""
+    return queryset.filter(deleted=False).update(
+        deleted=True, version=F('version') + 1, updated_at=timezone.now()
+    )
+
+
+def fue_borrado(model, pk, user):
+    return model._base_manager.filter(pk=pk, owner=user, deleted=True).exists()
+
+
+class BorradoLogicoMixin:
+    """destroy() marca la fila como borrada en lugar de eliminarla."""
+
+    def perform_destroy(self, instance):
+        borrar(instance)
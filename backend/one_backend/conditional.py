@@ -0,0 +1,132 @@
+"""
+GET condicional (ETag / Last-Modified) para los ViewSets por usuario.
+
+El frontend vuelve a pedir las colecciones completas aunque nada haya
+cambiado. Antes de serializar calculamos un validador barato de la
+colección, el updated_at más reciente y el número de filas (una consulta
+sobre el índice (owner, updated_at)), y si el cliente ya tiene esa versión
+respondemos 304 sin cuerpo.
+
+- Listas: ETag débil, porque describe la colección y no los bytes exactos.
+  Incluye la ruta con sus filtros, así cada filtro o página tiene el suyo.
+- Detalle: ETag fuerte a partir del id y el updated_at del registro.
+- Las respuestas también llevan datos de otras tablas: el nombre del espacio
+  y el email del dueño. Por eso los validadores incluyen el updated_at más
+  reciente de los espacios que aparecen y el email del usuario (ya cargado
+  en la petición, no cuesta consulta).
+- If-Modified-Since en listas solo se respeta si podemos ver los borrados
+  (tombstones del feed de sincronización); si no, se usa solo el ETag.
+"""
+import hashlib
+import time
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+
+def muestra_espacio(queryset):
+    # Los ViewSets que muestran el espacio lo traen con select_related
+    relacionados = queryset.query.select_related
+    return isinstance(relacionados, dict) and 'space' in relacionados
+
+
+def validador_coleccion(queryset):
+    """(updated_at más reciente, filas, updated_at más reciente de sus espacios)."""
+    agregados = {'ultima': Max('updated_at'), 'total': Count('pk')}
+    if muestra_espacio(queryset):
+        # Renombrar un espacio cambia el cuerpo de todas sus filas
+        agregados['espacio'] = Max('space__updated_at')
+    datos = queryset.order_by().aggregate(**agregados)
+    return datos['ultima'], datos['total'], datos.get('espacio')
+
+
+def mas_reciente(*fechas):
+    return max((fecha for fecha in fechas if fecha), default=None)
+
+
+def calcular_etag(*partes, debil=False):
+    texto = ':'.join('' if parte is None else str(parte) for parte in partes)
+    etag = quote_etag(hashlib.md5(texto.encode()).hexdigest())
+    return f'W/{etag}' if debil else etag
+
+
+def registra_borrados(model):
+    from sync.registry import TIPOS_FEED, tipo_de_modelo
+    return tipo_de_modelo(model) in TIPOS_FEED
+
+
+def ultimo_borrado(user, model):
+    """Fecha del borrado más reciente de ese tipo (filas borradas y tombstones del feed)."""
+    from sync.models import Tombstone
+    from sync.registry import tipo_de_modelo
+
+    fechas = [
+        model._base_manager.filter(owner=user, deleted=True)
+        .order_by('-updated_at').values_list('updated_at', flat=True).first(),
+        Tombstone.objects.filter(owner=user, tipo=tipo_de_modelo(model))
+        .order_by('-updated_at').values_list('updated_at', flat=True).first(),
+    ]
+    return mas_reciente(*fechas)
+
+
+def _timestamp(fecha):
+    return int(fecha.timestamp()) if fecha else None
+
+
+def con_validadores(response, etag, ultima=None):
+    response['ETag'] = etag
+    # Last-Modified tiene resolución de segundos: si el último cambio es de este
+    # mismo segundo, otro cambio inmediato quedaría con la misma fecha. Ahí
+    # preferimos no mandarlo y que el cliente use solo el ETag.
+    if ultima and _timestamp(ultima) < int(time.time()):
+        response['Last-Modified'] = http_date(_timestamp(ultima))
+    # Siempre revalidar: los datos son por usuario y cambian seguido
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+class ConditionalGetMixin:
+    """Responde 304 en list/retrieve cuando el cliente ya tiene la versión actual."""
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        ultima, total, espacio = validador_coleccion(queryset)
+        etag = calcular_etag(
+            request.user.pk, request.user.email, request.get_full_path(), request.accepted_renderer.format,
+            ultima and ultima.isoformat(), total, espacio and espacio.isoformat(), debil=True,
+        )
+
+        # Sin tombstones no veríamos los borrados: en ese caso solo ETag
+        ultima_visible = mas_reciente(ultima, espacio) if registra_borrados(queryset.model) else None
+        if ultima_visible and 'HTTP_IF_MODIFIED_SINCE' in request.META and 'HTTP_IF_NONE_MATCH' not in request.META:
+            # Un borrado no cambia el máximo de updated_at: lo comparamos también
+            borrado = ultimo_borrado(request.user, queryset.model)
+            if borrado and borrado > ultima_visible:
+                ultima_visible = borrado
+
+        no_modificado = get_conditional_response(request, etag=etag, last_modified=_timestamp(ultima_visible))
+        if no_modificado is not None:
+            return con_validadores(no_modificado, etag, ultima_visible)
+
+        response = super().list(request, *args, **kwargs)
+        return con_validadores(response, etag, ultima_visible)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        espacio = None
+        if getattr(instance, 'space_id', None) and muestra_espacio(self.get_queryset()):
+            espacio = instance.space.updated_at
+        etag = calcular_etag(
+            request.user.pk, request.user.email, instance.pk, request.accepted_renderer.format,
+            instance.updated_at.isoformat(), espacio and espacio.isoformat(),
+        )
+        ultima = mas_reciente(instance.updated_at, espacio)
+
+        no_modificado = get_conditional_response(request, etag=etag, last_modified=_timestamp(ultima))
+        if no_modificado is not None:
+            return con_validadores(no_modificado, etag, ultima)
+
+        serializer = self.get_serializer(instance)
+        return con_validadores(Response(serializer.data), etag, ultima)
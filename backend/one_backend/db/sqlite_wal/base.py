@@ -0,0 +1,56 @@
+"""
+SQLite para producción (SQLITE_MODE=wal en settings).
+
+Con la configuración por defecto cada escritura bloquea toda la base y las
+transacciones empiezan con BEGIN (diferido): dos peticiones que leen y luego
+escriben pueden quedar esperándose una a la otra, y SQLite corta a una con
+"database is locked" sin respetar el timeout. Aquí:
+
+- Cada conexión nueva aplica los PRAGMA de OPTIONS['pragmas'] (WAL,
+  synchronous=NORMAL, busy_timeout, mmap, cache).
+- Las transacciones (atomic) empiezan con BEGIN IMMEDIATE: toman el candado
+  de escritura al inicio, así que los escritores se forman en fila y esperan
+  hasta busy_timeout en lugar de fallar a media transacción.
+"""
+from django.db.backends.sqlite3 import base
+
+# Valores razonables si settings no dice otra cosa
+PRAGMAS_DEFAULT = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -20000,  # negativo = KiB, unos 20 MB
+    'temp_store': 'MEMORY',
+}
+
+MODOS_TRANSACCION = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        # Estas opciones son nuestras, no de sqlite3.connect()
+        kwargs.pop('pragmas', None)
+        kwargs.pop('transaction_mode', None)
+        return kwargs
+
+    @property
+    def pragmas(self):
+        return {**PRAGMAS_DEFAULT, **self.settings_dict['OPTIONS'].get('pragmas', {})}
+
+    @property
+    def transaction_mode(self):
+        modo = self.settings_dict['OPTIONS'].get('transaction_mode', 'IMMEDIATE').upper()
+        if modo not in MODOS_TRANSACCION:
+            raise ValueError(f'transaction_mode inválido: {modo}')
+        return modo
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for nombre, valor in self.pragmas.items():
+            conn.execute(f'PRAGMA {nombre} = {valor}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f'BEGIN {self.transaction_mode}')
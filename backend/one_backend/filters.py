@@ -0,0 +1,27 @@
+import datetime
+
+from rest_framework.exceptions import ValidationError
+
+
+def parametro_fecha(request, nombre):
+    # Fecha opcional en formato YYYY-MM-DD; None si no viene
+    valor = request.query_params.get(nombre)
+    if not valor:
+        return None
+    try:
+        return datetime.date.fromisoformat(valor)
+    except ValueError:
+        raise ValidationError({nombre: 'Fecha inválida, se espera YYYY-MM-DD'})
+
+
+def parametro_entero(request, nombre, minimo=None, maximo=None):
+    valor = request.query_params.get(nombre)
+    if valor in (None, ''):
+        return None
+    try:
+        numero = int(valor)
+    except ValueError:
+        raise ValidationError({nombre: 'Debe ser un número'})
+    if (minimo is not None and numero < minimo) or (maximo is not None and numero > maximo):
+        raise ValidationError({nombre: f'Debe estar entre {minimo} y {maximo}'})
+    return numero
@@ -0,0 +1,283 @@
+"""
+Métricas por petición: Server-Timing y /api/_metrics (Prometheus).
+
+MetricasMiddleware mide en cada petición:
+- total: de que entra al middleware a que sale la respuesta.
+- db: número de consultas SQL y su tiempo (un execute_wrapper en cada
+  conexión; también cuenta las que corren en hilos de las vistas async,
+  porque la medición viaja en un ContextVar).
+- ser: tiempo en serializadores (is_valid y .data), con MedirSerializerMixin
+  en los serializadores del proyecto.
+- auth: tiempo en autenticar, con MedirAutenticacionMixin en las clases de
+  DEFAULT_AUTHENTICATION_CLASSES (la de tokens, que define su propio
+  authenticate, usa medir('auth') directo).
+
+Se responde en la cabecera Server-Timing (la muestran las herramientas del
+navegador) y se acumula por nombre de ruta (task-list, habit-detail, login...)
+en histogramas que /api/_metrics expone en formato de texto de Prometheus.
+Los acumulados son del proceso: con varios workers, Prometheus junta lo de
+cada uno.
+
+Apagado por defecto: con METRICAS=False el middleware se quita solo
+(MiddlewareNotUsed) y los mixins no miden nada. /api/_metrics además pide
+METRICAS_TOKEN (como "Bearer"); sin token definido responde 404, para no
+publicar rutas, tráfico y latencias a cualquiera.
+"""
+import contextvars
+import hmac
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+from rest_framework import serializers
+
+from . import readcache
+
+# Límites de los histogramas (segundos)
+CUBETAS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Medición de la petición en curso (None fuera de una petición medida)
+_actual = contextvars.ContextVar('medicion', default=None)
+
+
+class Medicion:
+    __slots__ = ('inicio', 'consultas', 'db', 'ser', 'auth', '_anidado')
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.db = 0.0
+        self.ser = 0.0
+        self.auth = 0.0
+        # Evita contar dos veces un serializador que usa otro por dentro
+        self._anidado = 0
+
+
+def medir_consulta(execute, sql, params, many, context):
+    medicion = _actual.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicion.db += time.perf_counter() - inicio
+        medicion.consultas += 1
+
+
+def _instalar_en_conexion(sender=None, connection=None, **kwargs):
+    if medir_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(medir_consulta)
+
+
+@contextmanager
+def medir(campo):
+    """Suma el tiempo del bloque a medicion.<campo> (sin contar dos veces lo anidado)."""
+    medicion = _actual.get()
+    if medicion is None or medicion._anidado:
+        yield
+        return
+    medicion._anidado += 1
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        medicion._anidado -= 1
+        setattr(medicion, campo, getattr(medicion, campo) + time.perf_counter() - inicio)
+
+
+class MedirSerializerMixin:
+    """Cuenta is_valid() y .data en el tiempo de serializadores de la petición."""
+
+    def is_valid(self, *args, **kwargs):
+        with medir('ser'):
+            return super().is_valid(*args, **kwargs)
+
+    @property
+    def data(self):
+        with medir('ser'):
+            return super().data
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Con many=True DRF arma un ListSerializer aparte (Meta.list_serializer_class):
+        # si el serializador no pide otro, usamos uno medido
+        meta = cls.__dict__.get('Meta')
+        if meta is not None and not hasattr(meta, 'list_serializer_class'):
+            meta.list_serializer_class = ListaMedida
+
+
+class ListaMedida(MedirSerializerMixin, serializers.ListSerializer):
+    pass
+
+
+class MedirAutenticacionMixin:
+    """Cuenta authenticate() en el tiempo de autenticación de la petición."""
+
+    def authenticate(self, request):
+        with medir('auth'):
+            return super().authenticate(request)
+
+
+_instalado = False
+_candado_instalar = threading.Lock()
+
+
+def instalar():
+    """Mide las consultas SQL de cada conexión. Solo se llama si METRICAS está activo."""
+    global _instalado
+    with _candado_instalar:
+        if _instalado:
+            return
+        _instalado = True
+
+    connection_created.connect(_instalar_en_conexion, dispatch_uid='metricas_conexion')
+    for conexion in connections.all(initialized_only=True):
+        _instalar_en_conexion(connection=conexion)
+
+
+class Registro:
+    """Histogramas y contadores por (ruta, método), protegidos con un candado."""
+
+    def __init__(self):
+        self._candado = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._candado:
+            self.duracion = defaultdict(lambda: [0] * (len(CUBETAS) + 1))
+            self.sumas = defaultdict(lambda: {'total': 0.0, 'db': 0.0, 'ser': 0.0, 'auth': 0.0, 'consultas': 0, 'n': 0})
+
+    def observar(self, ruta, metodo, medicion, total):
+        clave = (ruta, metodo)
+        cubeta = next((i for i, limite in enumerate(CUBETAS) if total <= limite), len(CUBETAS))
+        with self._candado:
+            self.duracion[clave][cubeta] += 1
+            sumas = self.sumas[clave]
+            sumas['total'] += total
+            sumas['db'] += medicion.db
+            sumas['ser'] += medicion.ser
+            sumas['auth'] += medicion.auth
+            sumas['consultas'] += medicion.consultas
+            sumas['n'] += 1
+
+    def prometheus(self):
+        with self._candado:
+            duracion = {clave: list(conteos) for clave, conteos in self.duracion.items()}
+            sumas = {clave: dict(valores) for clave, valores in self.sumas.items()}
+
+        lineas = [
+            '# HELP one_request_duration_seconds Duración de las peticiones por ruta.',
+            '# TYPE one_request_duration_seconds histogram',
+        ]
+        for (ruta, metodo), conteos in sorted(duracion.items()):
+            etiquetas = f'route="{ruta}",method="{metodo}"'
+            acumulado = 0
+            for limite, conteo in zip(CUBETAS, conteos):
+                acumulado += conteo
+                lineas.append(f'one_request_duration_seconds_bucket{{{etiquetas},le="{limite}"}} {acumulado}')
+            lineas.append(f'one_request_duration_seconds_bucket{{{etiquetas},le="+Inf"}} {sum(conteos)}')
+            lineas.append(f'one_request_duration_seconds_sum{{{etiquetas}}} {sumas[(ruta, metodo)]["total"]:.6f}')
+            lineas.append(f'one_request_duration_seconds_count{{{etiquetas}}} {sum(conteos)}')
+
+        contadores = (
+            ('one_request_db_seconds_total', 'db', 'Tiempo en consultas SQL por ruta.'),
+            ('one_request_db_queries_total', 'consultas', 'Consultas SQL por ruta.'),
+            ('one_request_serializer_seconds_total', 'ser', 'Tiempo en serializadores por ruta.'),
+            ('one_request_auth_seconds_total', 'auth', 'Tiempo en autenticación por ruta.'),
+        )
+        for nombre, campo, ayuda in contadores:
+            lineas += [f'# HELP {nombre} {ayuda}', f'# TYPE {nombre} counter']
+            for (ruta, metodo), valores in sorted(sumas.items()):
+                valor = valores[campo]
+                valor = f'{valor:.6f}' if isinstance(valor, float) else valor
+                lineas.append(f'{nombre}{{route="{ruta}",method="{metodo}"}} {valor}')
+
+        lineas += [
+            '# HELP one_readcache_requests_total Lecturas de la caché de respuestas.',
+            '# TYPE one_readcache_requests_total counter',
+        ]
+        for entidad, resultados in sorted(readcache.estadisticas().items()):
+            for resultado, total in sorted(resultados.items()):
+                lineas.append(f'one_readcache_requests_total{{entity="{entidad}",result="{resultado}"}} {total}')
+        return '\n'.join(lineas) + '\n'
+
+
+registro = Registro()
+
+
+def server_timing(medicion, total):
+    return (
+        f'total;dur={total * 1000:.1f}, '
+        f'db;desc="{medicion.consultas} consultas";dur={medicion.db * 1000:.1f}, '
+        f'ser;dur={medicion.ser * 1000:.1f}, '
+        f'auth;dur={medicion.auth * 1000:.1f}'
+    )
+
+
+class MetricasMiddleware:
+    """Va primero en MIDDLEWARE para que el total incluya a los demás."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICAS', False):
+            raise MiddlewareNotUsed
+        instalar()
+        self.get_response = get_response
+        self.es_async = iscoroutinefunction(get_response)
+        if self.es_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.es_async:
+            return self._acall(request)
+        medicion = Medicion()
+        marca = _actual.set(medicion)
+        try:
+            response = self.get_response(request)
+        finally:
+            _actual.reset(marca)
+        return self.terminar(request, response, medicion)
+
+    async def _acall(self, request):
+        medicion = Medicion()
+        marca = _actual.set(medicion)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _actual.reset(marca)
+        return self.terminar(request, response, medicion)
+
+    def terminar(self, request, response, medicion):
+        total = time.perf_counter() - medicion.inicio
+        match = getattr(request, 'resolver_match', None)
+        ruta = match.url_name if match and match.url_name else 'sin_ruta'
+        if ruta != 'metricas':
+            registro.observar(ruta, request.method, medicion, total)
+
+        response['Server-Timing'] = server_timing(medicion, total)
+        # Sin esto el navegador no deja leer Server-Timing desde otro origen
+        if response.has_header('Access-Control-Allow-Origin'):
+            response['Timing-Allow-Origin'] = response['Access-Control-Allow-Origin']
+        return response
+
+
+def metricas_view(request):
+    """GET /api/_metrics en formato de texto de Prometheus."""
+    if not getattr(settings, 'METRICAS', False):
+        return HttpResponse(status=404)
+    token = getattr(settings, 'METRICAS_TOKEN', '')
+    if not token:
+        return HttpResponse(status=404)
+    # Comparación de tiempo constante, igual que la cabecera del perfilado
+    if not hmac.compare_digest(request.headers.get('Authorization', '').encode(), f'Bearer {token}'.encode()):
+        return HttpResponseForbidden()
+    return HttpResponse(registro.prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,25 @@
+from rest_framework.pagination import CursorPagination
+
+
+class OptionalCursorPagination(CursorPagination):
+    """
+    Paginación por cursor (keyset) para todos los ViewSets.
+    Es opcional: solo pagina si el cliente manda ?page_size= o ?cursor=.
+    Sin esos parámetros regresa la lista completa, como espera el frontend actual.
+
+    El orden por defecto es (updated_at, id), que ya tiene índice (owner, updated_at)
+    en cada modelo; un ViewSet puede cambiarlo con el atributo `cursor_ordering`.
+    """
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = ('updated_at', 'id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.page_size_query_param not in request.query_params and self.cursor_query_param not in request.query_params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_ordering(self, request, queryset, view):
+        self.ordering = getattr(view, 'cursor_ordering', self.ordering)
+        return super().get_ordering(request, queryset, view)
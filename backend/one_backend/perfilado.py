@@ -0,0 +1,281 @@
+"""
+Perfilado de peticiones en producción (opcional, PERFILADO=1).
+
+Las métricas dicen qué ruta es lenta; esto guarda el porqué. Se captura una
+petición cuando:
+- cae en la muestra (PERFILADO_MUESTRA, p. ej. 0.01 = una de cada cien),
+- trae la cabecera X-Perfil con el valor de PERFILADO_TOKEN, o
+- tarda más de PERFILADO_LENTO_MS.
+
+Por cada petición capturada se escribe una carpeta en PERFILADO_DIR con:
+- meta.json: ruta, método, estado, duración, consultas y motivo.
+- perfil.pstats: cProfile de la vista (se abre con pstats o snakeviz).
+- pilas.txt: pilas colapsadas del muestreador ("a;b;c 12", para flamegraph.pl
+  o speedscope).
+- sql.json: las consultas con su tiempo y el EXPLAIN de las SELECT más lentas,
+  sin los parámetros (traen datos de los usuarios; solo se usan para el EXPLAIN).
+Solo se guardan las PERFILADO_MAX más recientes. `manage.py perfiles` las
+lista y resume.
+
+cProfile cuesta mucho para dejarlo en todas las peticiones: solo corre en las
+de la muestra, las de la cabecera y las escrituras de PERFILADO_RUTAS (los
+guardados de HabitSerializer y ProjectSerializer, que es lo que buscamos).
+Una escritura vigilada rápida y fuera de la muestra se descarta. Para las
+demás peticiones lentas queda el muestreador: un hilo que cada
+PERFILADO_INTERVALO_MS copia la pila de los hilos con una petición en curso,
+sin tocar el código que corre. Solo arranca con PERFILADO y PERFILADO_LENTO_MS
+activos.
+
+El middleware es solo síncrono: bajo ASGI Django lo adapta, así que con
+PERFILADO=0 (lo normal) se quita solo (MiddlewareNotUsed) y no cuesta nada.
+"""
+import contextvars
+import cProfile
+import hmac
+import json
+import logging
+import random
+import shutil
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, connections
+from django.db.backends.signals import connection_created
+from rest_framework.permissions import SAFE_METHODS
+
+logger = logging.getLogger(__name__)
+
+CABECERA = 'X-Perfil'
+# Tope de consultas guardadas por petición y de SELECT a las que se pide EXPLAIN
+MAX_CONSULTAS = 500
+MAX_EXPLAIN = 10
+
+# Captura de la petición en curso (None fuera de una petición perfilada)
+_actual = contextvars.ContextVar('captura_perfil', default=None)
+
+
+class Captura:
+    __slots__ = ('inicio', 'motivo', 'consultas', 'pilas', 'perfil')
+
+    def __init__(self, motivo=None):
+        self.inicio = time.perf_counter()
+        self.motivo = motivo
+        self.consultas = []
+        self.pilas = Counter()
+        self.perfil = None
+
+
+def capturar_consulta(execute, sql, params, many, context):
+    captura = _actual.get()
+    if captura is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if len(captura.consultas) < MAX_CONSULTAS:
+            captura.consultas.append({
+                'alias': context['connection'].alias,
+                'sql': sql,
+                # En executemany los parámetros pueden ser un generador ya consumido
+                'params': None if many or params is None else list(params),
+                'many': many,
+                'ms': round((time.perf_counter() - inicio) * 1000, 3),
+            })
+
+
+def _instalar_en_conexion(sender=None, connection=None, **kwargs):
+    if capturar_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(capturar_consulta)
+
+
+def colapsar(marco):
+    """Pila de un frame en formato colapsado: 'modulo:funcion;modulo:funcion'."""
+    partes = []
+    while marco is not None:
+        partes.append(f'{marco.f_globals.get("__name__", "?")}:{marco.f_code.co_name}')
+        marco = marco.f_back
+    return ';'.join(reversed(partes))
+
+
+class Muestreador:
+    """Hilo que toma la pila de los hilos registrados cada `intervalo` segundos."""
+
+    def __init__(self, intervalo=0.005):
+        self.intervalo = intervalo
+        self._hilos = {}
+        self._candado = threading.Lock()
+        self._hay_trabajo = threading.Event()
+        self._hilo = None
+
+    def registrar(self, hilo_id, pilas):
+        with self._candado:
+            self._hilos[hilo_id] = pilas
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._correr, name='perfilado', daemon=True)
+                self._hilo.start()
+            self._hay_trabajo.set()
+
+    def quitar(self, hilo_id):
+        with self._candado:
+            self._hilos.pop(hilo_id, None)
+            if not self._hilos:
+                self._hay_trabajo.clear()
+
+    def _correr(self):
+        while True:
+            # Sin peticiones en curso el hilo se queda dormido aquí
+            self._hay_trabajo.wait()
+            time.sleep(self.intervalo)
+            marcos = sys._current_frames()
+            with self._candado:
+                for hilo_id, pilas in self._hilos.items():
+                    marco = marcos.get(hilo_id)
+                    if marco is not None:
+                        pilas[colapsar(marco)] += 1
+
+
+muestreador = Muestreador()
+
+
+def explicar(consultas, limite=MAX_EXPLAIN):
+    """Agrega 'plan' a las SELECT más lentas (una vez por texto de SQL)."""
+    vistas = set()
+    for consulta in sorted(consultas, key=lambda consulta: consulta['ms'], reverse=True):
+        if len(vistas) >= limite:
+            break
+        sql = consulta['sql']
+        if consulta['many'] or sql in vistas or not sql.lstrip().upper().startswith('SELECT'):
+            continue
+        vistas.add(sql)
+        conexion = connections[consulta['alias']]
+        try:
+            with conexion.cursor() as cursor:
+                cursor.execute(f'{conexion.ops.explain_query_prefix()} {sql}', consulta['params'])
+                # SQLite: (id, parent, notused, detalle); PostgreSQL: una columna de texto
+                consulta['plan'] = [str(fila[-1]) for fila in cursor.fetchall()]
+        except DatabaseError as error:
+            consulta['plan'] = [f'error: {error}']
+    return consultas
+
+
+def _escribir_json(ruta, datos):
+    with open(ruta, 'w') as archivo:
+        json.dump(datos, archivo, indent=2, default=str)
+        archivo.write('\n')
+
+
+def rotar(carpeta, maximo):
+    """Deja solo las `maximo` capturas más recientes (el nombre empieza con la fecha)."""
+    capturas = sorted(ruta for ruta in carpeta.iterdir() if ruta.is_dir())
+    for ruta in capturas[:max(len(capturas) - maximo, 0)]:
+        # Otro worker puede estar rotando a la vez
+        shutil.rmtree(ruta, ignore_errors=True)
+
+
+def guardar(request, response, captura, ruta, milisegundos):
+    base = Path(settings.PERFILADO_DIR)
+    carpeta = base / f'{time.strftime("%Y%m%d-%H%M%S")}-{ruta}-{uuid.uuid4().hex[:8]}'
+    carpeta.mkdir(parents=True)
+
+    explicar(captura.consultas)
+    _escribir_json(carpeta / 'meta.json', {
+        'ruta': ruta,
+        'metodo': request.method,
+        'path': request.path,
+        'estado': response.status_code,
+        'ms': round(milisegundos, 1),
+        'consultas': len(captura.consultas),
+        'sql_ms': round(sum(consulta['ms'] for consulta in captura.consultas), 1),
+        'motivo': captura.motivo,
+        'usuario': getattr(getattr(request, 'user', None), 'pk', None),
+        'fecha': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    })
+    _escribir_json(carpeta / 'sql.json', [
+        {campo: valor for campo, valor in consulta.items() if campo != 'params'}
+        for consulta in captura.consultas
+    ])
+    if captura.perfil is not None:
+        captura.perfil.dump_stats(carpeta / 'perfil.pstats')
+    if captura.pilas:
+        with open(carpeta / 'pilas.txt', 'w') as archivo:
+            for pila, total in captura.pilas.most_common():
+                archivo.write(f'{pila} {total}\n')
+
+    rotar(base, settings.PERFILADO_MAX)
+    return carpeta
+
+
+class PerfiladoMiddleware:
+    """Va justo después de MetricasMiddleware."""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PERFILADO', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        muestreador.intervalo = settings.PERFILADO_INTERVALO_MS / 1000
+        connection_created.connect(_instalar_en_conexion, dispatch_uid='perfilado_conexion')
+        for conexion in connections.all(initialized_only=True):
+            _instalar_en_conexion(connection=conexion)
+
+    def motivo(self, request):
+        token = settings.PERFILADO_TOKEN
+        if token and hmac.compare_digest(request.headers.get(CABECERA, ''), token):
+            return 'cabecera'
+        if random.random() < settings.PERFILADO_MUESTRA:
+            return 'muestra'
+        return None
+
+    def __call__(self, request):
+        # Con override_settings (o un cambio en caliente) puede apagarse después de cargar
+        if not settings.PERFILADO:
+            return self.get_response(request)
+        captura = Captura(self.motivo(request))
+        lento = settings.PERFILADO_LENTO_MS
+        hilo = threading.get_ident()
+        if lento:
+            muestreador.registrar(hilo, captura.pilas)
+        marca = _actual.set(captura)
+        try:
+            response = self.get_response(request)
+        finally:
+            if captura.perfil is not None:
+                captura.perfil.disable()
+            _actual.reset(marca)
+            if lento:
+                muestreador.quitar(hilo)
+
+        milisegundos = (time.perf_counter() - captura.inicio) * 1000
+        if captura.motivo is None and lento and milisegundos >= lento:
+            captura.motivo = 'lenta'
+
+        match = getattr(request, 'resolver_match', None)
+        ruta = match.url_name if match and match.url_name else 'sin_ruta'
+        if captura.motivo and ruta != 'metricas':
+            try:
+                guardar(request, response, captura, ruta, milisegundos)
+            except OSError:
+                # Perfilar nunca debe tumbar la petición
+                logger.warning('No se pudo guardar el perfil de %s', request.path, exc_info=True)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        captura = _actual.get()
+        if captura is None:
+            return None
+        vigilada = request.method not in SAFE_METHODS and request.resolver_match.url_name in settings.PERFILADO_RUTAS
+        if captura.motivo or vigilada:
+            captura.perfil = cProfile.Profile()
+            try:
+                captura.perfil.enable()
+            except ValueError:
+                # Python 3.12+ solo admite un cProfile activo a la vez en el proceso;
+                # esta petición se queda con las pilas del muestreador
+                captura.perfil = None
+        return None
@@ -0,0 +1,262 @@
+"""
+Caché de lectura por usuario para los ViewSets.
+
+Guardamos ya serializadas las respuestas de list y retrieve, bajo una clave
+que incluye la versión de la entidad para ese usuario:
+
+    lectura:v:<user>:<entidad>                 -> versión actual
+    lectura:<user>:<entidad>:<versión>:<hash>  -> datos + ETag/Last-Modified
+
+Cualquier escritura sube la versión y las claves viejas simplemente dejan de
+usarse (caducan solas). Así no hay que saber qué listas o filtros tocó.
+- post_save / post_delete suben la versión del modelo y de los que lo
+  muestran (los registros van dentro del hábito, el nombre del espacio va en
+  cada tarea, el email del usuario va en todo).
+- update(), delete(), bulk_create() y bulk_update() sobre un queryset no
+  siempre mandan señales: los modelos usan InvalidaCacheQuerySet, que también
+  sube la versión en esos casos. HabitLog no lleva señales a propósito (así
+  sus borrados masivos siguen siendo un solo DELETE); se invalida por aquí.
+  Esas operaciones también mandan la señal cambio_masivo con los dueños
+  tocados, para otras cachés por usuario (la de capacidad, tasks/signals.py).
+
+Necesita una caché compartida entre procesos (Redis o archivos): con locmem
+cada worker tendría sus propias versiones y una escritura en uno no
+invalidaría a los demás. Solo está activa con settings.LECTURA_CACHE; si no,
+list/retrieve van directo a la base y las escrituras no tocan la caché.
+"""
+import hashlib
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework.response import Response
+
+# Cuánto vive una respuesta guardada (las versiones nuevas la dejan huérfana antes)
+TTL_LECTURA = 60 * 10
+# Las versiones duran más que los datos para no reciclar una versión vieja
+TTL_VERSION = 60 * 60 * 24
+
+CABECERAS = ('ETag', 'Last-Modified', 'Cache-Control')
+
+# Modelos cuyo payload incluye datos de otro modelo (y borrados en cascada)
+DEPENDIENTES = {
+    'habits.habitlog': ('habits.habit',),
+    'habits.habit': ('habits.habitlog',),
+}
+# Cambios que se ven en todas las entidades del usuario
+GLOBALES = ('spaces.space', 'accounts.user')
+
+# La mandan update(), delete(), bulk_create() y bulk_update() de
+# InvalidaCacheQuerySet con duenos = ids de los usuarios tocados
+cambio_masivo = Signal()
+
+# Entidades que pasan por la caché (se llenan en conectar())
+_entidades = set()
+
+_contadores = Counter()
+_candado = threading.Lock()
+
+
+def _contar(entidad, resultado):
+    with _candado:
+        _contadores[(entidad, resultado)] += 1
+
+
+def estadisticas():
+    """Aciertos y fallos de este proceso: {'tasks.task': {'hit': 3, 'miss': 1}, ...}"""
+    with _candado:
+        datos = {}
+        for (entidad, resultado), total in _contadores.items():
+            datos.setdefault(entidad, {'hit': 0, 'miss': 0})[resultado] = total
+        return datos
+
+
+def reiniciar_estadisticas():
+    with _candado:
+        _contadores.clear()
+
+
+def clave_version(user_id, entidad):
+    return f'lectura:v:{user_id}:{entidad}'
+
+
+def version(user_id, entidad):
+    clave = clave_version(user_id, entidad)
+    actual = cache.get(clave)
+    if actual is None:
+        # Arrancamos desde el reloj y no desde 1: si la clave se perdió no
+        # queremos volver a una versión que ya tenga datos viejos guardados
+        cache.add(clave, time.time_ns(), TTL_VERSION)
+        actual = cache.get(clave)
+    return actual
+
+
+def subir_version(user_id, *entidades):
+    for entidad in entidades:
+        clave = clave_version(user_id, entidad)
+        try:
+            cache.incr(clave)
+        except ValueError:
+            cache.set(clave, time.time_ns(), TTL_VERSION)
+
+
+def activa():
+    return settings.LECTURA_CACHE
+
+
+def invalidar(user_id, model):
+    if not activa():
+        return
+    entidad = model._meta.label_lower
+    if entidad in GLOBALES:
+        entidades = tuple(_entidades)
+    else:
+        entidades = (entidad,) + DEPENDIENTES.get(entidad, ())
+    subir_version(user_id, *entidades)
+
+
+def duenos_de(model, objs):
+    """Ids de los dueños de esos objetos, siguiendo campo_dueno (p. ej. habit__owner)."""
+    if model._meta.label_lower == 'accounts.user':
+        return {obj.pk for obj in objs}
+    campo = getattr(model, 'campo_dueno', 'owner')
+    if '__' not in campo:
+        return {getattr(obj, f'{campo}_id') for obj in objs}
+
+    relacion, resto = campo.split('__', 1)
+    field = model._meta.get_field(relacion)
+    duenos = set()
+    pendientes = set()
+    for obj in objs:
+        if field.is_cached(obj):
+            duenos |= duenos_de(field.related_model, [getattr(obj, relacion)])
+        else:
+            pendientes.add(getattr(obj, field.attname))
+    if pendientes:
+        # Una sola consulta para todos los que no traen la relación cargada
+        duenos |= set(field.related_model._base_manager.filter(pk__in=pendientes).values_list(resto, flat=True))
+    return duenos
+
+
+def invalidar_instancia(sender, instance, update_fields=None, **kwargs):
+    # Iniciar sesión solo guarda last_login, que no sale en ninguna respuesta
+    if not activa() or (update_fields and set(update_fields) <= {'last_login'}):
+        return
+    for user_id in duenos_de(sender, [instance]):
+        invalidar(user_id, sender)
+
+
+def conectar(*modelos, con_senales=()):
+    """Registra las entidades en caché y conecta las señales de los modelos indicados."""
+    for model in modelos:
+        _entidades.add(model._meta.label_lower)
+    for model in con_senales:
+        nombre = model._meta.label_lower
+        post_save.connect(invalidar_instancia, sender=model, dispatch_uid=f'readcache_save_{nombre}')
+        post_delete.connect(invalidar_instancia, sender=model, dispatch_uid=f'readcache_delete_{nombre}')
+
+
+class InvalidaCacheQuerySet(models.QuerySet):
+    """QuerySet que sube la versión de la caché en las operaciones masivas."""
+
+    def _hace_falta(self):
+        return activa() or cambio_masivo.has_listeners(self.model)
+
+    def _invalidar(self, duenos):
+        for user_id in duenos:
+            invalidar(user_id, self.model)
+        if duenos:
+            cambio_masivo.send(sender=self.model, duenos=duenos)
+
+    def _duenos(self):
+        if not self._hace_falta():
+            # Sin caché ni receptores no hace falta la consulta de los dueños
+            return set()
+        campo = getattr(self.model, 'campo_dueno', 'owner')
+        return set(self.order_by().values_list(campo, flat=True).distinct())
+
+    def update(self, **kwargs):
+        duenos = self._duenos()
+        filas = super().update(**kwargs)
+        self._invalidar(duenos)
+        return filas
+
+    def delete(self):
+        duenos = self._duenos()
+        resultado = super().delete()
+        self._invalidar(duenos)
+        return resultado
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        if self._hace_falta():
+            self._invalidar(duenos_de(self.model, objs))
+        return objs
+
+    def bulk_update(self, objs, *args, **kwargs):
+        filas = super().bulk_update(objs, *args, **kwargs)
+        if self._hace_falta():
+            self._invalidar(duenos_de(self.model, objs))
+        return filas
+
+
+def _copiable(data):
+    # ReturnList/ReturnDict guardan al serializador; en caché solo van los datos
+    if isinstance(data, dict):
+        return {clave: _copiable(valor) for clave, valor in data.items()}
+    if isinstance(data, list):
+        return [_copiable(valor) for valor in data]
+    return data
+
+
+class CachedReadMixin:
+    """
+    Sirve list/retrieve desde la caché cuando la versión no ha cambiado.
+    Va antes de ConditionalGetMixin: un acierto también responde 304 si el
+    cliente ya tiene el ETag guardado, sin tocar la base de datos.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self._leer(request, 'list', lambda: super(CachedReadMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._leer(request, 'retrieve', lambda: super(CachedReadMixin, self).retrieve(request, *args, **kwargs))
+
+    def _leer(self, request, accion, calcular):
+        if not activa():
+            return calcular()
+        entidad = self.get_queryset().model._meta.label_lower
+        user_id = request.user.pk
+        huella = hashlib.md5(
+            f'{accion}:{request.get_full_path()}:{request.accepted_renderer.format}'.encode()
+        ).hexdigest()
+        clave = f'lectura:{user_id}:{entidad}:{version(user_id, entidad)}:{huella}'
+
+        entrada = cache.get(clave)
+        if entrada is None:
+            _contar(entidad, 'miss')
+            response = calcular()
+            if response.status_code == 200:
+                cabeceras = {nombre: response[nombre] for nombre in CABECERAS if nombre in response}
+                cache.set(clave, {'data': _copiable(response.data), 'headers': cabeceras}, TTL_LECTURA)
+            response['X-Cache'] = 'miss'
+            return response
+
+        _contar(entidad, 'hit')
+        cabeceras = entrada['headers']
+        response = get_conditional_response(
+            request,
+            etag=cabeceras.get('ETag'),
+            last_modified=parse_http_date_safe(cabeceras.get('Last-Modified', '')),
+        ) or Response(entrada['data'])
+        for nombre, valor in cabeceras.items():
+            response[nombre] = valor
+        response['X-Cache'] = 'hit'
+        return response
@@ -0,0 +1,237 @@
+"""
+Utilidades para las pruebas de rendimiento de la API.
+
+Cada prueba siembra datos realistas para un usuario y llama a un endpoint
+midiendo dos cosas: cuántas consultas SQL hace y cuánto tarda. La prueba
+falla si:
+- las consultas pasan del presupuesto de la prueba o de las que se midieron
+  en la línea base (perf_baseline.json); así atrapamos los N+1 que se cuelan
+  al cambiar un serializador;
+- el tiempo pasa de la línea base por más de la tolerancia. La línea base es
+  la mediana de varias corridas y la tolerancia es holgada, porque el tiempo
+  depende de la máquina.
+
+Variables de entorno:
+- PERF_TIEMPO_AVISO=1: el tiempo fuera de la tolerancia solo avisa con un
+  warning (para máquinas lentas o cargadas); las consultas siguen fallando.
+- PERF_TOLERANCIA: factor permitido sobre la línea base (por defecto 3).
+- PERF_MARGEN_MS: margen fijo en milisegundos (por defecto 25).
+- PERF_ACTUALIZAR_BASE=1: guarda las consultas medidas y junta el tiempo con
+  los de las corridas anteriores (perf_muestras.json, las últimas
+  MUESTRAS_BASE) para guardar su mediana. Conviene correr la suite varias
+  veces seguidas.
+- PERF_REPORTE=<ruta>: escribe los tiempos y consultas medidos en un JSON.
+"""
+import datetime
+import json
+import os
+import statistics
+import time
+import warnings
+from decimal import Decimal
+from pathlib import Path
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from accounts import tokens
+from accounts.models import User
+from one_backend import readcache
+from accounts.streaks import reconstruir_usuario
+from spaces.models import Space
+from projects.models import Project
+from tasks.models import Task
+from habits.models import Habit, HabitLog
+from finanzas.models import Gasto, Presupuesto
+from finanzas.resumen import reconstruir as reconstruir_resumen
+from horarios.models import Clase
+
+LINEA_BASE = Path(__file__).resolve().parent / 'perf_baseline.json'
+# Tiempos de las últimas corridas con PERF_ACTUALIZAR_BASE (no va en git)
+MUESTRAS = Path(__file__).resolve().parent / 'perf_muestras.json'
+MUESTRAS_BASE = 5
+
+
+class TiempoExcedido(UserWarning):
+    """Un endpoint tardó más que su línea base (con PERF_TIEMPO_AVISO=1 no falla)."""
+
+
+def _leer_json(ruta):
+    try:
+        with open(ruta) as archivo:
+            return json.load(archivo)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _guardar_json(ruta, datos):
+    with open(ruta, 'w') as archivo:
+        json.dump(datos, archivo, indent=2, sort_keys=True)
+        archivo.write('\n')
+
+
+def sembrar_datos(user, tareas=60, proyectos=8, habitos=5, dias_habito=120,
+                  gastos=60, presupuestos=6, clases=10):
+    """Crea un conjunto de datos parecido al de un usuario con algunos meses de uso."""
+    hoy = datetime.date(2025, 3, 1)
+    prefijo = user.username
+
+    espacios = [
+        Space.objects.create(owner=user, name=nombre, id=f'{prefijo}-space-{nombre}')
+        for nombre in ('Personal', 'Escuela', 'Trabajo')
+    ]
+
+    Project.objects.bulk_create([
+        Project(
+            id=f'{prefijo}-project-{i}', owner=user, space=espacios[i % 3],
+            title=f'Proyecto {i}', due_date=hoy + datetime.timedelta(days=30),
+            project_tasks=[{'id': j, 'titulo': f'Paso {j}', 'completada': j % 2 == 0} for j in range(5)],
+        )
+        for i in range(proyectos)
+    ])
+
+    Task.objects.bulk_create([
+        Task(
+            id=f'{prefijo}-task-{i}', owner=user, space=espacios[i % 3],
+            title=f'Tarea {i}', date=hoy - datetime.timedelta(days=i % 45),
+            start_time=datetime.time(8 + i % 10, 0), end_time=datetime.time(9 + i % 10, 0),
+            status='done' if i % 3 == 0 else 'todo',
+        )
+        for i in range(tareas)
+    ])
+
+    habits = Habit.objects.bulk_create([
+        Habit(id=f'{prefijo}-habit-{i}', owner=user, space=espacios[0], name=f'Hábito {i}')
+        for i in range(habitos)
+    ])
+    HabitLog.objects.bulk_create([
+        HabitLog(
+            id=f'{habit.id}-log-{d}', habit=habit,
+            date=hoy - datetime.timedelta(days=d), done=d % 4 != 0,
+        )
+        for habit in habits
+        for d in range(dias_habito)
+    ])
+
+    Gasto.objects.bulk_create([
+        Gasto(
+            id=f'{prefijo}-gasto-{i}', owner=user, space=espacios[i % 3],
+            descripcion=f'Gasto {i}', categoria=('comida', 'transporte', 'escuela')[i % 3],
+            fecha=hoy - datetime.timedelta(days=i % 90), monto=Decimal('120.50'),
+        )
+        for i in range(gastos)
+    ])
+
+    Presupuesto.objects.bulk_create([
+        Presupuesto(
+            id=f'{prefijo}-presupuesto-{i}', owner=user, space=espacios[0],
+            mes=i % 12 + 1, anio=2025, monto=Decimal('5000'),
+        )
+        for i in range(presupuestos)
+    ])
+
+    Clase.objects.bulk_create([
+        Clase(
+            id=f'{prefijo}-clase-{i}', owner=user, space=espacios[1],
+            materia=f'Materia {i}', dia_semana=i % 5 + 1,
+            hora_inicio=datetime.time(7 + i % 6, 0), hora_fin=datetime.time(8 + i % 6, 30),
+        )
+        for i in range(clases)
+    ])
+
+    # Datos escritos hace rato: la última página del feed repite lo de los
+    # últimos segundos (MARGEN_CURSOR) y las pruebas esperan solo lo nuevo
+    for modelo in (Space, Project, Task, Habit, Gasto, Presupuesto, Clase):
+        modelo._base_manager.filter(owner=user).update(updated_at=F('updated_at') - datetime.timedelta(minutes=1))
+
+    # bulk_create no pasa por save(): las rachas y el resumen de gastos se calculan al final
+    reconstruir_usuario(user)
+    reconstruir_resumen(user)
+    return espacios
+
+
+# Un hasher rápido para que crear usuarios no domine el tiempo de la suite
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class PerfTestCase(APITestCase):
+    """
+    Caso base: siembra un usuario principal (más otro para verificar que
+    no se mezclan datos) e inicia sesión con él antes de cada prueba.
+    """
+    password = 'clave-segura-123'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='perf', email='perf@one.mx', password=cls.password
+        )
+        cls.otro = User.objects.create_user(
+            username='otro', email='otro@one.mx', password=cls.password
+        )
+        sembrar_datos(cls.user)
+        sembrar_datos(cls.otro, tareas=10, gastos=10)
+
+    def setUp(self):
+        # La caché local sobrevive entre pruebas y los ids de usuario se reciclan
+        cache.clear()
+        readcache.reiniciar_estadisticas()
+        tokens.limpiar_locales()
+        self.client.force_login(self.user)
+
+    def medir(self, nombre, metodo, url, max_consultas, data=None, esperado=200, headers=None):
+        """Llama al endpoint y revisa el presupuesto de consultas y de tiempo."""
+        llamar = getattr(self.client, metodo)
+        kwargs = {'format': 'json'} if data is not None else {}
+        if headers:
+            kwargs['headers'] = headers
+
+        with CaptureQueriesContext(connection) as consultas:
+            inicio = time.perf_counter()
+            response = llamar(url, data, **kwargs) if data is not None else llamar(url, **kwargs)
+            if response.streaming:
+                # El contenido se genera al consumirlo: se mide hasta terminar de leer
+                response.contenido = b''.join(response.streaming_content)
+            milisegundos = (time.perf_counter() - inicio) * 1000
+
+        self.assertEqual(response.status_code, esperado, getattr(response, 'data', None))
+        self.registrar(nombre, len(consultas), milisegundos)
+
+        sql = '\n'.join(q['sql'] for q in consultas.captured_queries)
+        self.assertLessEqual(
+            len(consultas), max_consultas,
+            f'{nombre}: {len(consultas)} consultas (presupuesto {max_consultas})\n{sql}'
+        )
+
+        base = _leer_json(LINEA_BASE).get(nombre)
+        if base is not None and not os.environ.get('PERF_ACTUALIZAR_BASE'):
+            self.assertLessEqual(
+                len(consultas), base['consultas'],
+                f'{nombre}: {len(consultas)} consultas (línea base {base["consultas"]})\n{sql}'
+            )
+            tolerancia = float(os.environ.get('PERF_TOLERANCIA', 3))
+            margen = float(os.environ.get('PERF_MARGEN_MS', 25))
+            limite = base['ms'] * tolerancia + margen
+            if milisegundos > limite:
+                mensaje = f'{nombre}: {milisegundos:.1f} ms (línea base {base["ms"]:.1f} ms, límite {limite:.1f} ms)'
+                if not os.environ.get('PERF_TIEMPO_AVISO'):
+                    self.fail(mensaje)
+                warnings.warn(mensaje, TiempoExcedido, stacklevel=2)
+        return response
+
+    def registrar(self, nombre, consultas, milisegundos):
+        if os.environ.get('PERF_ACTUALIZAR_BASE'):
+            muestras = _leer_json(MUESTRAS)
+            muestras[nombre] = (muestras.get(nombre, []) + [round(milisegundos, 1)])[-MUESTRAS_BASE:]
+            _guardar_json(MUESTRAS, muestras)
+            base = _leer_json(LINEA_BASE)
+            base[nombre] = {'consultas': consultas, 'ms': round(statistics.median(muestras[nombre]), 1)}
+            _guardar_json(LINEA_BASE, base)
+
+        ruta = os.environ.get('PERF_REPORTE')
+        if ruta:
+            reporte = _leer_json(ruta)
+            reporte[nombre] = {'consultas': consultas, 'ms': round(milisegundos, 1)}
+            _guardar_json(ruta, reporte)
@@ -0,0 +1,422 @@
+import datetime
+import io
+import json
+import pstats
+import shutil
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from accounts.models import User
+from habits.models import Habit, HabitLog
+from one_backend import metricas, perfilado, readcache
+from one_backend.db.sqlite_wal.base import DatabaseWrapper
+from one_backend.testing import PerfTestCase
+from spaces.models import Space
+from tasks.models import Task
+
+
+class DatosTestCase(APITestCase):
+    def setUp(self):
+        # La caché local sobrevive entre pruebas y los ids de usuario se reciclan
+        cache.clear()
+        readcache.reiniciar_estadisticas()
+        self.user = User.objects.create_user(username='ana', email='ana@one.mx')
+        self.client.force_login(self.user)
+        espacio = Space.objects.create(id='ana-personal', owner=self.user, name='Personal')
+        Task.objects.create(id='t1', owner=self.user, space=espacio, title='Leer', date='2025-03-01')
+        Task.objects.create(id='t2', owner=self.user, space=espacio, title='Correr', date='2025-03-01')
+        Habit.objects.create(id='h1', owner=self.user, space=espacio, name='Meditar')
+        HabitLog.objects.create(id='h1-1', habit_id='h1', date='2025-03-01')
+        # t2 es la más vieja: borrarla no mueve el máximo de updated_at
+        Task.objects.filter(pk='t1').update(updated_at=timezone.now() - datetime.timedelta(minutes=1))
+        Task.objects.filter(pk='t2').update(updated_at=timezone.now() - datetime.timedelta(minutes=10))
+
+
+class ConditionalGetPerfTests(PerfTestCase):
+    def test_list_not_modified(self):
+        etag = self.client.get(reverse('task-list'))['ETag']
+        # Solo sesión, usuario y el validador: nada se serializa
+        self.medir(
+            'task-list-304', 'get', reverse('task-list'), max_consultas=3,
+            esperado=304, headers={'If-None-Match': etag},
+        )
+
+    def test_detail_not_modified(self):
+        url = reverse('task-detail', args=['perf-task-1'])
+        etag = self.client.get(url)['ETag']
+        self.medir(
+            'task-detail-304', 'get', url, max_consultas=3,
+            esperado=304, headers={'If-None-Match': etag},
+        )
+
+
+class ConditionalGetTests(DatosTestCase):
+    def test_list_not_modified(self):
+        response = self.client.get(reverse('task-list'))
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('W/'))
+
+        response = self.client.get(reverse('task-list'), headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+
+    def test_list_etag_changes(self):
+        url = reverse('task-list')
+        etag = self.client.get(url)['ETag']
+
+        self.client.patch(reverse('task-detail', args=['t1']), {'status': 'done'}, format='json')
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        # Borrar una tarea vieja no mueve el máximo de updated_at, pero sí el conteo
+        etag = response['ETag']
+        Task.objects.filter(pk='t2').delete()
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_space_rename_changes_etags(self):
+        lista = reverse('task-list')
+        detalle = reverse('task-detail', args=['t1'])
+        etag_lista = self.client.get(lista)['ETag']
+        etag_detalle = self.client.get(detalle)['ETag']
+
+        self.client.patch(reverse('space-detail', args=['ana-personal']), {'name': 'Uni'}, format='json')
+        response = self.client.get(lista, headers={'If-None-Match': etag_lista})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({tarea['espacio'] for tarea in response.data}, {'Uni'})
+        response = self.client.get(detalle, headers={'If-None-Match': etag_detalle})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['espacio'], 'Uni')
+
+    def test_owner_email_changes_etag(self):
+        lista = reverse('task-list')
+        etag = self.client.get(lista)['ETag']
+        self.user.email = 'nuevo@example.com'
+        self.user.save()
+        response = self.client.get(lista, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]['owner_email'], 'nuevo@example.com')
+
+    def test_etag_per_filter(self):
+        todas = self.client.get(reverse('task-list'))['ETag']
+        filtradas = self.client.get(reverse('task-list') + '?status=done')['ETag']
+        self.assertNotEqual(todas, filtradas)
+
+    def test_if_modified_since_sees_deletes(self):
+        hace_rato = timezone.now() - datetime.timedelta(minutes=5)
+        Task.objects.filter(owner=self.user).update(updated_at=hace_rato)
+        Space.objects.filter(owner=self.user).update(updated_at=hace_rato)
+        url = reverse('task-list')
+        ultima = self.client.get(url)['Last-Modified']
+        response = self.client.get(url, headers={'If-Modified-Since': ultima})
+        self.assertEqual(response.status_code, 304)
+
+        self.client.delete(reverse('task-detail', args=['t2']))
+        response = self.client.get(url, headers={'If-Modified-Since': ultima})
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_without_tombstones_has_no_last_modified(self):
+        response = self.client.get(reverse('habit-log-list'))
+        self.assertIn('ETag', response)
+        self.assertNotIn('Last-Modified', response)
+
+    def test_detail_strong_etag(self):
+        url = reverse('task-detail', args=['t1'])
+        etag = self.client.get(url)['ETag']
+        self.assertFalse(etag.startswith('W/'))
+
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        self.client.patch(url, {'titulo': 'Otra'}, format='json')
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 200)
+
+
+@override_settings(LECTURA_CACHE=True)
+class ReadCachePerfTests(PerfTestCase):
+    def test_list_hit(self):
+        url = reverse('task-list')
+        self.client.get(url)
+        # Solo sesión y usuario: ni validador ni serialización
+        response = self.medir('task-list-cached', 'get', url, max_consultas=2)
+        self.assertEqual(response['X-Cache'], 'hit')
+
+    def test_hit_answers_not_modified(self):
+        url = reverse('task-detail', args=['perf-task-1'])
+        etag = self.client.get(url)['ETag']
+        self.medir(
+            'task-detail-cached-304', 'get', url, max_consultas=2,
+            esperado=304, headers={'If-None-Match': etag},
+        )
+
+
+@override_settings(LECTURA_CACHE=True)
+class ReadCacheTests(DatosTestCase):
+    def test_list_hit(self):
+        url = reverse('task-list')
+        self.assertEqual(self.client.get(url)['X-Cache'], 'miss')
+
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'hit')
+        self.assertEqual({tarea['id'] for tarea in response.data}, {'t1', 't2'})
+        self.assertEqual(readcache.estadisticas()['tasks.task'], {'hit': 1, 'miss': 1})
+
+    def test_hit_answers_not_modified(self):
+        url = reverse('task-detail', args=['t1'])
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual((response.status_code, response['X-Cache']), (304, 'hit'))
+
+    def test_write_invalidates(self):
+        url = reverse('task-list')
+        self.client.get(url)
+        self.client.patch(reverse('task-detail', args=['t1']), {'titulo': 'Nueva'}, format='json')
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'miss')
+        self.assertIn('Nueva', [tarea['titulo'] for tarea in response.data])
+
+    def test_bulk_operations_invalidate(self):
+        url = reverse('task-list')
+        self.client.get(url)
+        Task.objects.filter(owner=self.user).update(title='Masiva')
+        self.assertEqual({tarea['titulo'] for tarea in self.client.get(url).data}, {'Masiva'})
+
+        Task.objects.bulk_create([
+            Task(id='t3', owner=self.user, space_id='ana-personal', title='Extra', date='2025-03-01')
+        ])
+        self.assertEqual(len(self.client.get(url).data), 3)
+
+    def test_space_rename_invalidates_tasks(self):
+        url = reverse('task-detail', args=['t1'])
+        self.assertEqual(self.client.get(url).data['espacio'], 'Personal')
+        Space.objects.filter(pk='ana-personal').update(name='Casa')
+        self.assertEqual(self.client.get(url).data['espacio'], 'Casa')
+
+    @override_settings(LECTURA_CACHE=False)
+    def test_disabled_without_shared_cache(self):
+        url = reverse('task-list')
+        self.client.get(url)
+        response = self.client.get(url)
+        self.assertNotIn('X-Cache', response)
+        self.assertEqual(readcache.estadisticas(), {})
+
+    def test_other_user_not_affected(self):
+        self.client.get(reverse('task-list'))
+        otro = User.objects.create_user(username='beto', email='beto@one.mx')
+        self.client.force_login(otro)
+        response = self.client.get(reverse('task-list'))
+        self.assertEqual(response['X-Cache'], 'miss')
+        self.assertEqual(response.data, [])
+
+
+@override_settings(LECTURA_CACHE=True, METRICAS=True, METRICAS_TOKEN='secreto')
+class MetricasTests(DatosTestCase):
+    cabecera = {'Authorization': 'Bearer secreto'}
+
+    def setUp(self):
+        super().setUp()
+        metricas.registro.reiniciar()
+
+    def tiempos(self, response):
+        partes = {}
+        for parte in response['Server-Timing'].split(', '):
+            nombre, *atributos = parte.split(';')
+            partes[nombre] = dict(atributo.split('=', 1) for atributo in atributos)
+        return partes
+
+    def test_server_timing(self):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('task-list'))
+        tiempos = self.tiempos(response)
+        self.assertEqual(set(tiempos), {'total', 'db', 'ser', 'auth'})
+        self.assertEqual(tiempos['db']['desc'], f'"{len(consultas)} consultas"')
+        self.assertGreater(float(tiempos['ser']['dur']), 0)
+        self.assertGreaterEqual(float(tiempos['total']['dur']), float(tiempos['db']['dur']))
+
+    def test_prometheus_histograms(self):
+        self.client.get(reverse('task-list'))
+        self.client.get(reverse('task-list'))
+        self.client.patch(reverse('task-detail', args=['t1']), {'status': 'done'}, format='json')
+
+        response = self.client.get(reverse('metricas'), headers=self.cabecera)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        texto = response.content.decode()
+        self.assertIn('one_request_duration_seconds_count{route="task-list",method="GET"} 2', texto)
+        self.assertIn('one_request_duration_seconds_bucket{route="task-detail",method="PATCH",le="+Inf"} 1', texto)
+        self.assertIn('one_request_db_queries_total{route="task-list",method="GET"}', texto)
+        self.assertIn('one_readcache_requests_total{entity="tasks.task",result="miss"}', texto)
+        # La propia lectura de métricas no se cuenta
+        self.assertNotIn('route="metricas"', texto)
+
+    def test_token(self):
+        self.assertEqual(self.client.get(reverse('metricas')).status_code, 403)
+        response = self.client.get(reverse('metricas'), headers=self.cabecera)
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICAS_TOKEN='')
+    def test_not_served_without_token(self):
+        self.assertEqual(self.client.get(reverse('metricas')).status_code, 404)
+
+    def test_auth_and_list_serializer_timed(self):
+        clave = self.client.post(reverse('token-list'), {'nombre': 'm'}, format='json').data['token']
+        self.client.logout()
+        self.client.get(reverse('task-list'), headers={'Authorization': f'Token {clave}'})
+        # Server-Timing redondea a 0.1 ms; los contadores no
+        lineas = self.client.get(reverse('metricas'), headers=self.cabecera).content.decode().splitlines()
+        for nombre in ('one_request_auth_seconds_total', 'one_request_serializer_seconds_total'):
+            [linea] = [linea for linea in lineas if linea.startswith(f'{nombre}{{route="task-list",method="GET"}}')]
+            self.assertGreater(float(linea.split()[-1]), 0)
+
+    @override_settings(METRICAS=False)
+    def test_disabled(self):
+        self.client = self.client_class()
+        self.client.force_login(self.user)
+        self.assertNotIn('Server-Timing', self.client.get(reverse('task-list')))
+        self.assertEqual(self.client.get(reverse('metricas')).status_code, 404)
+
+
+class PerfiladoTests(DatosTestCase):
+    def setUp(self):
+        super().setUp()
+        self.carpeta = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.carpeta, ignore_errors=True)
+        self.ajustar()
+
+    def ajustar(self, **ajustes):
+        ajustes = {
+            'PERFILADO': True, 'PERFILADO_DIR': str(self.carpeta), 'PERFILADO_MUESTRA': 0,
+            'PERFILADO_LENTO_MS': 60_000, 'PERFILADO_TOKEN': 'depurar', 'PERFILADO_MAX': 200,
+            **ajustes,
+        }
+        contexto = self.settings(**ajustes)
+        contexto.enable()
+        self.addCleanup(contexto.disable)
+        # El middleware se carga con el primer request de cada cliente
+        self.client = self.client_class()
+        self.client.force_login(self.user)
+
+    def capturas(self):
+        return sorted(self.carpeta.iterdir())
+
+    def meta(self, captura):
+        return json.loads((captura / 'meta.json').read_text())
+
+    def test_fast_requests_are_not_saved(self):
+        self.client.get(reverse('habit-list'))
+        self.client.patch(reverse('habit-detail', args=['h1']), {'nombre': 'Leer'}, format='json')
+        self.assertEqual(self.capturas(), [])
+
+    def test_slow_habit_save(self):
+        self.ajustar(PERFILADO_LENTO_MS=1)
+        registros = self.client.get(reverse('habit-detail', args=['h1'])).data['registros']
+        registros['2025-03-02'] = {'completado': True, 'nota': ''}
+        for captura in self.capturas():
+            shutil.rmtree(captura)
+
+        response = self.client.patch(
+            reverse('habit-detail', args=['h1']), {'registros': registros}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        [captura] = self.capturas()
+        meta = self.meta(captura)
+        self.assertEqual((meta['ruta'], meta['metodo'], meta['motivo']), ('habit-detail', 'PATCH', 'lenta'))
+
+        # Las escrituras de hábitos siempre llevan cProfile, con el guardado del serializador dentro
+        funciones = pstats.Stats(str(captura / 'perfil.pstats')).stats
+        self.assertIn('update', {nombre for archivo, _, nombre in funciones if archivo.endswith('habits/serializers.py')})
+
+        salida = io.StringIO()
+        call_command('perfiles', '--dir', str(self.carpeta), '--ver', captura.name, stdout=salida)
+        self.assertIn('(partial_update)', salida.getvalue())
+
+        consultas = json.loads((captura / 'sql.json').read_text())
+        self.assertEqual(len(consultas), meta['consultas'])
+        self.assertFalse(any('params' in consulta for consulta in consultas))
+        self.assertTrue(any(consulta.get('plan') for consulta in consultas if consulta['sql'].startswith('SELECT')))
+
+    def test_sampler_only_while_profiling(self):
+        registrados = []
+
+        def vista(request):
+            registrados.append(threading.get_ident() in perfilado.muestreador._hilos)
+            return HttpResponse()
+
+        middleware = perfilado.PerfiladoMiddleware(vista)
+        with self.settings(PERFILADO=False):
+            middleware(RequestFactory().get('/'))
+        middleware(RequestFactory().get('/'))
+        self.assertEqual(registrados, [False, True])
+
+    def test_debug_header(self):
+        self.client.get(reverse('task-list'), headers={perfilado.CABECERA: 'otro'})
+        self.assertEqual(self.capturas(), [])
+
+        self.client.get(reverse('task-list'), headers={perfilado.CABECERA: 'depurar'})
+        [captura] = self.capturas()
+        self.assertEqual(self.meta(captura)['motivo'], 'cabecera')
+        self.assertTrue((captura / 'perfil.pstats').exists())
+
+    def test_rotation_and_summary(self):
+        self.ajustar(PERFILADO_MUESTRA=1, PERFILADO_MAX=2)
+        for _ in range(3):
+            self.client.get(reverse('project-list'))
+        self.assertEqual(len(self.capturas()), 2)
+
+        salida = io.StringIO()
+        call_command('perfiles', '--dir', str(self.carpeta), stdout=salida)
+        texto = salida.getvalue()
+        self.assertIn('GET    project-list', texto)
+        self.assertIn('muestra=2', texto)
+        self.assertIn('ncalls', texto)
+
+    def test_collapsed_stack(self):
+        pila = perfilado.colapsar(sys._getframe())
+        self.assertTrue(pila.endswith(f'{__name__}:test_collapsed_stack'))
+
+
+class SqliteWalTests(SimpleTestCase):
+    def conexion(self, carpeta, **opciones):
+        wrapper = DatabaseWrapper({
+            'ENGINE': 'one_backend.db.sqlite_wal', 'NAME': str(Path(carpeta) / 'wal.sqlite3'),
+            'OPTIONS': opciones, 'TIME_ZONE': None, 'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False,
+            'AUTOCOMMIT': True, 'ATOMIC_REQUESTS': False, 'TEST': {},
+        })
+        return wrapper
+
+    def test_pragmas_applied_on_connect(self):
+        with tempfile.TemporaryDirectory() as carpeta:
+            wrapper = self.conexion(carpeta, pragmas={'busy_timeout': 1234})
+            with wrapper.cursor() as cursor:
+                self.assertEqual(cursor.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+                self.assertEqual(cursor.execute('PRAGMA busy_timeout').fetchone()[0], 1234)
+                # synchronous=NORMAL es 1
+                self.assertEqual(cursor.execute('PRAGMA synchronous').fetchone()[0], 1)
+            wrapper.close()
+
+    def test_transactions_begin_immediate(self):
+        with tempfile.TemporaryDirectory() as carpeta:
+            wrapper = self.conexion(carpeta)
+            wrapper.ensure_connection()
+            with CaptureQueriesContext(wrapper) as consultas:
+                # Lo mismo que hace atomic() al abrir la transacción
+                wrapper.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+            self.assertEqual(consultas.captured_queries[0]['sql'], 'BEGIN IMMEDIATE')
+            self.assertTrue(wrapper.connection.in_transaction)
+            wrapper.rollback()
+            wrapper.set_autocommit(True)
+            wrapper.close()
@@ -0,0 +1,130 @@
+"""
+Upsert por id del cliente: PUT /<tipo>/<id>/ crea o actualiza.
+
+El frontend genera los ids (timestamps) y sincronizaba con un PATCH y, si
+respondía 404, un POST: dos peticiones y dos pasadas de permisos y
+serializador por cada objeto nuevo. Ahora:
+
+- Si los datos alcanzan para crear, se intenta primero el INSERT con
+  ON CONFLICT (id) DO NOTHING: un objeto nuevo queda en una sola sentencia.
+- Si el id ya existía la fila no se toca y seguimos como el PATCH de antes
+  (actualización parcial de la fila del usuario). Dos peticiones a la vez
+  con el mismo id nuevo: una inserta y la otra actualiza, sin IntegrityError.
+- Si el id es de otro usuario respondemos 409.
+
+No usamos ON CONFLICT DO UPDATE: las señales (rachas, resumen de gastos,
+capacidad) necesitan los valores anteriores de la fila, y el UPDATE del
+conflicto no los regresa. insertar() manda pre_save/post_save igual que
+Model.save(), así esas señales ven una alta normal.
+"""
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import sql
+from django.db.models.constants import OnConflict
+from django.db.models.signals import post_save, pre_save
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+
+from spaces.services import olvidar_resolver
+from .borrado import fue_borrado
+from .versiones import BORRADO, Conflicto
+
+
+class Existente(Exception):
+    """El INSERT no hizo nada: ya hay una fila con ese id."""
+
+
+class IdOcupado(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Ya existe un registro con este id'
+    default_code = 'conflict'
+
+
+def insertar(instance, using=None):
+    """INSERT ... ON CONFLICT (id) DO NOTHING. Regresa False si el id ya existía."""
+    model = type(instance)
+    meta = model._meta
+    using = using or router.db_for_write(model, instance=instance)
+    conexion = connections[using]
+    pre_save.send(sender=model, instance=instance, raw=False, using=using, update_fields=None)
+
+    # Con destino explícito solo el id cuenta como conflicto; los demás
+    # errores (NOT NULL, otras llaves únicas) siguen siendo IntegrityError
+    con_destino = conexion.features.supports_update_conflicts_with_target
+    query = sql.InsertQuery(model, on_conflict=None if con_destino else OnConflict.IGNORE)
+    query.insert_values(meta.local_concrete_fields, [instance])
+    [(texto, params)] = query.get_compiler(using=using).as_sql()
+    if con_destino:
+        texto = f'{texto} ON CONFLICT ({conexion.ops.quote_name(meta.pk.column)}) DO NOTHING'
+    with conexion.cursor() as cursor:
+        cursor.execute(texto, params)
+        insertado = cursor.rowcount == 1
+
+    if not insertado:
+        return False
+    instance._state.adding = False
+    instance._state.db = using
+    post_save.send(sender=model, instance=instance, created=True, update_fields=None, raw=False, using=using)
+    return True
+
+
+class UpsertSerializerMixin:
+    """Con context['upsert'], create() inserta con insertar() en lugar de save()."""
+
+    def create(self, validated_data):
+        if not self.context.get('upsert'):
+            return super().create(validated_data)
+        instance = self.Meta.model(**validated_data)
+        if not insertar(instance):
+            raise Existente(instance.pk)
+        return instance
+
+
+def guardar(serializer_class, queryset, pk, data, context, **extra):
+    """
+    Crea o actualiza el registro `pk` dentro de `queryset` (los del usuario).
+    Regresa (serializer, creado). Lanza ValidationError si los datos no
+    sirven para ninguna de las dos cosas e IdOcupado si el id es de otro.
+    """
+    data = {**dict(data.items()), 'id': pk}
+    creacion = serializer_class(data=dict(data), context={**context, 'upsert': True})
+    if creacion.is_valid():
+        try:
+            with transaction.atomic():
+                creacion.save(id=pk, **extra)
+            return creacion, True
+        except (Existente, IntegrityError):
+            # Ya existía, o son los campos de un cambio parcial que no
+            # alcanzan para una fila nueva: seguimos como actualización
+            if 'request' in context:
+                olvidar_resolver(context['request'])
+
+    instance = queryset.filter(pk=pk).first()
+    if instance is None:
+        if creacion.errors:
+            raise ValidationError(creacion.errors)
+        if 'request' in context and fue_borrado(queryset.model, pk, context['request'].user):
+            # Otro dispositivo lo borró: no lo revivimos con un cambio viejo
+            raise Conflicto(None, BORRADO)
+        raise IdOcupado()
+
+    actualizacion = serializer_class(instance, data=data, partial=True, context=context)
+    actualizacion.is_valid(raise_exception=True)
+    instance = actualizacion.save(**extra)
+    # Igual que UpdateModelMixin: los registros precargados ya no sirven
+    if getattr(instance, '_prefetched_objects_cache', None):
+        instance._prefetched_objects_cache = {}
+    return actualizacion, False
+
+
+class UpsertMixin:
+    """PUT crea el registro si el id no existe; PATCH sigue siendo solo actualizar."""
+
+    def update(self, request, *args, **kwargs):
+        if kwargs.get('partial'):
+            return super().update(request, *args, **kwargs)
+        pk = kwargs[self.lookup_url_kwarg or self.lookup_field]
+        serializer, creado = guardar(
+            self.get_serializer_class(), self.get_queryset(), pk, request.data, self.get_serializer_context()
+        )
+        return Response(serializer.data, status=status.HTTP_201_CREATED if creado else status.HTTP_200_OK)
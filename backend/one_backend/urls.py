@@ -8,15 +8,18 @@ from rest_framework.routers import DefaultRouter
 
 from spaces.views import SpaceViewSet
 from projects.views import ProjectViewSet
-from tasks.views import TaskViewSet
+from tasks.views import TaskViewSet, CapacityView
 from habits.views import HabitViewSet, HabitLogViewSet
-from finanzas.views import GastoViewSet, PresupuestoViewSet
+from finanzas.views import GastoViewSet, PresupuestoViewSet, ResumenFinanzasView
 from horarios.views import ClaseViewSet
 
-from accounts.views import RegisterView, LoginView, StreakView, UserViewSet, UserMeView
+from accounts.views import ApiTokenViewSet, RegisterView, LoginView, StreakView, UserViewSet, UserMeView
+from sync.views import SyncBatchView, SyncChangesView, SyncSnapshotView
+from .metricas import metricas_view
 
 router = DefaultRouter()
 router.register(r'users', UserViewSet)
+router.register(r'tokens', ApiTokenViewSet, basename='token')
 router.register(r'spaces', SpaceViewSet, basename='space')
 router.register(r'projects', ProjectViewSet, basename='project')
 router.register(r'tasks', TaskViewSet, basename='task')
@@ -33,4 +36,10 @@ urlpatterns = [
     path('api/login/', LoginView.as_view(), name='login'),
     path('api/me/', UserMeView.as_view(), name='user-me'),
     path('api/streak/', StreakView.as_view(), name='streak'),
+    path('api/capacity/', CapacityView.as_view(), name='capacity'),
+    path('api/finanzas/resumen/', ResumenFinanzasView.as_view(), name='finanzas-resumen'),
+    path('api/sync/batch/', SyncBatchView.as_view(), name='sync-batch'),
+    path('api/sync/changes/', SyncChangesView.as_view(), name='sync-changes'),
+    path('api/sync/snapshot/', SyncSnapshotView.as_view(), name='sync-snapshot'),
+    path('api/_metrics', metricas_view, name='metricas'),
 ]
@@ -0,0 +1,29 @@
+"""
+URLs para ASGI: las mismas de urls.py, pero las rutas que usa la
+sincronización (lote, feed, /api/me/, /api/streak/) apuntan a sus versiones
+async. Se activa con SYNC_ASYNC=1 (lo pone asgi.py).
+
+Los avisos SSE (/api/sync/events/) solo existen aquí: con WSGI cada conexión
+abierta ocuparía un hilo completo.
+"""
+from django.urls import path
+
+from sync.async_views import (
+    AsyncStreakView, AsyncSyncBatchView, AsyncSyncChangesView, AsyncSyncEventsView, AsyncUserMeView,
+)
+from .urls import urlpatterns as urlpatterns_wsgi
+
+ASYNC = {
+    'user-me': AsyncUserMeView,
+    'streak': AsyncStreakView,
+    'sync-batch': AsyncSyncBatchView,
+    'sync-changes': AsyncSyncChangesView,
+}
+
+urlpatterns = [
+    path(str(patron.pattern), ASYNC[patron.name].as_view(), name=patron.name)
+    if getattr(patron, 'name', None) in ASYNC else patron
+    for patron in urlpatterns_wsgi
+]
+
+urlpatterns.append(path('api/sync/events/', AsyncSyncEventsView.as_view(), name='sync-events'))
@@ -0,0 +1,126 @@
+"""
+Concurrencia optimista con el campo `version` de los modelos sincronizados.
+
+Antes un cambio era leer la fila y guardarla completa con save(): si dos
+dispositivos editaban lo mismo, el último pisaba al primero sin enterarse.
+Ahora:
+
+- El cliente manda la `version` que conoce junto con el cambio (la recibe en
+  cada respuesta). Si no la manda se usa la de la fila que acabamos de leer.
+- Solo se escriben las columnas que cambiaron, en una sola sentencia:
+      UPDATE ... SET <cambios>, version = version + 1
+      WHERE id = ... AND version = ...
+  Sin candados: si otro escribió antes, el UPDATE no toca ninguna fila.
+- En ese caso respondemos 409 con la fila actual del servidor, para que el
+  cliente decida con datos frescos.
+
+La lectura previa (get_object o la precarga del lote) se queda: delimita las
+filas del usuario, da el cuerpo de la respuesta y los valores anteriores que
+usan las señales (rachas, resumen de gastos, capacidad). Como el UPDATE va
+condicionado a la versión que leímos, esos valores siguen siendo ciertos
+cuando se mandan las señales.
+"""
+from django.db.models import F
+from django.db.models.signals import post_save, pre_save
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+BORRADO = 'El registro fue borrado'
+
+
+class Conflicto(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'El registro cambió en el servidor'
+    default_code = 'conflict'
+
+    def __init__(self, actual=None, detail=None):
+        super().__init__(detail)
+        # La fila como está ahora (None si ya no existe)
+        self.actual = actual
+
+
+def cambios(instance, validated_data):
+    """{campo: valor} de lo que de verdad cambia (nunca el id)."""
+    meta = instance._meta
+    resultado = {}
+    for attr, valor in validated_data.items():
+        campo = meta.get_field(attr)
+        if campo.primary_key or not campo.concrete or campo.many_to_many:
+            continue
+        if campo.is_relation:
+            # Comparamos por id para no cargar el objeto relacionado
+            actual, nuevo = getattr(instance, campo.attname), getattr(valor, 'pk', valor)
+        else:
+            actual, nuevo = getattr(instance, attr), valor
+        if actual != nuevo:
+            resultado[campo] = valor
+    return resultado
+
+
+def actualizar(instance, validated_data, esperada=None, tocar=False):
+    """
+    Aplica validated_data a la fila de `instance` si sigue en la versión
+    `esperada` (por defecto la que tiene la instancia). Lanza Conflicto si no.
+    Con tocar=True sube version y updated_at aunque no cambie ninguna columna
+    (lo que cambió vive en otra tabla, p. ej. los registros de un hábito).
+    """
+    if esperada is None:
+        esperada = instance.version
+    if esperada != instance.version:
+        # Lo que leímos ya es más nuevo de lo que conoce el cliente
+        raise Conflicto(instance)
+
+    campos = cambios(instance, validated_data)
+    if not campos and not tocar:
+        return instance
+
+    model = type(instance)
+    using = instance._state.db
+    pre_save.send(sender=model, instance=instance, raw=False, using=using, update_fields=None)
+    valores = {campo.name: valor for campo, valor in campos.items()}
+    for campo in instance._meta.concrete_fields:
+        if getattr(campo, 'auto_now', False):
+            valores[campo.name] = campo.pre_save(instance, add=False)
+
+    # _base_manager: la caché de lectura se invalida con el post_save de abajo
+    filas = model._base_manager.using(using).filter(pk=instance.pk, version=esperada).update(
+        version=F('version') + 1, **valores
+    )
+    if not filas:
+        actual = model._default_manager.using(using).filter(pk=instance.pk).first()
+        if actual is None or getattr(actual, 'deleted', False):
+            # Otro dispositivo lo borró: no hay fila actual que mandar
+            raise Conflicto(None, BORRADO)
+        raise Conflicto(actual)
+
+    for nombre, valor in valores.items():
+        setattr(instance, nombre, valor)
+    instance.version = esperada + 1
+    post_save.send(
+        sender=model, instance=instance, created=False, raw=False, using=using,
+        update_fields=frozenset(valores) | {'version'},
+    )
+    return instance
+
+
+class VersionSerializerMixin:
+    """update() con compare-and-swap sobre `version`; en create() la versión la pone el servidor."""
+
+    def create(self, validated_data):
+        validated_data.pop('version', None)
+        return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        esperada = validated_data.pop('version', None)
+        return actualizar(instance, validated_data, esperada)
+
+
+class VersionMixin:
+    """Responde los Conflicto con 409 y la fila actual serializada."""
+
+    def handle_exception(self, exc):
+        if isinstance(exc, Conflicto):
+            actual = self.get_serializer(exc.actual).data if exc.actual is not None else None
+            return Response({'detail': exc.detail, 'actual': actual}, status=exc.status_code)
+        return super().handle_exception(exc)
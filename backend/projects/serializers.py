@@ -1,8 +1,11 @@
 from rest_framework import serializers
+from one_backend.metricas import MedirSerializerMixin
+from one_backend.upsert import UpsertSerializerMixin
+from one_backend.versiones import VersionSerializerMixin
 from .models import Project
-from spaces.models import Space
+from spaces.services import resolver_espacio
 
-class ProjectSerializer(serializers.ModelSerializer):
+class ProjectSerializer(MedirSerializerMixin, VersionSerializerMixin, UpsertSerializerMixin, serializers.ModelSerializer):
     id = serializers.CharField(required=False)
     # Mapeo de claves para el frontend (nombres en español)
     titulo = serializers.CharField(source='title', required=False)
@@ -19,7 +22,7 @@ class ProjectSerializer(serializers.ModelSerializer):
         model = Project
         fields = [
             'id', 'titulo', 'objetivo', 'progreso', 'color', 
-            'espacio', 'espacio_nombre', 'descripcion', 'etiquetas', 'notas', 'tareas', 'owner_email'
+            'espacio', 'espacio_nombre', 'descripcion', 'etiquetas', 'notas', 'tareas', 'owner_email', 'version'
         ]
 
     def to_internal_value(self, data):
@@ -31,7 +34,7 @@ class ProjectSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         user = self.context['request'].user
         espacio_name = validated_data.pop('espacio', 'Personal')
-        space, _ = Space.objects.get_or_create(owner=user, name=espacio_name)
+        space = resolver_espacio(self.context['request'], espacio_name)
         
         validated_data['space'] = space
         validated_data['owner'] = user
@@ -40,9 +43,8 @@ class ProjectSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         if 'espacio' in validated_data:
             espacio_name = validated_data.pop('espacio')
-            user = self.context['request'].user
-            space, _ = Space.objects.get_or_create(owner=user, name=espacio_name)
-            instance.space = space
+            space = resolver_espacio(self.context['request'], espacio_name)
+            validated_data['space'] = space
         return super().update(instance, validated_data)
 
     def to_representation(self, instance):
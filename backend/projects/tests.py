@@ -1,3 +1,26 @@
-from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from one_backend.testing import PerfTestCase
+
+
+class ProjectPerfTests(PerfTestCase):
+    def test_list(self):
+        response = self.medir('project-list', 'get', reverse('project-list'), max_consultas=4)
+        self.assertEqual(len(response.data), 8)
+
+    def test_retrieve(self):
+        self.medir('project-detail', 'get', reverse('project-detail', args=['perf-project-1']), max_consultas=3)
+
+    def test_create(self):
+        data = {
+            'id': 1735689600000, 'titulo': 'Tesis', 'espacio': 'Escuela',
+            'tareas': [{'id': 1, 'titulo': 'Índice', 'completada': False}],
+        }
+        self.medir('project-create', 'post', reverse('project-list'), max_consultas=4, data=data, esperado=201)
+
+    def test_update(self):
+        data = {'progreso': 40, 'notas': 'Avance'}
+        self.medir('project-update', 'patch', reverse('project-detail', args=['perf-project-1']), max_consultas=4, data=data)
+
+    def test_delete(self):
+        self.medir('project-delete', 'delete', reverse('project-detail', args=['perf-project-1']), max_consultas=4, esperado=204)
@@ -1,8 +1,13 @@
 from rest_framework import viewsets, permissions
+from one_backend.borrado import BorradoLogicoMixin
+from one_backend.conditional import ConditionalGetMixin
+from one_backend.readcache import CachedReadMixin
+from one_backend.upsert import UpsertMixin
+from one_backend.versiones import VersionMixin
 from .models import Project
 from .serializers import ProjectSerializer
 
-class ProjectViewSet(viewsets.ModelViewSet):
+class ProjectViewSet(BorradoLogicoMixin, VersionMixin, UpsertMixin, CachedReadMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     # Usamos el serializador de Proyectos para convertir los datos
     serializer_class = ProjectSerializer
     # Solo permitimos que usuarios logueados vean esto
@@ -10,5 +15,5 @@ class ProjectViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         # Filtramos los proyectos para que solo salgan los del usuario actual
-        return Project.objects.filter(owner=self.request.user)
+        return Project.objects.filter(owner=self.request.user, deleted=False).select_related('space', 'owner')
 
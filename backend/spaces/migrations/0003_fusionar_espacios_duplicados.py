@@ -0,0 +1,63 @@
+# Generated by Django 4.2.30 on 2026-10-18 19:54
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fusionar_espacios_duplicados(apps, schema_editor):
+    """
+    Antes de crear la restricción única (0004) juntamos los espacios repetidos
+    (mismo dueño y nombre) en el más antiguo y movemos ahí sus registros.
+    """
+    Space = apps.get_model('spaces', 'Space')
+    Presupuesto = apps.get_model('finanzas', 'Presupuesto')
+    relacionados = [
+        apps.get_model('projects', 'Project'),
+        apps.get_model('tasks', 'Task'),
+        apps.get_model('habits', 'Habit'),
+        apps.get_model('finanzas', 'Gasto'),
+        apps.get_model('horarios', 'Clase'),
+    ]
+
+    duplicados = (
+        Space.objects.values('owner', 'name')
+        .annotate(total=Count('id'))
+        .filter(total__gt=1)
+    )
+    for grupo in duplicados:
+        espacios = list(
+            Space.objects.filter(owner_id=grupo['owner'], name=grupo['name']).order_by('created_at', 'id')
+        )
+        conservar = espacios[0]
+        sobrantes = [espacio.pk for espacio in espacios[1:]]
+
+        # Un presupuesto por (espacio, mes, año): si ya existe, gana el del espacio que se queda
+        ocupados = set(Presupuesto.objects.filter(space=conservar).values_list('mes', 'anio'))
+        for presupuesto in Presupuesto.objects.filter(space_id__in=sobrantes).order_by('-updated_at'):
+            if (presupuesto.mes, presupuesto.anio) in ocupados:
+                presupuesto.delete()
+                continue
+            ocupados.add((presupuesto.mes, presupuesto.anio))
+            presupuesto.space = conservar
+            presupuesto.save(update_fields=['space'])
+
+        for model in relacionados:
+            model.objects.filter(space_id__in=sobrantes).update(space=conservar)
+
+        Space.objects.filter(pk__in=sobrantes).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('spaces', '0002_alter_space_id'),
+        ('projects', '0004_owner_updated_index'),
+        ('tasks', '0003_owner_updated_index'),
+        ('habits', '0004_owner_updated_index'),
+        ('finanzas', '0002_owner_updated_index'),
+        ('horarios', '0002_owner_updated_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(fusionar_espacios_duplicados, migrations.RunPython.noop),
+    ]
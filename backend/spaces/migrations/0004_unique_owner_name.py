@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-18 19:54
+
+from django.db import migrations, models
+
+
+# Separada de la fusión (0003): en PostgreSQL un ALTER TABLE no puede ir en
+# la misma transacción que borró filas con llaves foráneas pendientes
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('spaces', '0003_fusionar_espacios_duplicados'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='space',
+            constraint=models.UniqueConstraint(fields=('owner', 'name'), name='unique_space_owner_name'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-18 20:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('spaces', '0004_unique_owner_name'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='space',
+            index=models.Index(condition=models.Q(('deleted', False)), fields=['owner', 'updated_at'], name='space_owner_vivos_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='space',
+            index=models.Index(condition=models.Q(('deleted', True)), fields=['updated_at'], name='space_borrados_idx'),
+        ),
+    ]
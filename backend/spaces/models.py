@@ -2,6 +2,8 @@ from django.db import models
 from django.conf import settings
 import uuid
 
+from one_backend.readcache import InvalidaCacheQuerySet
+
 class Space(models.Model):
     id = models.CharField(max_length=50, primary_key=True, default=uuid.uuid4, editable=False)
     owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='spaces')
@@ -14,5 +16,16 @@ class Space(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     deleted = models.BooleanField(default=False)
 
+    objects = InvalidaCacheQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'name'], name='unique_space_owner_name'),
+        ]
+        indexes = [
+            models.Index(fields=['owner', 'updated_at'], condition=models.Q(deleted=False), name='space_owner_vivos_idx'),
+            models.Index(fields=['updated_at'], condition=models.Q(deleted=True), name='space_borrados_idx'),
+        ]
+
     def __str__(self):
         return f"{self.name} ({self.owner})"
@@ -1,7 +1,10 @@
 from rest_framework import serializers
+from one_backend.metricas import MedirSerializerMixin
+from one_backend.upsert import UpsertSerializerMixin
+from one_backend.versiones import VersionSerializerMixin
 from .models import Space
 
-class SpaceSerializer(serializers.ModelSerializer):
+class SpaceSerializer(MedirSerializerMixin, VersionSerializerMixin, UpsertSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Space
         fields = '__all__'
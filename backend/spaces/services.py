@@ -0,0 +1,78 @@
+from django.core.cache import cache
+from .models import Space
+
+# Los espacios casi nunca cambian; el TTL cubre a otros procesos que no
+# reciben nuestras señales de invalidación
+CACHE_TTL = 300
+
+CAMPOS = [field.attname for field in Space._meta.concrete_fields]
+
+
+def clave_cache(user_id):
+    return f'spaces:{user_id}'
+
+
+def invalidar_cache(user_id):
+    cache.delete(clave_cache(user_id))
+
+
+class SpaceResolver:
+    """
+    Convierte nombres de espacio ('Personal', 'Escuela'...) en instancias de Space.
+    Carga todos los espacios del usuario una sola vez (desde la caché o con
+    una sola consulta) y solo toca la base de datos para crear los que faltan.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self._espacios = None
+
+    def espacios(self):
+        if self._espacios is None:
+            consulta = Space.objects.filter(owner=self.user)
+            filas = cache.get(clave_cache(self.user.pk))
+            if filas is None:
+                filas = list(consulta.values_list(*CAMPOS))
+                cache.set(clave_cache(self.user.pk), filas, CACHE_TTL)
+            self._espacios = {}
+            for fila in filas:
+                # Con la base que el router elige para leer, igual que si viniera de la consulta
+                espacio = Space.from_db(consulta.db, CAMPOS, fila)
+                self._espacios[espacio.name] = espacio
+        return self._espacios
+
+    def resolver(self, nombre):
+        espacios = self.espacios()
+        if nombre not in espacios:
+            # get_or_create reintenta el get si otro proceso lo creó primero
+            espacio, _ = Space.objects.get_or_create(owner=self.user, name=nombre)
+            espacios[nombre] = espacio
+        if espacios[nombre].deleted:
+            espacios[nombre] = self.revivir(espacios[nombre])
+        return espacios[nombre]
+
+    def revivir(self, espacio):
+        # Un espacio borrado sigue ocupando su nombre (owner, name): si lo
+        # vuelven a usar lo recuperamos, vacío (lo que tenía sigue borrado)
+        from one_backend.versiones import Conflicto, actualizar
+
+        try:
+            return actualizar(espacio, {'deleted': False})
+        except Conflicto:
+            # La copia en caché estaba vieja
+            espacio = Space.objects.get(pk=espacio.pk)
+            return actualizar(espacio, {'deleted': False}) if espacio.deleted else espacio
+
+
+def resolver_espacio(request, nombre):
+    # Un resolver por petición (o por lote de sync, que comparte la petición)
+    resolver = getattr(request, '_space_resolver', None)
+    if resolver is None or resolver.user.pk != request.user.pk:
+        resolver = SpaceResolver(request.user)
+        request._space_resolver = resolver
+    return resolver.resolver(nombre)
+
+
+def olvidar_resolver(request):
+    # Tras deshacer una transacción los espacios creados en ella ya no existen
+    request._space_resolver = None
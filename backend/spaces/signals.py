@@ -0,0 +1,51 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Space
+from .services import invalidar_cache
+
+
+@receiver(post_save, sender=Space)
+@receiver(post_delete, sender=Space)
+def invalidar_espacios(sender, instance, **kwargs):
+    invalidar_cache(instance.owner_id)
+
+
+@receiver(post_save, sender=Space)
+def borrar_contenido(sender, instance, update_fields=None, raw=False, **kwargs):
+    """
+    Borrado lógico de un espacio: lo que tiene dentro también se marca como
+    borrado (antes se iba en cascada). Es un UPDATE por tabla, sin señales,
+    así que aquí mismo se recalculan rachas, resumen de gastos y capacidad.
+    """
+    if raw or not instance.deleted or not update_fields or 'deleted' not in update_fields:
+        return
+
+    from accounts import streaks
+    from finanzas import resumen
+    from finanzas.models import Gasto, Presupuesto
+    from habits.models import Habit
+    from horarios.models import Clase
+    from one_backend.borrado import borrar_en_bloque
+    from projects.models import Project
+    from tasks.capacity import invalidar_clases, invalidar_semana
+    from tasks.models import Task
+
+    owner_id = instance.owner_id
+    fechas = set(Task.objects.filter(space=instance, deleted=False).values_list('date', flat=True).distinct())
+    habitos = list(Habit.objects.filter(space=instance, deleted=False).values_list('pk', flat=True))
+
+    if borrar_en_bloque(Task.objects.filter(space=instance)):
+        streaks.reconstruir(owner_id, streaks.TAREAS)
+        for fecha in fechas:
+            invalidar_semana(owner_id, fecha)
+    if borrar_en_bloque(Habit.objects.filter(space=instance)):
+        for habit_id in habitos:
+            streaks.olvidar(owner_id, streaks.clave_habito(habit_id))
+        streaks.reconstruir(owner_id, streaks.HABITOS)
+    if borrar_en_bloque(Gasto.objects.filter(space=instance)):
+        resumen.reconstruir(instance.owner)
+    if borrar_en_bloque(Clase.objects.filter(space=instance)):
+        invalidar_clases(owner_id)
+    borrar_en_bloque(Project.objects.filter(space=instance))
+    borrar_en_bloque(Presupuesto.objects.filter(space=instance))
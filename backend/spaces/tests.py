@@ -1,3 +1,80 @@
-from django.test import TestCase
+import datetime
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db.models import F
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from accounts.models import User
+from finanzas.models import Gasto
+from habits.models import Habit, HabitLog
+from one_backend.testing import PerfTestCase
+from spaces.models import Space
+from tasks.models import Task
+
+
+class SpacePerfTests(PerfTestCase):
+    def test_list(self):
+        response = self.medir('space-list', 'get', reverse('space-list'), max_consultas=4)
+        self.assertEqual(len(response.data), 3)
+
+    def test_retrieve(self):
+        self.medir('space-detail', 'get', reverse('space-detail', args=['perf-space-Personal']), max_consultas=3)
+
+    def test_create(self):
+        data = {'owner': self.user.pk, 'name': 'Gimnasio', 'color': '#FF0000'}
+        self.medir('space-create', 'post', reverse('space-list'), max_consultas=5, data=data, esperado=201)
+
+    def test_update(self):
+        url = reverse('space-detail', args=['perf-space-Personal'])
+        self.medir('space-update', 'patch', url, max_consultas=5, data={'color': '#00FF00'})
+
+    def test_delete(self):
+        url = reverse('space-detail', args=['perf-space-Trabajo'])
+        self.medir('space-delete', 'delete', url, max_consultas=27, esperado=204)
+
+
+class SpaceDeleteTests(APITestCase):
+    url = reverse('space-detail', args=['ana-trabajo'])
+
+    def setUp(self):
+        # Los ids de usuario se reciclan entre pruebas y la caché de espacios no
+        cache.clear()
+        self.user = User.objects.create_user(username='ana', email='ana@one.mx')
+        self.client.force_authenticate(self.user)
+        personal = Space.objects.create(id='ana-personal', owner=self.user, name='Personal')
+        trabajo = Space.objects.create(id='ana-trabajo', owner=self.user, name='Trabajo')
+
+        hoy = datetime.date(2025, 3, 1)
+        Task.objects.create(id='t1', owner=self.user, space=personal, title='Leer', date=hoy)
+        Task.objects.create(id='t2', owner=self.user, space=trabajo, title='Informe', date=hoy)
+        Task.objects.create(id='t3', owner=self.user, space=trabajo, title='Junta', date=hoy)
+        Gasto.objects.create(
+            id='g1', owner=self.user, space=trabajo, descripcion='Taxi', fecha=hoy, monto=Decimal('80'),
+        )
+        Habit.objects.create(id='h1', owner=self.user, space=trabajo, name='Inbox cero')
+        HabitLog.objects.create(id='h1-1', habit_id='h1', date=hoy)
+        # Escritos hace rato: la última página del feed repite lo de los últimos segundos
+        for modelo in (Task, Gasto, Habit):
+            modelo.objects.filter(owner=self.user).update(updated_at=F('updated_at') - datetime.timedelta(minutes=1))
+
+    def test_delete_hides_content(self):
+        self.assertEqual(self.client.delete(self.url).status_code, 204)
+
+        self.assertEqual(set(Task.objects.filter(deleted=True).values_list('pk', flat=True)), {'t2', 't3'})
+        self.assertTrue(Gasto.objects.get(pk='g1').deleted)
+        self.assertTrue(Habit.objects.get(pk='h1').deleted)
+        self.assertEqual([t['id'] for t in self.client.get(reverse('task-list')).data], ['t1'])
+        # Los registros de los hábitos se quedan hasta compactar
+        self.assertTrue(HabitLog.objects.filter(pk='h1-1').exists())
+
+    def test_feed_sends_content_deletes(self):
+        cursor = self.client.get(reverse('sync-changes')).data['cursor']
+        self.client.delete(self.url)
+        cambios = self.client.get(reverse('sync-changes'), {'since': cursor}).data['changes']
+        # Los espacios no van en el feed; sí todo lo que tenían adentro
+        self.assertEqual(
+            {(c['type'], c['id'], c['deleted']) for c in cambios},
+            {('tasks', 't2', True), ('tasks', 't3', True), ('gastos', 'g1', True), ('habits', 'h1', True)},
+        )
@@ -2,12 +2,17 @@ from rest_framework import viewsets
 from .models import Space
 from .serializers import SpaceSerializer
 from rest_framework.permissions import IsAuthenticated
+from one_backend.borrado import BorradoLogicoMixin
+from one_backend.conditional import ConditionalGetMixin
+from one_backend.readcache import CachedReadMixin
+from one_backend.upsert import UpsertMixin
+from one_backend.versiones import VersionMixin
 
-class SpaceViewSet(viewsets.ModelViewSet):
+class SpaceViewSet(BorradoLogicoMixin, VersionMixin, UpsertMixin, CachedReadMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Space.objects.all()
     serializer_class = SpaceSerializer
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
         # Devolver los espacios del usuario actual
-        return Space.objects.filter(owner=self.request.user)
+        return Space.objects.filter(owner=self.request.user, deleted=False)
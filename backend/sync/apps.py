@@ -1,6 +1,33 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class SyncConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'sync'
+
+    def ready(self):
+        from accounts.models import User
+        from one_backend import readcache
+        from spaces.models import Space
+        from .registry import ENTIDADES, TIPOS_FEED
+        from .signals import avisar_borrado, avisar_guardado, registrar_tombstone
+
+        # Caché de lectura: HabitLog se invalida por su QuerySet y por el hábito
+        modelos = [ENTIDADES[tipo]['model'] for tipo in TIPOS_FEED] + [Space]
+        readcache.conectar(
+            *modelos, ENTIDADES['habit-logs']['model'],
+            con_senales=modelos + [User],
+        )
+
+        for tipo in TIPOS_FEED:
+            post_delete.connect(
+                registrar_tombstone,
+                sender=ENTIDADES[tipo]['model'],
+                dispatch_uid=f'sync_tombstone_{tipo}'
+            )
+
+        # Avisos para /api/sync/events/ (los borrados avisan desde registrar_tombstone)
+        for model in modelos:
+            post_save.connect(avisar_guardado, sender=model, dispatch_uid=f'sync_aviso_{model._meta.label_lower}')
+        post_delete.connect(avisar_borrado, sender=Space, dispatch_uid='sync_aviso_borrado_space')
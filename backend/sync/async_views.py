@@ -0,0 +1,233 @@
+"""
+Rutas de sincronización para ASGI (one_backend/asgi.py).
+
+Cuando un salón completo se reconecta a la vez, las vistas síncronas dejan
+un hilo bloqueado por petición esperando a la base de datos y el resto hace
+fila. Estas versiones async atienden las lecturas con el ORM async de Django
+y mandan a hilos solo lo que todavía no puede ser async (autenticación,
+serializadores que escriben, transacciones del lote).
+
+Los hilos tienen tope (SYNC_ASYNC_HILOS): en una avalancha las peticiones de
+más esperan en el loop, que es barato, en lugar de abrir un hilo y una
+conexión a la base cada una. Con WSGI se siguen usando las vistas de views.py.
+"""
+import asyncio
+import weakref
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+from accounts.serializers import UserSerializer
+from accounts.streaks import arachas_actuales
+from accounts.views import RACHA_VACIA, UserMeView, datos_racha
+from .broker import obtener_broker
+from .views import (
+    CursorVencido, SyncBatchView, armar_pagina, codificar_cursor, consultas_feed, cursor_siguiente, cursor_vigente,
+    decodificar_cursor, parametros_feed, serializar_cambios,
+)
+
+# Un semáforo por event loop (asyncio no deja compartirlos entre loops)
+_semaforos = weakref.WeakKeyDictionary()
+
+
+def _semaforo():
+    loop = asyncio.get_running_loop()
+    if loop not in _semaforos:
+        _semaforos[loop] = asyncio.Semaphore(getattr(settings, 'SYNC_ASYNC_HILOS', 8))
+    return _semaforos[loop]
+
+
+async def en_hilo(funcion, *args, **kwargs):
+    """Corre código síncrono en un hilo, con a lo más SYNC_ASYNC_HILOS a la vez."""
+    async with _semaforo():
+        return await sync_to_async(funcion)(*args, **kwargs)
+
+
+def respuesta(data, codigo=status.HTTP_200_OK):
+    # Mismo JSON que el JSONRenderer de DRF (fechas, Decimal, sin escapar acentos)
+    return JsonResponse(
+        data, status=codigo, safe=False, encoder=JSONEncoder, json_dumps_params={'ensure_ascii': False}
+    )
+
+
+def autenticar(request):
+    """Usuario con las mismas clases de autenticación que la API, o AuthenticationFailed."""
+    drf = Request(request, authenticators=[clase() for clase in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+    user = drf.user
+    # Los serializadores reciben request.user como en las vistas de DRF
+    request.user = user
+    return drf
+
+
+def _vista_sync(vista, request):
+    response = vista(request)
+    response.render()
+    return response
+
+
+class AsyncSyncView(View):
+    """Base: autentica en un hilo y responde 401 como DRF si no hay usuario."""
+    requiere_sesion = True
+    vista_sync = None
+
+    @method_decorator(csrf_exempt)
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            self.drf_request = await en_hilo(autenticar, request)
+        except exceptions.AuthenticationFailed as error:
+            return self.no_autenticado(error)
+        if self.requiere_sesion and not request.user.is_authenticated:
+            return self.no_autenticado(exceptions.NotAuthenticated())
+        return await super().dispatch(request, *args, **kwargs)
+
+    def no_autenticado(self, error):
+        response = respuesta({'detail': error.detail}, status.HTTP_401_UNAUTHORIZED)
+        response['WWW-Authenticate'] = 'Token'
+        return response
+
+    async def escribir(self, request):
+        # Escrituras: la vista de DRF completa (validación, transacción, señales) en un hilo
+        return await en_hilo(_vista_sync, self.vista_sync.as_view(), request)
+
+
+class AsyncSyncBatchView(AsyncSyncView):
+    """POST /api/sync/batch/: igual que SyncBatchView, en un hilo del tope."""
+    vista_sync = SyncBatchView
+
+    async def post(self, request):
+        return await self.escribir(request)
+
+
+class AsyncSyncChangesView(AsyncSyncView):
+    """GET /api/sync/changes/: las consultas van por el ORM async."""
+
+    async def get(self, request):
+        try:
+            limite, clave, since = parametros_feed(request.GET)
+        except CursorVencido as error:
+            return respuesta({'error': str(error)}, status.HTTP_410_GONE)
+        except ValueError as error:
+            return respuesta({'error': str(error)}, status.HTTP_400_BAD_REQUEST)
+
+        fuentes = [
+            (tipo, [fila async for fila in queryset])
+            for tipo, queryset in consultas_feed(request.user, clave, limite)
+        ]
+        pagina, has_more = armar_pagina(fuentes, limite)
+
+        # Serializar una página grande es CPU: no bloqueamos el loop con eso
+        cambios = await en_hilo(serializar_cambios, pagina, self.drf_request)
+        cursor = cursor_siguiente(pagina, has_more, since)
+        return respuesta({'changes': cambios, 'cursor': cursor, 'has_more': has_more})
+
+
+class AsyncUserMeView(AsyncSyncView):
+    """GET/PATCH /api/me/"""
+    vista_sync = UserMeView
+
+    async def get(self, request):
+        return respuesta(UserSerializer(request.user).data)
+
+    async def patch(self, request):
+        return await self.escribir(request)
+
+
+class AsyncStreakView(AsyncSyncView):
+    """GET /api/streak/ (sin sesión responde la racha vacía, igual que StreakView)"""
+    requiere_sesion = False
+
+    async def get(self, request):
+        if not request.user.is_authenticated:
+            return respuesta(RACHA_VACIA)
+        return respuesta(datos_racha(request.user, await arachas_actuales(request.user)))
+
+
+def evento_sse(datos=None, id=None, evento=None, comentario=None):
+    lineas = []
+    if comentario is not None:
+        lineas.append(f': {comentario}')
+    if evento:
+        lineas.append(f'event: {evento}')
+    if id:
+        lineas.append(f'id: {id}')
+    if datos is not None:
+        lineas.append('data: ' + JSONEncoder(ensure_ascii=False).encode(datos))
+    return ('\n'.join(lineas) + '\n\n').encode()
+
+
+class AsyncSyncEventsView(AsyncSyncView):
+    """
+    GET /api/sync/events/: avisos de cambios en Server-Sent Events.
+
+    Cada aviso es {"type", "id", "version"} y su id SSE es el cursor del feed
+    en ese punto; el cliente responde pidiendo /api/sync/changes/. Al
+    reconectar, EventSource manda Last-Event-ID (o el cliente ?since=) y se
+    repiten los avisos que se perdió; si son demasiados llega un evento
+    "resync" y el cliente sigue solo con el feed. Cada SYNC_EVENTOS_LATIDO
+    segundos va un comentario para que proxies y navegador no corten.
+
+    Django 4.2 no avisa a la respuesta en streaming cuando el cliente se va
+    (solo lee http.disconnect al recibir el cuerpo), así que la conexión dura
+    a lo más SYNC_EVENTOS_MAX_SEGUNDOS: luego el generador termina, se suelta
+    la suscripción y EventSource reconecta con Last-Event-ID.
+    """
+
+    async def get(self, request):
+        desde = request.headers.get('Last-Event-ID') or request.GET.get('since')
+        clave = None
+        if desde:
+            try:
+                clave = cursor_vigente(decodificar_cursor(desde))
+            except CursorVencido as error:
+                return respuesta({'error': str(error)}, status.HTTP_410_GONE)
+            except ValueError as error:
+                return respuesta({'error': str(error)}, status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(self.eventos(request.user, clave), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # nginx no debe juntar la respuesta en su búfer
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def eventos(self, user, clave):
+        latido = getattr(settings, 'SYNC_EVENTOS_LATIDO', 15)
+        loop = asyncio.get_running_loop()
+        fin = loop.time() + getattr(settings, 'SYNC_EVENTOS_MAX_SEGUNDOS', 300)
+        # Primero suscribirse y luego repetir lo perdido: así no se cuela nada entre ambos
+        suscripcion = obtener_broker().suscribir(user.pk)
+        try:
+            yield f'retry: {getattr(settings, "SYNC_EVENTOS_REINTENTO_MS", 3000)}\n\n'.encode()
+            if clave:
+                async for evento in self.perdidos(user, clave):
+                    yield evento
+            while (restante := fin - loop.time()) > 0:
+                aviso = await suscripcion.siguiente(timeout=min(latido, restante))
+                if aviso is None:
+                    yield evento_sse(comentario='ping')
+                    continue
+                cursor = aviso.pop('cursor', None)
+                yield evento_sse(aviso, id=cursor)
+        finally:
+            suscripcion.cerrar()
+
+    async def perdidos(self, user, clave):
+        limite = getattr(settings, 'SYNC_EVENTOS_REPETIR', 500)
+        fuentes = [
+            (tipo, [fila async for fila in queryset])
+            for tipo, queryset in consultas_feed(user, clave, limite, solo_versiones=True)
+        ]
+        pagina, has_more = armar_pagina(fuentes, limite)
+        if has_more:
+            yield evento_sse({'type': 'resync'}, evento='resync')
+            return
+        for (fecha, tipo, objeto_id), objeto in pagina:
+            aviso = {'type': tipo, 'id': objeto_id, 'version': objeto.version}
+            yield evento_sse(aviso, id=codificar_cursor((fecha, tipo, objeto_id)))
@@ -0,0 +1,126 @@
+"""
+Avisos de cambios por usuario para /api/sync/events/ (SSE).
+
+Cuando se guarda o se borra un registro publicamos un aviso compacto
+{type, id, version} al canal del dueño, después del commit. Cada conexión
+SSE abierta es una suscripción a ese canal.
+
+El broker se elige con SYNC_BROKER (ruta a la clase). BrokerEnMemoria solo
+reparte dentro del proceso: con varios workers cada uno ve únicamente lo que
+se escribió en él. Un broker de Redis (PUBLISH/SUBSCRIBE) o de PostgreSQL
+(LISTEN/NOTIFY) implementa la misma interfaz: publicar() desde cualquier hilo
+y suscribir() desde el event loop de la conexión.
+
+Perder un aviso no es grave: son solo la señal para pedir
+/api/sync/changes/ desde el cursor, que siempre trae todo.
+"""
+import asyncio
+import functools
+import threading
+import weakref
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+# Avisos que se guardan por conexión si el cliente no los alcanza a leer
+MAX_PENDIENTES = 100
+
+
+class Suscripcion:
+    """Avisos para una conexión; se leen con await siguiente()."""
+
+    def __init__(self, broker, user_id):
+        self.broker = broker
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.cola = asyncio.Queue(MAX_PENDIENTES)
+
+    def entregar(self, evento):
+        # Se llama desde el hilo que hizo la escritura
+        try:
+            self.loop.call_soon_threadsafe(self._poner, evento)
+        except RuntimeError:
+            # El loop ya se cerró: la conexión terminó
+            self.cerrar()
+
+    def _poner(self, evento):
+        if self.cola.full():
+            # Cliente lento: se descarta; su próxima consulta al feed lo trae
+            return
+        self.cola.put_nowait(evento)
+
+    async def siguiente(self, timeout=None):
+        """El siguiente aviso, o None si pasa el timeout sin avisos."""
+        try:
+            return await asyncio.wait_for(self.cola.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def cerrar(self):
+        self.broker.desuscribir(self)
+
+
+class Broker:
+    """Interfaz de los brokers de avisos."""
+
+    def publicar(self, user_id, evento):
+        raise NotImplementedError
+
+    def suscribir(self, user_id):
+        """Regresa una Suscripcion; se llama desde el event loop de la conexión."""
+        raise NotImplementedError
+
+    def desuscribir(self, suscripcion):
+        raise NotImplementedError
+
+
+class BrokerEnMemoria(Broker):
+    def __init__(self):
+        # WeakSet: una conexión que se cortó sin cerrar su suscripción desaparece sola
+        self._suscripciones = defaultdict(weakref.WeakSet)
+        self._candado = threading.Lock()
+
+    def publicar(self, user_id, evento):
+        with self._candado:
+            suscripciones = list(self._suscripciones.get(user_id, ()))
+        for suscripcion in suscripciones:
+            suscripcion.entregar(evento)
+
+    def suscribir(self, user_id):
+        suscripcion = Suscripcion(self, user_id)
+        with self._candado:
+            self._suscripciones[user_id].add(suscripcion)
+        return suscripcion
+
+    def desuscribir(self, suscripcion):
+        with self._candado:
+            activas = self._suscripciones.get(suscripcion.user_id)
+            if activas is not None:
+                activas.discard(suscripcion)
+                if not activas:
+                    del self._suscripciones[suscripcion.user_id]
+
+    def suscriptores(self, user_id):
+        with self._candado:
+            return len(self._suscripciones.get(user_id, ()))
+
+
+@functools.lru_cache(maxsize=None)
+def obtener_broker():
+    return import_string(getattr(settings, 'SYNC_BROKER', 'sync.broker.BrokerEnMemoria'))()
+
+
+def notificar(owner_id, tipo, objeto_id, version, fecha):
+    """Publica el aviso cuando se confirme la transacción en curso (o ya, si no hay)."""
+    from .views import codificar_cursor
+
+    evento = {
+        'type': tipo,
+        'id': str(objeto_id),
+        'version': version,
+        # Posición en el feed de cambios: sirve como id del evento SSE
+        'cursor': codificar_cursor((fecha, tipo, str(objeto_id))),
+    }
+    transaction.on_commit(lambda: obtener_broker().publicar(owner_id, evento))
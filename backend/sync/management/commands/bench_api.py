@@ -0,0 +1,311 @@
+"""
+Carga contra las rutas reales de la API con los usuarios de seed_bench.
+
+    python manage.py seed_bench --usuarios 20 --seed 42 --reemplazar
+    python manage.py bench_api --seed 42 --clientes 8 --operaciones 200 --salida bench-42.json
+
+Cada cliente es un hilo que se comporta como la app: primero descarga todo
+(listas y feed de cambios) y luego hace una mezcla de lecturas y escrituras
+con los mismos payloads que db.js manda en executeSync y executeBatch. Las
+peticiones pasan por el WSGIHandler completo (middleware, autenticación por
+token, rutas), y por cada ruta se reportan p50/p95/p99, peticiones por
+segundo y consultas SQL.
+
+La secuencia de operaciones sale de random.Random(f'{seed}:{cliente}'): con
+la misma semilla y la base recién sembrada, cada corrida hace exactamente lo
+mismo y los tiempos se pueden comparar entre versiones.
+"""
+import datetime
+import io
+import json
+import random
+import statistics
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+
+from accounts import tokens
+from accounts.models import User
+from .bench_sqlite import percentil
+
+# Peso de cada operación en la mezcla (lecturas de pantallas y sincronización)
+MEZCLA = {
+    'leer_tareas': 20,
+    'leer_cambios': 15,
+    'leer_racha': 8,
+    'leer_resumen': 5,
+    'leer_habitos': 5,
+    'crear_tarea': 10,
+    'completar_tarea': 12,
+    'marcar_habito': 8,
+    'crear_gasto': 6,
+    'editar_proyecto': 4,
+    'lote': 5,
+    'borrar_tarea': 2,
+}
+
+
+class Cliente:
+    """Un usuario de la app contra el WSGIHandler, con su token y su estado local."""
+
+    def __init__(self, handler, user, clave, rng, numero, stats):
+        self.handler = handler
+        self.user = user
+        self.clave = clave
+        self.rng = rng
+        self.numero = numero
+        self.stats = stats
+        self.locales = {}
+        self.creadas = []
+        self.cursor = None
+        self.contador = 0
+
+    def pedir(self, metodo, ruta, data=None):
+        cuerpo = json.dumps(data).encode() if data is not None else b''
+        ruta, _, consulta = ruta.partition('?')
+        environ = {
+            'REQUEST_METHOD': metodo, 'PATH_INFO': ruta, 'QUERY_STRING': consulta,
+            'SERVER_NAME': 'localhost', 'SERVER_PORT': '8000', 'HTTP_HOST': 'localhost',
+            'HTTP_AUTHORIZATION': f'Token {self.clave}', 'HTTP_ACCEPT': 'application/json',
+            'CONTENT_TYPE': 'application/json', 'CONTENT_LENGTH': str(len(cuerpo)),
+            'wsgi.input': io.BytesIO(cuerpo), 'wsgi.errors': sys.stderr, 'wsgi.url_scheme': 'http',
+            'wsgi.version': (1, 0), 'wsgi.multithread': True, 'wsgi.multiprocess': False,
+            'wsgi.run_once': False, 'SERVER_PROTOCOL': 'HTTP/1.1',
+        }
+        estado = {}
+
+        def start_response(status, headers, exc_info=None):
+            estado['codigo'] = int(status.split()[0])
+
+        with CaptureQueriesContext(connections['default']) as consultas:
+            inicio = time.perf_counter()
+            respuesta = self.handler(environ, start_response)
+            contenido = b''.join(respuesta)
+            respuesta.close()
+            milisegundos = (time.perf_counter() - inicio) * 1000
+
+        nombre = f'{metodo} {resolve(ruta).url_name}'
+        self.stats.registrar(nombre, milisegundos, len(consultas), estado['codigo'])
+        if contenido and estado['codigo'] < 300:
+            return json.loads(contenido)
+        return None
+
+    def nuevo_id(self):
+        # Como el frontend: un id numérico (Date.now()), aquí determinista
+        self.contador += 1
+        return 1_700_000_000_000 + self.numero * 1_000_000 + self.contador
+
+    def carga_inicial(self):
+        for tipo in ('tasks', 'projects', 'habits', 'gastos', 'presupuestos', 'clases'):
+            self.locales[tipo] = self.pedir('GET', f'/api/{tipo}/') or []
+        self.cursor = (self.pedir('GET', '/api/sync/changes/?limit=2000') or {}).get('cursor')
+
+    # --- Lecturas ---
+
+    def leer_tareas(self):
+        lunes = datetime.date(2025, 3, 1) - datetime.timedelta(days=self.rng.randint(0, 26) * 7)
+        self.pedir('GET', f'/api/tasks/?from={lunes}&to={lunes + datetime.timedelta(days=6)}')
+
+    def leer_cambios(self):
+        ruta = '/api/sync/changes/' + (f'?since={self.cursor}' if self.cursor else '')
+        datos = self.pedir('GET', ruta)
+        if datos:
+            self.cursor = datos['cursor']
+
+    def leer_racha(self):
+        self.pedir('GET', '/api/streak/')
+
+    def leer_resumen(self):
+        self.pedir('GET', f'/api/finanzas/resumen/?anio=2025&mes={self.rng.randint(1, 3)}')
+
+    def leer_habitos(self):
+        self.locales['habits'] = self.pedir('GET', '/api/habits/') or self.locales['habits']
+
+    # --- Escrituras (payloads de normalizePayload en db.js) ---
+
+    def tarea_nueva(self):
+        hora = self.rng.randint(7, 20)
+        return {
+            'id': self.nuevo_id(), 'titulo': f'Tarea bench {self.contador}',
+            'fecha': str(datetime.date(2025, 3, 1) + datetime.timedelta(days=self.rng.randint(-7, 7))),
+            'horaInicio': f'{hora:02d}:00', 'horaFin': f'{hora + 1:02d}:00',
+            'color': 'verde', 'espacio': self.rng.choice(['Personal', 'Escuela', 'Trabajo']),
+            'completada': False, 'notas': '',
+        }
+
+    def crear_tarea(self):
+        tarea = self.pedir('POST', '/api/tasks/', self.tarea_nueva())
+        if tarea:
+            self.creadas.append(tarea['id'])
+
+    def completar_tarea(self):
+        if not self.locales['tasks']:
+            return
+        # executeSync manda el objeto local completo, menos los campos que quita normalizePayload
+        local = self.rng.choice(self.locales['tasks'])
+        tarea = dict(local)
+        for campo in ('espacio_nombre', 'owner_email'):
+            tarea.pop(campo, None)
+        tarea['completada'] = not tarea.get('completada')
+        self.recordar(local, self.pedir('PATCH', f"/api/tasks/{tarea['id']}/", tarea))
+
+    def marcar_habito(self):
+        if not self.locales['habits']:
+            return
+        habito = self.rng.choice(self.locales['habits'])
+        # habitos.js reenvía el diccionario completo de registros
+        registros = dict(habito['registros'])
+        dia = str(datetime.date(2025, 3, 1) - datetime.timedelta(days=self.rng.randint(0, 6)))
+        registros[dia] = {'completado': not registros.get(dia, {}).get('completado'), 'nota': ''}
+        habito['registros'] = registros
+        self.pedir('PATCH', f"/api/habits/{habito['id']}/", {'id': habito['id'], 'nombre': habito['nombre'], 'registros': registros})
+
+    def crear_gasto(self):
+        self.pedir('POST', '/api/gastos/', {
+            'id': self.nuevo_id(), 'descripcion': 'Gasto bench', 'categoria': 'comida',
+            'fecha': '2025-03-01', 'monto': self.rng.randint(20, 900), 'espacio': 'Personal',
+        })
+
+    def editar_proyecto(self):
+        if not self.locales['projects']:
+            return
+        local = self.rng.choice(self.locales['projects'])
+        proyecto = dict(local)
+        pasos = proyecto.get('tareas') or []
+        if pasos:
+            paso = self.rng.randrange(len(pasos))
+            pasos[paso] = {**pasos[paso], 'completada': not pasos[paso].get('completada')}
+        for campo in ('espacio_nombre', 'owner_email'):
+            proyecto.pop(campo, None)
+        proyecto['tareas'] = pasos
+        self.recordar(local, self.pedir('PATCH', f"/api/projects/{proyecto['id']}/", proyecto))
+
+    def recordar(self, local, respuesta):
+        # Como recordarVersion en db.js: la copia local se queda con lo que
+        # respondió el servidor (y su versión) para que el siguiente PATCH no choque
+        if respuesta:
+            local.update(respuesta)
+
+    def lote(self):
+        # executeBatch: el outbox acumulado mientras se estuvo offline
+        operaciones = [{'type': 'tareas', 'action': 'upsert', 'data': self.tarea_nueva()} for _ in range(self.rng.randint(3, 15))]
+        if self.locales['tasks']:
+            tarea = self.rng.choice(self.locales['tasks'])
+            operaciones.append({'type': 'tareas', 'action': 'upsert', 'data': {'id': tarea['id'], 'completada': True}})
+        self.pedir('POST', '/api/sync/batch/', {'operations': operaciones})
+
+    def borrar_tarea(self):
+        if self.creadas:
+            self.pedir('DELETE', f'/api/tasks/{self.creadas.pop(0)}/')
+
+    def correr(self, operaciones):
+        try:
+            self.carga_inicial()
+            nombres = list(MEZCLA)
+            pesos = list(MEZCLA.values())
+            for _ in range(operaciones):
+                getattr(self, self.rng.choices(nombres, pesos)[0])()
+        finally:
+            connections['default'].close()
+
+
+class Estadisticas:
+    def __init__(self):
+        self.candado = threading.Lock()
+        self.datos = defaultdict(lambda: {'ms': [], 'consultas': [], 'errores': 0})
+
+    def registrar(self, nombre, milisegundos, consultas, codigo):
+        with self.candado:
+            ruta = self.datos[nombre]
+            ruta['ms'].append(milisegundos)
+            ruta['consultas'].append(consultas)
+            if codigo >= 400:
+                ruta['errores'] += 1
+
+    def resumen(self, segundos):
+        def calcular(ms, consultas, errores):
+            return {
+                'peticiones': len(ms),
+                'peticiones_por_segundo': round(len(ms) / segundos, 2),
+                'errores': errores,
+                'p50_ms': round(percentil(ms, 50), 2),
+                'p95_ms': round(percentil(ms, 95), 2),
+                'p99_ms': round(percentil(ms, 99), 2),
+                'media_ms': round(statistics.fmean(ms), 2),
+                'consultas_media': round(statistics.fmean(consultas), 2),
+                'consultas_max': max(consultas),
+            }
+
+        rutas = {nombre: calcular(**valores) for nombre, valores in sorted(self.datos.items())}
+        todas = {
+            'ms': [ms for valores in self.datos.values() for ms in valores['ms']],
+            'consultas': [c for valores in self.datos.values() for c in valores['consultas']],
+            'errores': sum(valores['errores'] for valores in self.datos.values()),
+        }
+        return rutas, calcular(**todas)
+
+
+class Command(BaseCommand):
+    help = 'Carga concurrente sobre las rutas de la API; reporta latencias y consultas por ruta en JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--clientes', type=int, default=8, help='Clientes (hilos) simultáneos')
+        parser.add_argument('--operaciones', type=int, default=100, help='Operaciones por cliente')
+        parser.add_argument('--prefijo', default='bench', help='Prefijo de los usuarios de seed_bench')
+        parser.add_argument('--salida', help='Archivo JSON donde guardar el resultado')
+
+    def handle(self, *args, **options):
+        usuarios = list(User.objects.filter(username__startswith=options['prefijo']).order_by('username'))
+        if not usuarios:
+            raise CommandError(f"No hay usuarios {options['prefijo']}*: corre antes seed_bench")
+
+        handler = WSGIHandler()
+        stats = Estadisticas()
+        creados = []
+        clientes = []
+        for numero in range(options['clientes']):
+            user = usuarios[numero % len(usuarios)]
+            token, clave = tokens.crear(user, nombre='bench_api')
+            creados.append(token)
+            rng = random.Random(f"{options['seed']}:{numero}")
+            clientes.append(Cliente(handler, user, clave, rng, numero, stats))
+
+        inicio = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=options['clientes']) as hilos:
+                for futuro in [hilos.submit(cliente.correr, options['operaciones']) for cliente in clientes]:
+                    futuro.result()
+        finally:
+            for token in creados:
+                tokens.revocar(token)
+        segundos = time.perf_counter() - inicio
+
+        rutas, total = stats.resumen(segundos)
+        conexion = connections['default']
+        resultado = {
+            'fecha': timezone.now().isoformat(),
+            'seed': options['seed'],
+            'clientes': options['clientes'],
+            'operaciones_por_cliente': options['operaciones'],
+            'usuarios': len(usuarios),
+            'base': conexion.settings_dict['ENGINE'],
+            'segundos': round(segundos, 2),
+            'total': total,
+            'rutas': rutas,
+        }
+
+        texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+        if options['salida']:
+            with open(options['salida'], 'w') as archivo:
+                archivo.write(texto + '\n')
+        self.stdout.write(texto)
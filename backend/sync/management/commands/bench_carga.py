@@ -0,0 +1,115 @@
+"""
+Prueba de carga: muchos clientes que se reconectan a la vez contra uno o más
+servidores ya levantados (p. ej. WSGI y ASGI con la misma base).
+
+    gunicorn one_backend.wsgi -w 2 --threads 8 -b :8000 &
+    uvicorn one_backend.asgi:application --workers 2 --port 8001 &
+    python manage.py bench_carga alice wsgi=http://127.0.0.1:8000 asgi=http://127.0.0.1:8001 --clientes 200
+
+Cada cliente abre una conexión nueva por petición (como un navegador que
+vuelve de estar offline) y pide las rutas de sincronización. Se usa un token
+de API temporal del usuario y se revoca al final.
+"""
+import asyncio
+import json
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts import tokens
+from accounts.models import User
+from .bench_sqlite import percentil
+
+RUTAS = ('/api/me/', '/api/streak/', '/api/sync/changes/?limit=100')
+
+
+async def pedir(base, ruta, clave, timeout):
+    """GET HTTP/1.1 mínimo con asyncio. Regresa el código de estado."""
+    url = urlsplit(base)
+    lector, escritor = await asyncio.wait_for(
+        asyncio.open_connection(url.hostname, url.port or 80), timeout
+    )
+    try:
+        escritor.write((
+            f'GET {ruta} HTTP/1.1\r\nHost: {url.netloc}\r\nAuthorization: Token {clave}\r\n'
+            'Accept: application/json\r\nConnection: close\r\n\r\n'
+        ).encode())
+        await escritor.drain()
+        # Con Connection: close el servidor cierra al terminar el cuerpo
+        datos = await asyncio.wait_for(lector.read(), timeout)
+    finally:
+        escritor.close()
+    return int(datos.split(b' ', 2)[1])
+
+
+class Command(BaseCommand):
+    help = 'Prueba de carga de las rutas de sincronización con muchos clientes simultáneos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='Usuario con datos para las peticiones')
+        parser.add_argument('servidores', nargs='+', help='nombre=http://host:puerto (o solo la URL)')
+        parser.add_argument('--clientes', type=int, default=100, help='Clientes simultáneos')
+        parser.add_argument('--rondas', type=int, default=3, help='Veces que cada cliente pide todas las rutas')
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--json', action='store_true', help='Imprime el resultado como JSON')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"No existe el usuario {options['username']}")
+
+        token, clave = tokens.crear(user, nombre='bench_carga')
+        try:
+            resultados = {}
+            for servidor in options['servidores']:
+                nombre, _, base = servidor.rpartition('=')
+                resultados[nombre or base] = asyncio.run(self.correr(base, clave, options))
+        finally:
+            tokens.revocar(token)
+
+        if options['json']:
+            self.stdout.write(json.dumps(resultados, indent=2))
+            return
+
+        self.stdout.write(f"{options['clientes']} clientes x {options['rondas']} rondas x {len(RUTAS)} rutas")
+        self.stdout.write(f"{'servidor':<10} {'pet/s':>8} {'errores':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for nombre, datos in resultados.items():
+            self.stdout.write(
+                f"{nombre:<10} {datos['peticiones_por_segundo']:>8.1f} {datos['errores']:>8} "
+                f"{datos['p50_ms'] or 0:>8.1f} {datos['p95_ms'] or 0:>8.1f} {datos['p99_ms'] or 0:>8.1f}"
+            )
+
+    async def correr(self, base, clave, options):
+        latencias = []
+        errores = 0
+
+        async def cliente():
+            nonlocal errores
+            for _ in range(options['rondas']):
+                for ruta in RUTAS:
+                    inicio = time.perf_counter()
+                    try:
+                        codigo = await pedir(base, ruta, clave, options['timeout'])
+                    except (OSError, asyncio.TimeoutError, ValueError, IndexError):
+                        codigo = None
+                    if codigo != 200:
+                        errores += 1
+                        continue
+                    latencias.append((time.perf_counter() - inicio) * 1000)
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(cliente() for _ in range(options['clientes'])))
+        segundos = time.perf_counter() - inicio
+
+        return {
+            'peticiones': len(latencias),
+            'peticiones_por_segundo': len(latencias) / segundos,
+            'errores': errores,
+            'p50_ms': percentil(latencias, 50),
+            'p95_ms': percentil(latencias, 95),
+            'p99_ms': percentil(latencias, 99),
+            'media_ms': statistics.fmean(latencias) if latencias else None,
+        }
@@ -0,0 +1,109 @@
+"""
+Latencia por petición abriendo una conexión nueva cada vez vs reutilizándola.
+
+    DATABASE_URL=postgres://localhost/ONE python manage.py bench_conexiones alice --peticiones 300
+
+Las peticiones pasan por el WSGIHandler real (no el cliente de pruebas, que
+desconecta close_old_connections), así que al terminar cada una Django cierra
+o conserva la conexión según CONN_MAX_AGE, igual que en producción. Se usa un
+token de API temporal del usuario indicado y se revoca al final.
+"""
+import io
+import json
+import statistics
+import sys
+import time
+from wsgiref.util import setup_testing_defaults
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from accounts import tokens
+from accounts.models import User
+from .bench_sqlite import percentil
+
+# Segundos de CONN_MAX_AGE por modo
+MODOS = {'nueva': 0, 'reutilizada': 600}
+
+
+class Command(BaseCommand):
+    help = 'Benchmark de latencia con y sin reutilizar la conexión a la base (CONN_MAX_AGE)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='Usuario con datos para las peticiones')
+        parser.add_argument('--peticiones', type=int, default=200)
+        parser.add_argument('--calentamiento', type=int, default=20)
+        parser.add_argument('--url', default='/api/sync/changes/?limit=50')
+        parser.add_argument('--json', action='store_true', help='Imprime el resultado como JSON')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"No existe el usuario {options['username']}")
+
+        token, clave = tokens.crear(user, nombre='bench_conexiones')
+        try:
+            handler = WSGIHandler()
+            resultados = {}
+            for modo, max_age in MODOS.items():
+                resultados[modo] = self.correr(handler, clave, options, max_age)
+        finally:
+            tokens.revocar(token)
+
+        if options['json']:
+            self.stdout.write(json.dumps(resultados, indent=2))
+            return
+
+        conexion = connections['default']
+        self.stdout.write(f"{conexion.vendor} {conexion.settings_dict['NAME']}: {options['peticiones']} x GET {options['url']}")
+        self.stdout.write(f"{'conexión':<12} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'media ms':>9} {'conexiones':>11}")
+        for modo, datos in resultados.items():
+            self.stdout.write(
+                f"{modo:<12} {datos['p50_ms']:>8.2f} {datos['p95_ms']:>8.2f} {datos['p99_ms']:>8.2f} "
+                f"{datos['media_ms']:>9.2f} {datos['conexiones']:>11}"
+            )
+
+    def correr(self, handler, clave, options, max_age):
+        conexion = connections['default']
+        conexion.close()
+        # close_old_connections() lee CONN_MAX_AGE al abrir cada conexión
+        conexion.settings_dict['CONN_MAX_AGE'] = max_age
+
+        ruta, _, consulta = options['url'].partition('?')
+        latencias = []
+        abiertas = 0
+        for numero in range(options['calentamiento'] + options['peticiones']):
+            environ = {
+                'PATH_INFO': ruta, 'QUERY_STRING': consulta, 'REQUEST_METHOD': 'GET',
+                'HTTP_AUTHORIZATION': f'Token {clave}', 'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr,
+            }
+            setup_testing_defaults(environ)
+            antes = conexion.connection
+
+            inicio = time.perf_counter()
+            respuesta = handler(environ, lambda status, headers: None)
+            for _ in respuesta:
+                pass
+            # close() dispara request_finished: ahí se cierra o se conserva la conexión
+            respuesta.close()
+            milisegundos = (time.perf_counter() - inicio) * 1000
+
+            if respuesta.status_code != 200:
+                raise CommandError(f"{options['url']} respondió {respuesta.status_code}")
+            if numero < options['calentamiento']:
+                continue
+            latencias.append(milisegundos)
+            if conexion.connection is None or conexion.connection is not antes:
+                abiertas += 1
+
+        conexion.close()
+        return {
+            'conn_max_age': max_age,
+            'p50_ms': percentil(latencias, 50),
+            'p95_ms': percentil(latencias, 95),
+            'p99_ms': percentil(latencias, 99),
+            'media_ms': statistics.fmean(latencias),
+            'conexiones': abiertas,
+        }
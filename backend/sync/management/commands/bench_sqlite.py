@@ -0,0 +1,132 @@
+"""
+Compara SQLite por defecto contra SQLITE_MODE=wal con muchos escritores.
+
+    python manage.py bench_sqlite --escritores 32 --segundos 5
+
+Cada modo corre en su propio proceso (la configuración de la base se lee de
+las variables de entorno al arrancar) sobre una base temporal. Cada escritor
+hace en un hilo lo mismo que una operación del lote de sincronización: dentro
+de una transacción lee una fila, la actualiza e inserta otra.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, transaction
+
+MODOS = ('default', 'wal')
+
+
+def percentil(valores, p):
+    if not valores:
+        return None
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(round(p / 100 * (len(valores) - 1))))]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark de escritores concurrentes: SQLite por defecto vs modo WAL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escritores', type=int, default=32)
+        parser.add_argument('--segundos', type=float, default=5)
+        parser.add_argument('--json', action='store_true', help='Imprime el resultado como JSON')
+        # Uso interno: el proceso hijo que corre un solo modo
+        parser.add_argument('--trabajador', action='store_true', help='(interno)')
+
+    def handle(self, *args, **options):
+        if options['trabajador']:
+            resultado = self.correr(options['escritores'], options['segundos'])
+            self.stdout.write(json.dumps(resultado))
+            return
+
+        resultados = {}
+        with tempfile.TemporaryDirectory() as carpeta:
+            for modo in MODOS:
+                env = {**os.environ, 'SQLITE_PATH': str(Path(carpeta) / f'{modo}.sqlite3')}
+                env.pop('SQLITE_MODE', None)
+                if modo == 'wal':
+                    env['SQLITE_MODE'] = 'wal'
+                salida = subprocess.run(
+                    [sys.executable, str(Path(settings.BASE_DIR) / 'manage.py'), 'bench_sqlite', '--trabajador',
+                     '--escritores', str(options['escritores']), '--segundos', str(options['segundos'])],
+                    env=env, capture_output=True, text=True, check=True,
+                )
+                resultados[modo] = json.loads(salida.stdout.strip().splitlines()[-1])
+
+        if options['json']:
+            self.stdout.write(json.dumps(resultados, indent=2))
+            return
+
+        self.stdout.write(f"{options['escritores']} escritores, {options['segundos']} s por modo")
+        self.stdout.write(f"{'modo':<8} {'commits/s':>10} {'bloqueos':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for modo, datos in resultados.items():
+            self.stdout.write(
+                f"{modo:<8} {datos['commits_por_segundo']:>10.1f} {datos['bloqueos']:>9} "
+                f"{datos['p50_ms'] or 0:>8.1f} {datos['p95_ms'] or 0:>8.1f} {datos['p99_ms'] or 0:>8.1f}"
+            )
+
+    def correr(self, escritores, segundos):
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE TABLE bench_contador (id INTEGER PRIMARY KEY, valor INTEGER NOT NULL)')
+            cursor.execute('CREATE TABLE bench_evento (id INTEGER PRIMARY KEY, contador INTEGER, creado REAL)')
+            cursor.executemany('INSERT INTO bench_contador (id, valor) VALUES (%s, 0)', [(i,) for i in range(100)])
+        connection.close()
+
+        latencias = []
+        bloqueos = []
+        candado = threading.Lock()
+        fin = time.monotonic() + segundos
+
+        def escritor(numero):
+            propias, fallos = [], 0
+            i = 0
+            try:
+                while time.monotonic() < fin:
+                    clave = (numero * 7 + i) % 100
+                    i += 1
+                    inicio = time.perf_counter()
+                    try:
+                        with transaction.atomic():
+                            with connection.cursor() as cursor:
+                                cursor.execute('SELECT valor FROM bench_contador WHERE id = %s', [clave])
+                                valor = cursor.fetchone()[0]
+                                cursor.execute('UPDATE bench_contador SET valor = %s WHERE id = %s', [valor + 1, clave])
+                                cursor.execute(
+                                    'INSERT INTO bench_evento (contador, creado) VALUES (%s, %s)', [clave, time.time()]
+                                )
+                    except OperationalError:
+                        # "database is locked": la operación se pierde
+                        fallos += 1
+                        continue
+                    propias.append((time.perf_counter() - inicio) * 1000)
+            finally:
+                connection.close()
+            with candado:
+                latencias.extend(propias)
+                bloqueos.append(fallos)
+
+        hilos = [threading.Thread(target=escritor, args=(n,)) for n in range(escritores)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        return {
+            'engine': settings.DATABASES['default']['ENGINE'],
+            'commits': len(latencias),
+            'commits_por_segundo': len(latencias) / segundos,
+            'bloqueos': sum(bloqueos),
+            'p50_ms': percentil(latencias, 50),
+            'p95_ms': percentil(latencias, 95),
+            'p99_ms': percentil(latencias, 99),
+            'media_ms': statistics.fmean(latencias) if latencias else None,
+        }
@@ -0,0 +1,87 @@
+"""
+Quita de verdad las filas con borrado lógico más viejas que la retención.
+
+    python manage.py compactar_borrados                 # SYNC_RETENCION_DIAS
+    python manage.py compactar_borrados --dias 30 --lote 5000
+
+Un DELETE de la API solo marca deleted = True (one_backend/borrado.py) para
+que el feed de cambios mande el borrado a los demás dispositivos. Pasada la
+retención ningún cursor vigente puede necesitarla (el feed responde 410 a
+los más viejos), así que se puede quitar.
+
+Va por lotes de ids con el índice parcial de borrados (<modelo>_borrados_idx)
+y con _raw_delete: sin recolector de Django ni señales, porque la fila ya
+está fuera de las rachas, el resumen y la capacidad desde que se borró, y
+no debe dejar un Tombstone. Lo que cuelga de cada fila se resuelve a mano:
+- los registros de un hábito se van con él;
+- las tareas de un proyecto quitado se quedan sin proyecto;
+- un espacio que todavía tiene filas (vivas o en retención) se deja para
+  la siguiente pasada; su resumen mensual se quita con él.
+También se quitan los Tombstone (borrados de registros de hábitos) viejos.
+"""
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from finanzas.models import Gasto, Presupuesto, ResumenMensual
+from habits.models import Habit, HabitLog
+from horarios.models import Clase
+from projects.models import Project
+from spaces.models import Space
+from tasks.models import Task
+from sync.models import Tombstone
+
+# Primero lo que cuelga de otros: así los espacios ya quedan vacíos
+MODELOS = [Task, Gasto, Presupuesto, Clase, Habit, Project, Space]
+CONTENIDO_ESPACIO = [Task, Habit, Gasto, Presupuesto, Clase, Project]
+
+
+def quitar(queryset):
+    # DELETE ... WHERE sin recolector ni señales
+    return queryset._raw_delete(queryset.db)
+
+
+def compactar(model, limite, lote):
+    """Quita las filas borradas antes de `limite`, `lote` por vuelta. Regresa cuántas."""
+    total = 0
+    # Espacios que todavía tienen filas: no se quitan en esta pasada
+    ocupados = set()
+    while True:
+        # Sin orden para que lo resuelva el índice parcial; lo quitado ya no vuelve a salir
+        candidatos = model._base_manager.filter(deleted=True, updated_at__lt=limite).exclude(pk__in=ocupados)
+        ids = list(candidatos.values_list('pk', flat=True)[:lote])
+        if not ids:
+            return total
+        with transaction.atomic():
+            if model is Habit:
+                quitar(HabitLog.objects.filter(habit_id__in=ids))
+            elif model is Project:
+                Task._base_manager.filter(project_id__in=ids).update(project=None)
+            elif model is Space:
+                for contenido in CONTENIDO_ESPACIO:
+                    ocupados.update(contenido._base_manager.filter(space_id__in=ids).values_list('space_id', flat=True))
+                ids = [pk for pk in ids if pk not in ocupados]
+                quitar(ResumenMensual.objects.filter(space_id__in=ids))
+            total += quitar(model._base_manager.filter(pk__in=ids, deleted=True))
+
+
+class Command(BaseCommand):
+    help = 'Quita las filas borradas (borrado lógico) más viejas que la retención'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=None, help='Retención en días (por defecto SYNC_RETENCION_DIAS)')
+        parser.add_argument('--lote', type=int, default=1000, help='Filas por sentencia DELETE')
+
+    def handle(self, *args, **options):
+        dias = options['dias'] if options['dias'] is not None else settings.SYNC_RETENCION_DIAS
+        limite = timezone.now() - datetime.timedelta(days=dias)
+        lote = max(1, options['lote'])
+
+        for model in MODELOS:
+            total = compactar(model, limite, lote)
+            self.stdout.write(f'{model._meta.label:<22} {total:>8} filas')
+        total = quitar(Tombstone.objects.filter(updated_at__lt=limite))
+        self.stdout.write(f'{Tombstone._meta.label:<22} {total:>8} filas')
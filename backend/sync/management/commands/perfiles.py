@@ -0,0 +1,137 @@
+"""
+Lista y resume las peticiones capturadas por el perfilado (PERFILADO=1).
+
+    python manage.py perfiles                      # las más lentas y el resumen
+    python manage.py perfiles --ruta habit-detail --top 5
+    python manage.py perfiles --ver 20250301-101500-habit-detail-1a2b3c4d
+
+El resumen junta todas las capturas que pasan el filtro:
+- por ruta: cuántas, p50 y máximo, consultas promedio y motivos;
+- las funciones con más tiempo propio (sumando los perfil.pstats);
+- las consultas con más tiempo acumulado (mismo texto de SQL).
+--ver muestra una sola captura: sus funciones, sus pilas más vistas y sus
+consultas más lentas con el EXPLAIN.
+"""
+import io
+import json
+import pstats
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from .bench_sqlite import percentil
+
+
+def _leer(ruta, defecto=None):
+    try:
+        with open(ruta) as archivo:
+            return json.load(archivo)
+    except (FileNotFoundError, ValueError):
+        return defecto
+
+
+def capturas(carpeta, ruta=None, metodo=None):
+    for subcarpeta in sorted(carpeta.iterdir()) if carpeta.is_dir() else ():
+        meta = _leer(subcarpeta / 'meta.json')
+        if meta is None:
+            # Una captura a medio escribir o de otra versión
+            continue
+        if ruta and meta['ruta'] != ruta:
+            continue
+        if metodo and meta['metodo'] != metodo.upper():
+            continue
+        yield subcarpeta, meta
+
+
+class Command(BaseCommand):
+    help = 'Lista y resume las peticiones guardadas por el perfilado'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', default=None, help='Carpeta de capturas (por defecto PERFILADO_DIR)')
+        parser.add_argument('--ruta', help='Solo esta ruta (nombre de URL, p. ej. habit-detail)')
+        parser.add_argument('--metodo', help='Solo este método HTTP')
+        parser.add_argument('--top', type=int, default=10)
+        parser.add_argument('--ver', metavar='CAPTURA', help='Detalle de una captura')
+
+    def handle(self, *args, **options):
+        carpeta = Path(options['dir'] or settings.PERFILADO_DIR)
+        if options['ver']:
+            self.ver(carpeta / options['ver'], options['top'])
+            return
+
+        lista = list(capturas(carpeta, options['ruta'], options['metodo']))
+        if not lista:
+            self.stdout.write(f'No hay capturas en {carpeta}')
+            return
+        top = options['top']
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f'Más lentas ({len(lista)} capturas)'))
+        for subcarpeta, meta in sorted(lista, key=lambda par: par[1]['ms'], reverse=True)[:top]:
+            self.stdout.write(
+                f'{meta["ms"]:>9.1f} ms  {meta["metodo"]:<6} {meta["ruta"]:<22} '
+                f'{meta["consultas"]:>4} consultas ({meta["sql_ms"]:.1f} ms)  {meta["motivo"]:<9} {subcarpeta.name}'
+            )
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Por ruta'))
+        por_ruta = defaultdict(list)
+        for _, meta in lista:
+            por_ruta[(meta['metodo'], meta['ruta'])].append(meta)
+        filas = sorted(por_ruta.items(), key=lambda par: sum(meta['ms'] for meta in par[1]), reverse=True)
+        for (metodo, ruta), metas in filas:
+            tiempos = [meta['ms'] for meta in metas]
+            motivos = Counter(meta['motivo'] for meta in metas)
+            self.stdout.write(
+                f'{metodo:<6} {ruta:<22} n={len(metas):<4} p50={percentil(tiempos, 50):.1f} ms  '
+                f'max={max(tiempos):.1f} ms  consultas={sum(meta["consultas"] for meta in metas) / len(metas):.1f}  '
+                + ', '.join(f'{motivo}={total}' for motivo, total in sorted(motivos.items()))
+            )
+
+        perfiles = [str(subcarpeta / 'perfil.pstats') for subcarpeta, _ in lista if (subcarpeta / 'perfil.pstats').exists()]
+        if perfiles:
+            self.stdout.write(self.style.MIGRATE_HEADING(f'Funciones con más tiempo propio ({len(perfiles)} perfiles)'))
+            self.funciones(perfiles, 'tottime', top)
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Consultas con más tiempo acumulado'))
+        tiempo_sql = Counter()
+        veces_sql = Counter()
+        for subcarpeta, _ in lista:
+            for consulta in _leer(subcarpeta / 'sql.json', []):
+                tiempo_sql[consulta['sql']] += consulta['ms']
+                veces_sql[consulta['sql']] += 1
+        for sql, total in tiempo_sql.most_common(top):
+            self.stdout.write(f'{total:>9.1f} ms  x{veces_sql[sql]:<5} {sql[:160]}')
+
+    def funciones(self, archivos, orden, top):
+        salida = io.StringIO()
+        pstats.Stats(*archivos, stream=salida).strip_dirs().sort_stats(orden).print_stats(top)
+        # Quitamos el encabezado de pstats (nombres de archivo y totales)
+        texto = salida.getvalue()
+        inicio = texto.find('   ncalls')
+        self.stdout.write(texto[inicio:].rstrip() if inicio >= 0 else texto.rstrip())
+
+    def ver(self, subcarpeta, top):
+        meta = _leer(subcarpeta / 'meta.json')
+        if meta is None:
+            raise CommandError(f'No existe la captura {subcarpeta}')
+        self.stdout.write(json.dumps(meta, indent=2))
+
+        if (subcarpeta / 'perfil.pstats').exists():
+            self.stdout.write(self.style.MIGRATE_HEADING('Funciones (tiempo acumulado)'))
+            self.funciones([str(subcarpeta / 'perfil.pstats')], 'cumulative', top)
+
+        if (subcarpeta / 'pilas.txt').exists():
+            self.stdout.write(self.style.MIGRATE_HEADING('Pilas más vistas'))
+            with open(subcarpeta / 'pilas.txt') as archivo:
+                for linea in archivo.readlines()[:top]:
+                    pila, total = linea.rsplit(' ', 1)
+                    # La pila completa es larga: bastan los últimos marcos
+                    self.stdout.write(f'{int(total):>5}  ' + ';'.join(pila.split(';')[-6:]))
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Consultas más lentas'))
+        consultas = sorted(_leer(subcarpeta / 'sql.json', []), key=lambda consulta: consulta['ms'], reverse=True)
+        for consulta in consultas[:top]:
+            self.stdout.write(f'{consulta["ms"]:>8.1f} ms  {consulta["sql"][:200]}')
+            for paso in consulta.get('plan', []):
+                self.stdout.write(f'             {paso}')
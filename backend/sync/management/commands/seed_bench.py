@@ -0,0 +1,168 @@
+"""
+Siembra usuarios con datos realistas para las pruebas de carga.
+
+    python manage.py seed_bench --usuarios 50 --seed 42 --anios-habito 2 --reemplazar
+
+Todo sale de random.Random(f'{seed}:{username}') y de una fecha fija
+(--hoy), así que la misma semilla produce exactamente los mismos datos en
+cualquier máquina y cada usuario no depende de cuántos se siembren.
+Los usuarios se llaman <prefijo>0000, <prefijo>0001, ...
+"""
+import datetime
+import random
+import time
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.models import User
+from accounts.streaks import reconstruir_usuario
+from finanzas.models import Gasto, Presupuesto
+from finanzas.resumen import reconstruir as reconstruir_resumen
+from habits.models import Habit, HabitLog
+from horarios.models import Clase
+from projects.models import Project
+from spaces.models import Space
+from tasks.models import Task
+
+ESPACIOS = ['Personal', 'Escuela', 'Trabajo']
+CATEGORIAS = ['comida', 'transporte', 'escuela', 'salud', 'ocio', 'servicios']
+MATERIAS = ['Cálculo', 'Física', 'Historia', 'Programación', 'Inglés', 'Química', 'Ética', 'Estadística']
+COLORES = ['verde', 'azul', 'morado', 'naranja', 'rojo']
+
+POR_LOTE = 1000
+
+
+def sembrar_usuario(user, rng, hoy, opciones):
+    prefijo = user.username
+    nombres = ESPACIOS[:opciones['espacios']] + [
+        f'Espacio {n}' for n in range(len(ESPACIOS), opciones['espacios'])
+    ]
+    espacios = Space.objects.bulk_create([
+        Space(id=f'{prefijo}-space-{i}', owner=user, name=nombre) for i, nombre in enumerate(nombres)
+    ])
+
+    proyectos = Project.objects.bulk_create([
+        Project(
+            id=f'{prefijo}-project-{i}', owner=user, space=rng.choice(espacios),
+            title=f'Proyecto {i}', due_date=hoy + datetime.timedelta(days=rng.randint(-30, 120)),
+            progress=rng.randint(0, 100), description=f'Descripción del proyecto {i}',
+            # Misma forma que guarda proyectos.js
+            project_tasks=[
+                {'id': j, 'titulo': f'Paso {j}', 'completada': rng.random() < 0.5}
+                for j in range(rng.randint(2, 12))
+            ],
+        )
+        for i in range(opciones['proyectos'])
+    ], batch_size=POR_LOTE)
+
+    tareas = []
+    for i in range(opciones['tareas']):
+        inicio = rng.randint(7, 20)
+        tareas.append(Task(
+            id=f'{prefijo}-task-{i}', owner=user, space=rng.choice(espacios),
+            project=rng.choice(proyectos) if proyectos and rng.random() < 0.3 else None,
+            title=f'Tarea {i}', notes='' if rng.random() < 0.7 else f'Notas de la tarea {i}',
+            date=hoy - datetime.timedelta(days=rng.randint(-14, 180)),
+            start_time=datetime.time(inicio, rng.choice((0, 30))), end_time=datetime.time(inicio + 1, 0),
+            color=rng.choice(COLORES), status='done' if rng.random() < 0.55 else 'todo',
+        ))
+    Task.objects.bulk_create(tareas, batch_size=POR_LOTE)
+
+    habitos = Habit.objects.bulk_create([
+        Habit(id=f'{prefijo}-habit-{i}', owner=user, space=espacios[0], name=f'Hábito {i}')
+        for i in range(opciones['habitos'])
+    ])
+    dias = int(opciones['anios_habito'] * 365)
+    for habito in habitos:
+        constancia = rng.uniform(0.4, 0.95)
+        HabitLog.objects.bulk_create([
+            HabitLog(
+                id=f'{habito.id}-log-{d}', habit=habito, date=hoy - datetime.timedelta(days=d),
+                done=rng.random() < constancia, note='' if rng.random() < 0.9 else 'nota',
+            )
+            for d in range(dias)
+            # Hay días sin registro, como en la app
+            if rng.random() < 0.85
+        ], batch_size=POR_LOTE)
+
+    Gasto.objects.bulk_create([
+        Gasto(
+            id=f'{prefijo}-gasto-{i}', owner=user, space=rng.choice(espacios),
+            descripcion=f'Gasto {i}', categoria=rng.choice(CATEGORIAS),
+            fecha=hoy - datetime.timedelta(days=rng.randint(0, 365)),
+            monto=Decimal(rng.randint(1500, 250000)) / 100,
+        )
+        for i in range(opciones['gastos'])
+    ], batch_size=POR_LOTE)
+
+    Presupuesto.objects.bulk_create([
+        Presupuesto(
+            id=f'{prefijo}-presupuesto-{i}', owner=user, space=espacios[i % len(espacios)],
+            mes=(hoy.month - 1 - i // len(espacios)) % 12 + 1, anio=hoy.year,
+            monto=Decimal(rng.randint(20, 200) * 100),
+        )
+        # Un presupuesto por espacio y mes, hacia atrás desde --hoy (a lo más un año)
+        for i in range(min(opciones['presupuestos'], 12 * len(espacios)))
+    ])
+
+    clases = []
+    for i in range(opciones['clases']):
+        inicio = rng.randint(7, 19)
+        clases.append(Clase(
+            id=f'{prefijo}-clase-{i}', owner=user, space=espacios[min(1, len(espacios) - 1)],
+            materia=rng.choice(MATERIAS), profesor=f'Profesor {i}', salon=f'A-{rng.randint(100, 400)}',
+            dia_semana=rng.randint(1, 5), hora_inicio=datetime.time(inicio, 0), hora_fin=datetime.time(inicio + 1, 30),
+        ))
+    Clase.objects.bulk_create(clases)
+
+    # bulk_create no pasa por save(): rachas y resumen se calculan al final
+    reconstruir_usuario(user)
+    reconstruir_resumen(user)
+
+
+class Command(BaseCommand):
+    help = 'Siembra N usuarios con datos realistas y reproducibles para pruebas de carga'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--prefijo', default='bench')
+        parser.add_argument('--password', default='bench-clave-123')
+        parser.add_argument('--hoy', type=datetime.date.fromisoformat, default=datetime.date(2025, 3, 1),
+                            help='Fecha de referencia (fija para que la semilla sea reproducible)')
+        parser.add_argument('--espacios', type=int, default=3)
+        parser.add_argument('--proyectos', type=int, default=10)
+        parser.add_argument('--tareas', type=int, default=300)
+        parser.add_argument('--habitos', type=int, default=6)
+        parser.add_argument('--anios-habito', type=float, default=2)
+        parser.add_argument('--gastos', type=int, default=200)
+        parser.add_argument('--presupuestos', type=int, default=12)
+        parser.add_argument('--clases', type=int, default=12)
+        parser.add_argument('--reemplazar', action='store_true',
+                            help='Borra antes a los usuarios con el prefijo')
+
+    def handle(self, *args, **options):
+        prefijo = options['prefijo']
+        if options['reemplazar']:
+            borrados, _ = User.objects.filter(username__startswith=prefijo).delete()
+            self.stdout.write(f'Borrados {borrados} registros de usuarios {prefijo}*')
+
+        # El mismo hash para todos: correr PBKDF2 por usuario dominaría el tiempo
+        password = make_password(options['password'])
+        inicio = time.perf_counter()
+        for n in range(options['usuarios']):
+            username = f'{prefijo}{n:04d}'
+            if User.objects.filter(username=username).exists():
+                self.stdout.write(f'{username} ya existe, se salta (usa --reemplazar)')
+                continue
+            with transaction.atomic():
+                user = User.objects.create(username=username, email=f'{username}@bench.one', password=password)
+                sembrar_usuario(user, random.Random(f"{options['seed']}:{username}"), options['hoy'], options)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{options['usuarios']} usuarios sembrados con seed {options['seed']} "
+            f'en {time.perf_counter() - inicio:.1f} s'
+        ))
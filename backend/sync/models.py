@@ -1,3 +1,24 @@
 from django.db import models
+from django.conf import settings
+from django.utils import timezone
 
-# Crea tus modelos aquí.
+
+class Tombstone(models.Model):
+    """
+    Marca de borrado para el feed de cambios.
+    Cuando un registro se elimina de verdad, dejamos constancia aquí para que
+    los demás dispositivos también lo borren en su próxima sincronización.
+    """
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='tombstones')
+    tipo = models.CharField(max_length=30) # tasks, projects, habits...
+    objeto_id = models.CharField(max_length=50)
+    version = models.IntegerField(default=1)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['owner', 'updated_at'], name='tombstone_owner_updated_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo}:{self.objeto_id}"
@@ -0,0 +1,86 @@
+"""
+Registro de entidades sincronizables.
+Relaciona cada tipo que maneja el outbox del frontend (db.js) con su modelo,
+su serializador y el campo que indica quién es el dueño del registro.
+"""
+from tasks.models import Task
+from tasks.serializers import TaskSerializer
+from projects.models import Project
+from projects.serializers import ProjectSerializer
+from habits.models import Habit, HabitLog
+from habits.serializers import HabitSerializer, HabitLogSerializer
+from finanzas.models import Gasto, Presupuesto
+from finanzas.serializers import GastoSerializer, PresupuestoSerializer
+from horarios.models import Clase
+from horarios.serializers import ClaseSerializer
+
+# select_related / prefetch_related: lo que usa cada serializador al
+# representar un registro, para no caer en N+1 al listar
+ENTIDADES = {
+    'projects': {
+        'model': Project, 'serializer': ProjectSerializer, 'owner_field': 'owner',
+        'select_related': ('space', 'owner'),
+    },
+    'tasks': {
+        'model': Task, 'serializer': TaskSerializer, 'owner_field': 'owner',
+        'select_related': ('space', 'owner'),
+    },
+    'habits': {
+        'model': Habit, 'serializer': HabitSerializer, 'owner_field': 'owner',
+        'select_related': ('owner',), 'prefetch_related': ('logs',),
+    },
+    'habit-logs': {
+        'model': HabitLog, 'serializer': HabitLogSerializer, 'owner_field': 'habit__owner',
+        'deleted_field': 'habit__deleted',
+    },
+    'gastos': {
+        'model': Gasto, 'serializer': GastoSerializer, 'owner_field': 'owner',
+        'select_related': ('space', 'owner'),
+    },
+    'presupuestos': {
+        'model': Presupuesto, 'serializer': PresupuestoSerializer, 'owner_field': 'owner',
+        'select_related': ('space', 'owner'),
+    },
+    'clases': {
+        'model': Clase, 'serializer': ClaseSerializer, 'owner_field': 'owner',
+        'select_related': ('space', 'owner'),
+    },
+}
+
+# Tipos que viajan en el feed de cambios (los logs van dentro de cada hábito)
+TIPOS_FEED = ['projects', 'tasks', 'habits', 'gastos', 'presupuestos', 'clases']
+
+# Nombres de los stores de IndexedDB (frontend) -> nombre de la ruta en la API
+ALIAS = {
+    'tareas': 'tasks',
+    'proyectos': 'projects',
+    'habitos': 'habits',
+    'habitLogs': 'habit-logs',
+    'users': 'me',
+    'user': 'me',
+}
+
+
+def resolver_tipo(nombre):
+    return ALIAS.get(nombre, nombre)
+
+
+def queryset_de(tipo, user, borrados=False):
+    # Solo los registros del usuario, igual que hacen los ViewSets. Los
+    # borrados se esconden salvo para el feed, que los manda como tombstones
+    entidad = ENTIDADES[tipo]
+    queryset = entidad['model'].objects.filter(**{entidad['owner_field']: user})
+    if not borrados:
+        queryset = queryset.filter(**{entidad.get('deleted_field', 'deleted'): False})
+    if entidad.get('select_related'):
+        queryset = queryset.select_related(*entidad['select_related'])
+    if entidad.get('prefetch_related'):
+        queryset = queryset.prefetch_related(*entidad['prefetch_related'])
+    return queryset
+
+
+def tipo_de_modelo(model):
+    for tipo, entidad in ENTIDADES.items():
+        if entidad['model'] is model:
+            return tipo
+    return None
@@ -0,0 +1,41 @@
+from django.utils import timezone
+
+from accounts.models import User
+from .broker import notificar
+from .models import Tombstone
+
+
+def _borrando_cuenta(origin):
+    return isinstance(origin, User) or getattr(origin, 'model', None) is User
+
+
+def _tipo(sender):
+    from .registry import tipo_de_modelo
+    return tipo_de_modelo(sender) or 'spaces'
+
+
+def registrar_tombstone(sender, instance, origin=None, **kwargs):
+    # Si se está borrando la cuenta completa no hace falta avisar a nadie
+    if _borrando_cuenta(origin):
+        return
+
+    tombstone = Tombstone.objects.create(
+        owner_id=instance.owner_id,
+        tipo=_tipo(sender),
+        objeto_id=str(instance.pk),
+        version=instance.version + 1,
+    )
+    notificar(instance.owner_id, tombstone.tipo, tombstone.objeto_id, tombstone.version, tombstone.updated_at)
+
+
+def avisar_guardado(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    notificar(instance.owner_id, _tipo(sender), instance.pk, instance.version, instance.updated_at)
+
+
+def avisar_borrado(sender, instance, origin=None, **kwargs):
+    # Para los modelos sin tombstone (espacios)
+    if _borrando_cuenta(origin):
+        return
+    notificar(instance.owner_id, _tipo(sender), instance.pk, instance.version + 1, timezone.now())
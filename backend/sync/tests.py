@@ -1,3 +1,550 @@
-from django.test import TestCase
+import asyncio
+import datetime
+import gc
+import io
+import json
+import random
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import call_command
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from accounts import tokens
+from accounts.models import User
+from sync.broker import obtener_broker
+from one_backend.testing import PerfTestCase
+from finanzas.models import Gasto
+from habits.models import Habit, HabitLog
+from projects.models import Project
+from spaces.models import Space
+from sync.management.commands.bench_api import Cliente, Estadisticas
+from sync.models import Tombstone
+from sync.views import MAX_OPERACIONES, codificar_cursor
+from tasks.models import Task
+
+
+def leer_snapshot(response):
+    return [json.loads(linea) for linea in b''.join(response.streaming_content).splitlines()]
+
+
+class SyncTestCase(APITestCase):
+    def setUp(self):
+        # Los ids de usuario se reciclan entre pruebas y la caché de espacios no
+        cache.clear()
+        self.user = User.objects.create_user(username='ana', email='ana@one.mx')
+        self.client.force_authenticate(self.user)
+        self.espacio = Space.objects.create(id='ana-personal', owner=self.user, name='Personal')
+        # Escrituras de hace rato: la última página repite los últimos segundos
+        self.envejecer(Space.objects.filter(pk=self.espacio.pk), minutos=60)
+
+    def envejecer(self, queryset, dias=0, minutos=0):
+        queryset.update(updated_at=timezone.now() - datetime.timedelta(days=dias, minutes=minutos))
+
+    def tarea(self, pk, minutos, **campos):
+        Task.objects.create(id=pk, owner=self.user, space=self.espacio, title=pk, date='2025-03-01', **campos)
+        self.envejecer(Task.objects.filter(pk=pk), minutos=minutos)
+
+    def gasto(self, pk, minutos):
+        Gasto.objects.create(
+            id=pk, owner=self.user, space=self.espacio, descripcion=pk, fecha='2025-03-01', monto='10',
+        )
+        self.envejecer(Gasto.objects.filter(pk=pk), minutos=minutos)
+
+    def ajena(self):
+        otro = User.objects.create_user(username='beto', email='beto@one.mx')
+        return Task.objects.create(
+            id='ajena', owner=otro, space=Space.objects.create(owner=otro, name='Personal'),
+            title='Ajena', date='2025-03-01',
+        )
+
+    def feed(self, **params):
+        response = self.client.get(reverse('sync-changes'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+
+class SyncBatchTests(SyncTestCase):
+    def lote(self, *operaciones):
+        response = self.client.post(reverse('sync-batch'), {'operations': list(operaciones)}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+
+    def test_operations_apply_in_order(self):
+        resultados = self.lote(
+            {'type': 'tareas', 'action': 'upsert', 'data': {'id': 'a', 'titulo': 'Leer', 'fecha': '2025-03-01'}},
+            {'type': 'tareas', 'action': 'upsert', 'data': {'id': 'a', 'completada': True}},
+            {'type': 'tareas', 'action': 'delete', 'data': {'id': 'a'}},
+        )
+        self.assertEqual([(r['index'], r['status']) for r in resultados], [(0, 201), (1, 200), (2, 204)])
+        tarea = Task.objects.get(pk='a')
+        self.assertEqual((tarea.title, tarea.status, tarea.deleted), ('Leer', 'done', True))
+
+    def test_upsert_updates_existing_row(self):
+        self.lote({'type': 'tareas', 'action': 'upsert', 'data': {'id': 'a', 'titulo': 'Leer', 'fecha': '2025-03-01'}})
+        [resultado] = self.lote({'type': 'tareas', 'action': 'upsert', 'data': {'id': 'a', 'notas': 'cap. 3'}})
+        self.assertEqual(resultado['status'], 200)
+        self.assertEqual(resultado['data']['titulo'], 'Leer')
+        self.assertEqual(Task.objects.get(pk='a').notes, 'cap. 3')
+
+    def test_failed_operation_keeps_the_rest(self):
+        ajena = self.ajena()
+        resultados = self.lote(
+            {'type': 'tareas', 'action': 'upsert', 'data': {'id': 'a', 'titulo': 'Uno', 'fecha': '2025-03-01'}},
+            {'type': 'gastos', 'action': 'upsert', 'data': {'id': 'g'}},
+            {'type': 'tareas', 'action': 'upsert', 'data': {'id': 'ajena', 'titulo': 'Mía', 'fecha': '2025-03-01'}},
+            {'type': 'tareas', 'action': 'upsert', 'data': {'id': 'b', 'titulo': 'Dos', 'fecha': '2025-03-01'}},
+        )
+        self.assertEqual([r['status'] for r in resultados], [201, 400, 409, 201])
+        self.assertEqual(set(Task.objects.filter(owner=self.user).values_list('pk', flat=True)), {'a', 'b'})
+        ajena.refresh_from_db()
+        self.assertEqual((ajena.owner.username, ajena.title), ('beto', 'Ajena'))
+
+    def test_errors_per_operation(self):
+        resultados = self.lote(
+            {'type': 'tareas', 'action': 'delete', 'data': {'id': 'no-existe'}},
+            {'type': 'desconocido', 'action': 'upsert', 'data': {}},
+            {'type': 'tareas', 'action': 'mover', 'data': {'id': 'a'}},
+        )
+        self.assertEqual([r['status'] for r in resultados], [404, 400, 400])
+
+    def test_version_checks(self):
+        self.tarea('a', 10)
+        self.tarea('b', 10)
+        resultados = self.lote(
+            # Dos cambios encolados sin conocer la respuesta del primero
+            {'type': 'tareas', 'action': 'upsert', 'data': {'id': 'a', 'titulo': 'Uno', 'version': 1}},
+            {'type': 'tareas', 'action': 'upsert', 'data': {'id': 'a', 'notas': 'Dos', 'version': 1}},
+            {'type': 'tareas', 'action': 'upsert', 'data': {'id': 'b', 'titulo': 'Viejo', 'version': 5}},
+        )
+        self.assertEqual([resultado['status'] for resultado in resultados], [200, 200, 409])
+        self.assertEqual(resultados[1]['data']['version'], 3)
+        self.assertEqual(resultados[2]['actual']['version'], 1)
+        tarea = Task.objects.get(pk='a')
+        self.assertEqual((tarea.title, tarea.notes), ('Uno', 'Dos'))
+
+    def test_user_record(self):
+        [resultado] = self.lote({'type': 'users', 'action': 'upsert', 'data': {'nombre': 'Ana'}})
+        self.assertEqual(resultado['status'], 200)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.nombre, 'Ana')
+
+    def test_rejects_malformed_batches(self):
+        url = reverse('sync-batch')
+        self.assertEqual(self.client.post(url, {'operations': 'x'}, format='json').status_code, 400)
+        operaciones = [{'type': 'tareas', 'data': {}}] * (MAX_OPERACIONES + 1)
+        self.assertEqual(self.client.post(url, {'operations': operaciones}, format='json').status_code, 400)
+
+
+class SyncBatchPerfTests(PerfTestCase):
+    def test_batch(self):
+        operaciones = [
+            {'type': 'tareas', 'action': 'upsert', 'data': {'id': f'lote-{i}', 'titulo': 'T', 'fecha': '2025-03-01', 'espacio': 'Escuela'}}
+            for i in range(20)
+        ] + [
+            {'type': 'tareas', 'action': 'upsert', 'data': {'id': 'perf-task-2', 'completada': True}},
+            {'type': 'gastos', 'action': 'delete', 'data': {'id': 'perf-gasto-2'}},
+            {'type': 'users', 'action': 'upsert', 'data': {'nombre': 'Perf'}},
+        ]
+        response = self.medir('sync-batch', 'post', reverse('sync-batch'), max_consultas=82, data={'operations': operaciones})
+        estados = [resultado['status'] for resultado in response.data['results']]
+        self.assertEqual(estados, [201] * 20 + [200, 204, 200])
+
+
+class SyncChangesTests(SyncTestCase):
+    def test_pages_follow_updated_at(self):
+        for minutos, pk in enumerate(['e', 'd', 'c', 'b', 'a'], start=1):
+            self.tarea(pk, minutos)
+        vistos, cursor = [], None
+        while True:
+            pagina = self.feed(limit=2, **({'since': cursor} if cursor else {}))
+            vistos += [cambio['id'] for cambio in pagina['changes']]
+            cursor = pagina['cursor']
+            if not pagina['has_more']:
+                break
+        self.assertEqual(vistos, ['a', 'b', 'c', 'd', 'e'])
+        self.assertEqual(self.feed(since=cursor)['changes'], [])
+
+    def test_pages_mix_types(self):
+        # Mismo updated_at en dos tablas: el cursor desempata por tipo e id
+        self.tarea('a', 5)
+        self.gasto('a', 5)
+        Gasto.objects.filter(pk='a').update(updated_at=Task.objects.get(pk='a').updated_at)
+        self.gasto('b', 3)
+        vistos, cursor = [], None
+        while True:
+            pagina = self.feed(limit=1, **({'since': cursor} if cursor else {}))
+            vistos += [(cambio['type'], cambio['id']) for cambio in pagina['changes']]
+            cursor = pagina['cursor']
+            if not pagina['has_more']:
+                break
+        self.assertEqual(sorted(vistos[:2]), [('gastos', 'a'), ('tasks', 'a')])
+        self.assertEqual(vistos[2:], [('gastos', 'b')])
+
+    def test_deletes_reach_the_feed(self):
+        self.tarea('a', 10)
+        self.tarea('b', 5)
+        cursor = self.feed()['cursor']
+
+        self.client.delete(reverse('task-detail', args=['a']))
+        Task.objects.get(pk='b').delete()
+        cambios = self.feed(since=cursor)['changes']
+        self.assertEqual([(c['type'], c['id'], c['deleted']) for c in cambios], [('tasks', 'a', True), ('tasks', 'b', True)])
+        self.assertEqual(cambios[0], {
+            'type': 'tasks', 'id': 'a', 'version': 2, 'updated_at': cambios[0]['updated_at'], 'deleted': True,
+        })
+
+    def test_last_page_overlaps_writes_in_flight(self):
+        self.tarea('a', 10)
+        self.tarea('b', 10)
+        cursor = self.feed()['cursor']
+        self.client.patch(reverse('task-detail', args=['a']), {'status': 'done'}, format='json')
+        pagina = self.feed(since=cursor)
+        self.assertEqual([cambio['id'] for cambio in pagina['changes']], ['a'])
+
+        # Una escritura que tomó su updated_at antes que "a" y se confirmó después
+        Task.objects.filter(pk='b').update(updated_at=timezone.now() - datetime.timedelta(seconds=2))
+        cambios = self.feed(since=pagina['cursor'])['changes']
+        self.assertEqual([cambio['id'] for cambio in cambios], ['b', 'a'])
+
+    def test_other_users_changes_are_hidden(self):
+        self.ajena()
+        self.assertEqual(self.feed()['changes'], [])
+
+    def test_bad_cursor(self):
+        response = self.client.get(reverse('sync-changes'), {'since': 'basura'})
+        self.assertEqual(response.status_code, 400)
+
+
+class SyncChangesPerfTests(PerfTestCase):
+    def test_full_feed(self):
+        response = self.medir('sync-changes', 'get', reverse('sync-changes') + '?limit=100', max_consultas=10)
+        self.assertEqual(len(response.data['changes']), 100)
+        self.assertTrue(response.data['has_more'])
+
+
+class SyncRetencionTests(SyncTestCase):
+    def test_expired_cursor_is_gone(self):
+        viejo = codificar_cursor((timezone.now() - datetime.timedelta(days=91), 'tasks', 'x'))
+        response = self.client.get(reverse('sync-changes'), {'since': viejo})
+        self.assertEqual(response.status_code, 410)
+
+        with override_settings(SYNC_RETENCION_DIAS=120):
+            self.assertEqual(self.client.get(reverse('sync-changes'), {'since': viejo}).status_code, 200)
+
+    def test_compaction_purges_old_deletes(self):
+        Project.objects.create(id='p1', owner=self.user, space=self.espacio, title='Tesis')
+        Habit.objects.create(id='h1', owner=self.user, space=self.espacio, name='Leer')
+        HabitLog.objects.create(id='h1-1', habit_id='h1', date='2025-03-01')
+        for pk in ('t1', 't2', 't3'):
+            self.tarea(pk, 10)
+        self.tarea('t4', 10, project_id='p1')
+        for pk in ('t1', 't2', 't3'):
+            self.client.delete(reverse('task-detail', args=[pk]))
+        self.client.delete(reverse('habit-detail', args=['h1']))
+        self.client.delete(reverse('project-detail', args=['p1']))
+        self.envejecer(Task.objects.filter(pk__in=['t1', 't2']), dias=100)
+        self.envejecer(Habit.objects.filter(pk='h1'), dias=100)
+        self.envejecer(Project.objects.filter(pk='p1'), dias=100)
+        Tombstone.objects.create(owner=self.user, tipo='habit-logs', objeto_id='1', updated_at=timezone.now() - datetime.timedelta(days=100))
+
+        with CaptureQueriesContext(connection) as consultas:
+            call_command('compactar_borrados', lote=1, stdout=io.StringIO())
+        borrados = [q['sql'] for q in consultas.captured_queries if q['sql'].startswith('DELETE FROM "tasks_task"')]
+        self.assertEqual(len(borrados), 2)
+
+        self.assertEqual(list(Task.objects.filter(deleted=True).values_list('pk', flat=True)), ['t3'])
+        self.assertFalse(Habit.objects.filter(pk='h1').exists())
+        self.assertFalse(HabitLog.objects.filter(habit_id='h1').exists())
+        self.assertIsNone(Task.objects.get(pk='t4').project_id)
+        self.assertFalse(Tombstone.objects.exists())
+
+    def test_compaction_keeps_space_with_content(self):
+        trabajo = Space.objects.create(id='ana-trabajo', owner=self.user, name='Trabajo')
+        Task.objects.create(id='t1', owner=self.user, space=trabajo, title='Informe', date='2025-03-01')
+        self.client.delete(reverse('space-detail', args=['ana-trabajo']))
+        self.envejecer(Space.objects.filter(pk='ana-trabajo'), dias=100)
+        call_command('compactar_borrados', stdout=io.StringIO())
+        # Su tarea sigue en retención: el espacio espera a la siguiente pasada
+        self.assertTrue(Space.objects.filter(pk='ana-trabajo').exists())
+
+        self.envejecer(Task.objects.filter(pk='t1'), dias=100)
+        call_command('compactar_borrados', stdout=io.StringIO())
+        self.assertFalse(Space.objects.filter(pk='ana-trabajo').exists())
+        self.assertTrue(Space.objects.filter(pk='ana-personal').exists())
+
+    def test_compaction_uses_partial_index(self):
+        plan = Task.objects.filter(deleted=True, updated_at__lt=timezone.now()).values('pk').explain()
+        self.assertIn('task_borrados_idx', plan)
+
+
+class SyncSnapshotPerfTests(PerfTestCase):
+    def test_snapshot(self):
+        # sesión + usuario + una consulta por tipo (los hábitos traen sus logs aparte)
+        response = self.medir('sync-snapshot', 'get', reverse('sync-snapshot'), max_consultas=2 + 7 + 1)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lineas = [json.loads(linea) for linea in response.contenido.splitlines()]
+
+        tipos = [linea['type'] for linea in lineas]
+        self.assertEqual(tipos[-1], 'cursor')
+        self.assertEqual(lineas[-1]['count'], len(lineas) - 1)
+        self.assertEqual(
+            {tipo: tipos.count(tipo) for tipo in set(tipos) - {'cursor'}},
+            {'spaces': 3, 'projects': 8, 'tasks': 60, 'habits': 5, 'gastos': 60, 'presupuestos': 6, 'clases': 10},
+        )
+        # Los espacios y proyectos van antes que las tareas que los usan
+        self.assertLess(tipos.index('projects'), tipos.index('tasks'))
+        habito = next(linea['data'] for linea in lineas if linea['type'] == 'habits')
+        self.assertEqual(len(habito['registros']), 120)
+        self.assertNotIn('otro-task-1', {linea['data']['id'] for linea in lineas[:-1]})
+
+
+class SyncSnapshotTests(SyncTestCase):
+    def test_snapshot_cursor_continues_with_changes(self):
+        self.tarea('a', 10)
+        cursor = leer_snapshot(self.client.get(reverse('sync-snapshot')))[-1]['cursor']
+        self.client.patch(reverse('task-detail', args=['a']), {'status': 'done'}, format='json')
+
+        cambios = self.feed(since=cursor)['changes']
+        self.assertEqual([(cambio['type'], cambio['id']) for cambio in cambios], [('tasks', 'a')])
+
+    def test_snapshot_skips_soft_deleted(self):
+        self.tarea('a', 10)
+        self.tarea('b', 10, deleted=True)
+        lineas = leer_snapshot(self.client.get(reverse('sync-snapshot')))
+        self.assertEqual(
+            [(linea['type'], linea['data']['id']) for linea in lineas[:-1]],
+            [('spaces', 'ana-personal'), ('tasks', 'a')],
+        )
+
+
+@override_settings(ROOT_URLCONF='one_backend.urls_asgi')
+class AsyncSyncTests(SyncTestCase):
+    """Las vistas async (ASGI) responden lo mismo que las de DRF."""
+
+    def setUp(self):
+        super().setUp()
+        self.async_client.force_login(self.user)
+        for minutos, pk in enumerate(['c', 'b', 'a'], start=1):
+            self.tarea(pk, minutos)
+        self.gasto('g1', 10)
+
+    async def test_changes_match_sync_view(self):
+        url = reverse('sync-changes')
+        response = await self.async_client.get(url, {'limit': 2})
+        self.assertEqual(response.status_code, 200)
+        datos = response.json()
+        self.assertEqual([cambio['id'] for cambio in datos['changes']], ['g1', 'a'])
+        self.assertTrue(datos['has_more'])
+
+        # Misma página que la vista síncrona, también al seguir con el cursor
+        siguiente = (await self.async_client.get(url, {'limit': 2, 'since': datos['cursor']})).json()
+        with override_settings(ROOT_URLCONF='one_backend.urls'):
+            esperado = await sync_to_async(lambda: self.client.get(url, {'limit': 2}).json())()
+        self.assertEqual(datos, esperado)
+        self.assertEqual([cambio['id'] for cambio in siguiente['changes']], ['b', 'c'])
+
+        response = await self.async_client.get(url, {'since': 'basura'})
+        self.assertEqual(response.status_code, 400)
+
+    async def test_me_and_streak(self):
+        me = (await self.async_client.get(reverse('user-me'))).json()
+        self.assertEqual(me['username'], 'ana')
+
+        response = await self.async_client.patch(
+            reverse('user-me'), {'nombre': 'Asíncrono'}, content_type='application/json'
+        )
+        self.assertEqual(response.json()['nombre'], 'Asíncrono')
+
+        racha = (await self.async_client.get(reverse('streak'))).json()
+        self.assertEqual(set(racha), {'streak', 'energy', 'habitosStreak', 'habitos'})
+
+    async def test_batch(self):
+        operaciones = [
+            {'type': 'tareas', 'action': 'upsert', 'data': {'id': 'async-1', 'titulo': 'T', 'fecha': '2025-03-01', 'espacio': 'Escuela'}},
+            {'type': 'gastos', 'action': 'delete', 'data': {'id': 'g1'}},
+        ]
+        response = await self.async_client.post(
+            reverse('sync-batch'), {'operations': operaciones}, content_type='application/json'
+        )
+        self.assertEqual([resultado['status'] for resultado in response.json()['results']], [201, 204])
+        self.assertTrue(await Task.objects.filter(pk='async-1', owner=self.user).aexists())
+
+    async def test_authentication(self):
+        await sync_to_async(self.async_client.logout)()
+        response = await self.async_client.get(reverse('sync-changes'))
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['WWW-Authenticate'], 'Token')
+        # Sin sesión la racha es la vacía, igual que en WSGI
+        self.assertEqual((await self.async_client.get(reverse('streak'))).json()['streak'], 0)
+
+        _, clave = await sync_to_async(tokens.crear)(self.user)
+        response = await self.async_client.get(reverse('user-me'), headers={'Authorization': f'Token {clave}'})
+        self.assertEqual(response.json()['username'], 'ana')
+        response = await self.async_client.get(reverse('user-me'), headers={'Authorization': 'Token one_falso'})
+        self.assertEqual(response.status_code, 401)
+
+
+@override_settings(ROOT_URLCONF='one_backend.urls_asgi', SYNC_EVENTOS_LATIDO=0.05)
+class SyncEventsTests(SyncTestCase):
+    def setUp(self):
+        super().setUp()
+        self.async_client.force_login(self.user)
+        self.tarea('t1', 10)
+        self.tarea('t2', 10)
+        self.gasto('g1', 10)
+        self.ajena()
+
+    async def siguiente_aviso(self, contenido):
+        # Se saltan los latidos (": ping")
+        while True:
+            bloque = (await asyncio.wait_for(anext(contenido), 2)).decode()
+            if not bloque.startswith(':'):
+                return bloque
+
+    def leer_aviso(self, bloque):
+        campos = dict(linea.split(': ', 1) for linea in bloque.strip().splitlines())
+        return campos.get('id'), json.loads(campos['data'])
+
+    def completar_tarea(self, pk):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('task-detail', args=[pk]), {'status': 'done'}, format='json')
+
+    async def test_notifies_own_changes(self):
+        response = await self.async_client.get(reverse('sync-events'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        contenido = aiter(response.streaming_content)
+        self.assertTrue((await anext(contenido)).startswith(b'retry:'))
+        broker = obtener_broker()
+        self.assertEqual(broker.suscriptores(self.user.pk), 1)
+
+        # Un cambio de otro usuario no llega; el propio sí, ya confirmado
+        await sync_to_async(self.cambiar_de_otro)()
+        await sync_to_async(self.completar_tarea)('t1')
+        cursor, aviso = self.leer_aviso(await self.siguiente_aviso(contenido))
+        self.assertEqual(aviso, {'type': 'tasks', 'id': 't1', 'version': 2})
+
+        # El id del evento es un cursor válido para el feed
+        cambios = (await self.async_client.get(reverse('sync-changes'), {'since': cursor})).json()['changes']
+        self.assertNotIn('t1', [cambio['id'] for cambio in cambios])
+
+        # Conexión cortada: Django suelta el generador y la suscripción se va con él
+        await contenido.aclose()
+        del response, contenido
+        gc.collect()
+        await asyncio.sleep(0)
+        self.assertEqual(broker.suscriptores(self.user.pk), 0)
+
+    def cambiar_de_otro(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.get(pk='ajena').save()
+
+    async def test_heartbeat(self):
+        response = await self.async_client.get(reverse('sync-events'))
+        contenido = aiter(response.streaming_content)
+        await anext(contenido)
+        self.assertEqual(await asyncio.wait_for(anext(contenido), 2), b': ping\n\n')
+        await contenido.aclose()
+
+    @override_settings(SYNC_EVENTOS_MAX_SEGUNDOS=0.2)
+    async def test_stream_ends_by_itself(self):
+        # Sin aclose(): el servidor no se entera de que el cliente se fue
+        response = await self.async_client.get(reverse('sync-events'))
+        contenido = aiter(response.streaming_content)
+        self.assertTrue((await anext(contenido)).startswith(b'retry:'))
+        broker = obtener_broker()
+        self.assertEqual(broker.suscriptores(self.user.pk), 1)
+
+        async def leer_resto():
+            return [bloque async for bloque in contenido]
+
+        await asyncio.wait_for(leer_resto(), 2)
+        self.assertEqual(broker.suscriptores(self.user.pk), 0)
+
+    async def test_reconnect_replays_missed(self):
+        inicio = (await self.async_client.get(reverse('sync-changes'), {'limit': 2000})).json()['cursor']
+        await sync_to_async(self.completar_tarea)('t2')
+        await sync_to_async(self.borrar_gasto)('g1')
+
+        response = await self.async_client.get(reverse('sync-events'), headers={'Last-Event-ID': inicio})
+        contenido = aiter(response.streaming_content)
+        await anext(contenido)
+        avisos = [self.leer_aviso(await self.siguiente_aviso(contenido))[1] for _ in range(2)]
+        self.assertEqual(avisos, [
+            {'type': 'tasks', 'id': 't2', 'version': 2},
+            {'type': 'gastos', 'id': 'g1', 'version': 2},
+        ])
+        await contenido.aclose()
+
+        response = await self.async_client.get(reverse('sync-events'), {'since': 'basura'})
+        self.assertEqual(response.status_code, 400)
+
+    def borrar_gasto(self, pk):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('gasto-detail', args=[pk]))
+
+    async def test_requires_login(self):
+        await sync_to_async(self.async_client.logout)()
+        self.assertEqual((await self.async_client.get(reverse('sync-events'))).status_code, 401)
+
+
+class SeedBenchTests(TestCase):
+    def sembrar(self):
+        call_command(
+            'seed_bench', usuarios=2, seed=5, reemplazar=True, tareas=20, proyectos=3, habitos=2,
+            anios_habito=0.5, gastos=10, presupuestos=4, clases=3, stdout=io.StringIO(),
+        )
+        return (
+            list(Task.objects.filter(owner__username='bench0001').order_by('pk').values_list('pk', 'date', 'status')),
+            list(Project.objects.order_by('pk').values_list('project_tasks', flat=True)),
+            HabitLog.objects.filter(habit__owner__username__startswith='bench').count(),
+        )
+
+    def test_same_seed_same_data(self):
+        tareas, proyectos, registros = self.sembrar()
+        self.assertEqual(len(tareas), 20)
+        self.assertEqual(len(proyectos), 6)
+        # Medio año por hábito, con algunos días sin registro
+        self.assertTrue(2 * 2 * 100 < registros < 2 * 2 * 183)
+        self.assertEqual(self.sembrar(), (tareas, proyectos, registros))
+
+
+# El cliente del bench llama con Host: localhost
+@override_settings(ALLOWED_HOSTS=['localhost'])
+class BenchApiTests(TestCase):
+    def setUp(self):
+        call_command(
+            'seed_bench', usuarios=1, seed=5, reemplazar=True, tareas=5, proyectos=2, habitos=1,
+            anios_habito=0.1, gastos=2, presupuestos=1, clases=1, stdout=io.StringIO(),
+        )
+        # Como el cliente de pruebas de Django: el WSGIHandler no debe cerrar la conexión de la prueba
+        request_started.disconnect(close_old_connections)
+        request_finished.disconnect(close_old_connections)
+        self.addCleanup(request_started.connect, close_old_connections)
+        self.addCleanup(request_finished.connect, close_old_connections)
+
+    def test_repeated_edits_keep_local_version(self):
+        user = User.objects.filter(username__startswith='bench').get()
+        _, clave = tokens.crear(user, nombre='prueba')
+        stats = Estadisticas()
+        cliente = Cliente(WSGIHandler(), user, clave, random.Random(1), 0, stats)
+        cliente.carga_inicial()
+        # Siempre la misma tarea y el mismo proyecto: cada PATCH lleva la versión del anterior
+        cliente.locales['tasks'] = cliente.locales['tasks'][:1]
+        cliente.locales['projects'] = cliente.locales['projects'][:1]
+        for _ in range(3):
+            cliente.completar_tarea()
+            cliente.editar_proyecto()
+
+        rutas, total = stats.resumen(1)
+        self.assertEqual(rutas['PATCH task-detail']['peticiones'], 3)
+        self.assertEqual(rutas['PATCH project-detail']['peticiones'], 3)
+        self.assertEqual(total['errores'], 0)
+        self.assertEqual(cliente.locales['tasks'][0]['version'], 4)
@@ -1,3 +1,428 @@
-from django.shortcuts import render
+import base64
+import datetime
+import heapq
+import json
+from collections import defaultdict
 
-# Crea tus vistas aquí.
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import status, views
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from accounts.serializers import UserSerializer
+from one_backend import upsert
+from one_backend.borrado import borrar, fue_borrado
+from one_backend.versiones import BORRADO, Conflicto
+from habits.models import Habit
+from spaces.models import Space
+from spaces.serializers import SpaceSerializer
+from spaces.services import olvidar_resolver
+from .models import Tombstone
+from .registry import ENTIDADES, TIPOS_FEED, resolver_tipo, queryset_de
+
+# Límite de operaciones por petición (el frontend manda el outbox en bloques)
+MAX_OPERACIONES = 500
+
+# Tamaño de página del feed de cambios
+CAMBIOS_POR_PAGINA = 500
+MAX_CAMBIOS_POR_PAGINA = 2000
+
+# Filas que se leen por vuelta al exportar el snapshot
+FILAS_POR_BLOQUE = 500
+# El cursor final del snapshot y de la última página del feed se echa un poco
+# para atrás para no perder escrituras que estaban en curso al leer (repetir
+# un cambio no hace daño)
+MARGEN_CURSOR = datetime.timedelta(seconds=5)
+
+
+class SyncBatchView(views.APIView):
+    """
+    Aplica un outbox completo en una sola petición.
+    Recibe una lista ordenada de operaciones {type, action, data} y regresa
+    un resultado por operación. Todo corre dentro de una transacción; cada
+    operación usa su propio savepoint para que un error no tumbe a las demás.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        operaciones = request.data
+        if isinstance(operaciones, dict):
+            operaciones = operaciones.get('operations')
+
+        if not isinstance(operaciones, list):
+            return Response(
+                {"error": "Se esperaba una lista de operaciones"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(operaciones) > MAX_OPERACIONES:
+            return Response(
+                {"error": f"Máximo {MAX_OPERACIONES} operaciones por petición"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        resultados = []
+        with transaction.atomic():
+            instancias = self.precargar(request.user, operaciones)
+            bases = {}
+            for index, operacion in enumerate(operaciones):
+                try:
+                    with transaction.atomic():
+                        resultado = self.aplicar(request, operacion, instancias, bases)
+                except upsert.Existente as existente:
+                    # Alguien lo creó después de la precarga, o el id es de otro usuario
+                    olvidar_resolver(request)
+                    resultado = self.reintentar(request, operacion, instancias, bases, existente.args[0])
+                except Conflicto as conflicto:
+                    self.descartar(request, operacion, instancias)
+                    resultado = self.conflicto(request, operacion, conflicto)
+                except IntegrityError as error:
+                    self.descartar(request, operacion, instancias)
+                    resultado = {'status': status.HTTP_409_CONFLICT, 'errors': str(error)}
+                resultado['index'] = index
+                resultados.append(resultado)
+
+        return Response({'results': resultados})
+
+    def precargar(self, user, operaciones):
+        """
+        Los registros que tocan las operaciones, una consulta por tipo:
+        {(tipo, id): instancia}. Lo que no aparece aquí es nuevo y se crea
+        con un solo INSERT ... ON CONFLICT DO NOTHING.
+        """
+        ids = defaultdict(set)
+        for operacion in operaciones:
+            if not isinstance(operacion, dict) or not isinstance(operacion.get('data'), dict):
+                continue
+            tipo = resolver_tipo(operacion.get('type'))
+            if tipo in ENTIDADES and operacion['data'].get('id') is not None:
+                ids[tipo].add(str(operacion['data']['id']))
+
+        instancias = {}
+        for tipo, pks in ids.items():
+            for instance in queryset_de(tipo, user).filter(pk__in=pks):
+                instancias[(tipo, instance.pk)] = instance
+        return instancias
+
+    def reintentar(self, request, operacion, instancias, bases, pk):
+        tipo = resolver_tipo(operacion.get('type'))
+        instance = queryset_de(tipo, request.user).filter(pk=pk).first()
+        if instance is None:
+            if fue_borrado(ENTIDADES[tipo]['model'], pk, request.user):
+                return self.conflicto(request, operacion, Conflicto(None, BORRADO))
+            return {'status': status.HTTP_409_CONFLICT, 'errors': 'Ya existe un registro con este id'}
+        instancias[(tipo, pk)] = instance
+        try:
+            with transaction.atomic():
+                return self.aplicar(request, operacion, instancias, bases)
+        except Conflicto as conflicto:
+            self.descartar(request, operacion, instancias)
+            return self.conflicto(request, operacion, conflicto)
+        except IntegrityError as error:
+            self.descartar(request, operacion, instancias)
+            return {'status': status.HTTP_409_CONFLICT, 'errors': str(error)}
+
+    def conflicto(self, request, operacion, conflicto):
+        # Igual que VersionMixin: 409 con la fila como está en el servidor
+        actual = None
+        if conflicto.actual is not None:
+            serializer_class = ENTIDADES[resolver_tipo(operacion.get('type'))]['serializer']
+            actual = serializer_class(conflicto.actual, context={'request': request}).data
+        return {'status': status.HTTP_409_CONFLICT, 'errors': str(conflicto.detail), 'actual': actual}
+
+    def descartar(self, request, operacion, instancias):
+        # El savepoint se deshizo: la instancia en memoria puede traer cambios
+        # que no quedaron guardados, y un espacio recién creado ya no existe
+        olvidar_resolver(request)
+        data = operacion.get('data') if isinstance(operacion, dict) else None
+        if isinstance(data, dict) and data.get('id') is not None:
+            instancias.pop((resolver_tipo(operacion.get('type')), str(data['id'])), None)
+
+    def aplicar(self, request, operacion, instancias, bases):
+        if not isinstance(operacion, dict):
+            return {'status': status.HTTP_400_BAD_REQUEST, 'errors': 'Operación inválida'}
+
+        tipo = resolver_tipo(operacion.get('type'))
+        accion = operacion.get('action', 'upsert')
+        data = operacion.get('data') or {}
+        if not isinstance(data, dict):
+            return {'status': status.HTTP_400_BAD_REQUEST, 'errors': 'data debe ser un objeto'}
+        data = dict(data)
+
+        # El usuario siempre es PATCH sobre /api/me/
+        if tipo == 'me':
+            serializer = UserSerializer(request.user, data=data, partial=True)
+            return self.guardar(serializer, status.HTTP_200_OK)
+
+        if tipo not in ENTIDADES:
+            return {'status': status.HTTP_400_BAD_REQUEST, 'errors': f"Tipo desconocido: {operacion.get('type')}"}
+
+        instance = None
+        if data.get('id') is not None:
+            data['id'] = str(data['id'])
+            instance = instancias.get((tipo, data['id']))
+
+        if accion == 'delete':
+            if instance is None:
+                return {'status': status.HTTP_404_NOT_FOUND, 'id': data.get('id')}
+            if tipo == 'habit-logs':
+                instance.delete()
+            else:
+                borrar(instance, data.get('version'))
+            del instancias[(tipo, data['id'])]
+            return {'status': status.HTTP_204_NO_CONTENT, 'id': data['id']}
+
+        if accion not in ('upsert', 'create', 'update'):
+            return {'status': status.HTTP_400_BAD_REQUEST, 'errors': f"Acción desconocida: {accion}"}
+
+        extra = {}
+        if tipo == 'habit-logs' and instance is None:
+            # HabitLogSerializer no expone el hábito, lo buscamos aparte
+            habit = Habit.objects.filter(owner=request.user, deleted=False, pk=str(data.get('habit'))).first()
+            if habit is None:
+                return {'status': status.HTTP_400_BAD_REQUEST, 'errors': 'Hábito no encontrado'}
+            extra['habit'] = habit
+            if data.get('id'):
+                extra['id'] = data['id']
+
+        # Varias operaciones del lote sobre el mismo registro traen la misma
+        # versión (el cliente las encoló sin conocer las respuestas): después
+        # de la primera, esa versión ya significa "la que dejó este lote"
+        clave = (tipo, data.get('id'))
+        enviada = data.get('version')
+        if instance is not None and enviada is not None and bases.get(clave) == enviada:
+            data['version'] = instance.version
+
+        # Actualización parcial si ya existe; si es nuevo, alta con el id del
+        # cliente (los registros de hábito pasan por su save(), que ajusta rachas)
+        serializer_class = ENTIDADES[tipo]['serializer']
+        serializer = serializer_class(
+            instance,
+            data=data,
+            partial=instance is not None,
+            context={'request': request, 'upsert': tipo != 'habit-logs' and data.get('id') is not None}
+        )
+        codigo = status.HTTP_200_OK if instance is not None else status.HTTP_201_CREATED
+        resultado = self.guardar(serializer, codigo, **extra)
+        if serializer.instance is not None and data.get('id') is not None:
+            instancias[clave] = serializer.instance
+            if instance is not None and enviada is not None and resultado['status'] == status.HTTP_200_OK:
+                bases.setdefault(clave, enviada)
+        return resultado
+
+    def guardar(self, serializer, codigo, **extra):
+        if not serializer.is_valid():
+            return {'status': status.HTTP_400_BAD_REQUEST, 'errors': serializer.errors}
+        instance = serializer.save(**extra)
+        # Igual que UpdateModelMixin: los registros precargados ya no sirven
+        if getattr(instance, '_prefetched_objects_cache', None):
+            instance._prefetched_objects_cache = {}
+        return {'status': codigo, 'data': serializer.data}
+
+
+def codificar_cursor(clave):
+    fecha, tipo, objeto_id = clave
+    texto = json.dumps([fecha.isoformat(), tipo, objeto_id])
+    return base64.urlsafe_b64encode(texto.encode()).decode()
+
+
+def decodificar_cursor(cursor):
+    # Regresa (fecha, tipo, id) o lanza ValueError si el cursor no es válido
+    try:
+        fecha, tipo, objeto_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (TypeError, ValueError, UnicodeDecodeError, base64.binascii.Error):
+        raise ValueError('Cursor inválido')
+    fecha = parse_datetime(fecha) if isinstance(fecha, str) else None
+    if fecha is None:
+        raise ValueError('Cursor inválido')
+    return fecha, str(tipo), str(objeto_id)
+
+
+class CursorVencido(ValueError):
+    """El cursor es más viejo que SYNC_RETENCION_DIAS: pudo perderse un borrado compactado."""
+
+
+def cursor_vigente(clave):
+    # compactar_borrados quita las filas borradas más viejas que la retención;
+    # un cliente que se quedó antes de eso tiene que volver a bajar todo
+    limite = timezone.now() - datetime.timedelta(days=settings.SYNC_RETENCION_DIAS)
+    if clave[0] < limite:
+        raise CursorVencido('El cursor venció, hay que volver a sincronizar todo')
+    return clave
+
+
+def despues_de(clave, tipo, campo_tipo=None, campo_id='pk'):
+    """
+    Filtro para las filas que van después del cursor.
+    El orden global es (updated_at, tipo, id), igual en todas las tablas.
+    """
+    fecha, tipo_cursor, id_cursor = clave
+    mismo_momento = Q(updated_at=fecha)
+    if campo_tipo:
+        # Tabla con varios tipos (tombstones): el tipo es una columna más
+        siguiente = Q(**{f'{campo_tipo}__gt': tipo_cursor}) | Q(**{campo_tipo: tipo_cursor, f'{campo_id}__gt': id_cursor})
+        return Q(updated_at__gt=fecha) | (mismo_momento & siguiente)
+    if tipo > tipo_cursor:
+        return Q(updated_at__gte=fecha)
+    if tipo < tipo_cursor:
+        return Q(updated_at__gt=fecha)
+    return Q(updated_at__gt=fecha) | (mismo_momento & Q(**{f'{campo_id}__gt': id_cursor}))
+
+
+def parametros_feed(query_params):
+    """
+    (limite, clave del cursor o None, since) o ValueError con el mensaje para
+    el cliente (CursorVencido si el cursor ya pasó la retención).
+    """
+    try:
+        limite = int(query_params.get('limit', CAMBIOS_POR_PAGINA))
+    except ValueError:
+        raise ValueError('limit debe ser un número')
+    limite = max(1, min(limite, MAX_CAMBIOS_POR_PAGINA))
+
+    since = query_params.get('since')
+    clave = cursor_vigente(decodificar_cursor(since)) if since else None
+    return limite, clave, since
+
+
+def cursor_siguiente(pagina, has_more, since):
+    """
+    Cursor para seguir el feed. Entre páginas es la última fila (así avanza);
+    en la última página no pasa de ahora - MARGEN_CURSOR: una escritura en
+    curso pudo tomar su updated_at antes y confirmarse después de leer. Lo
+    repetido el cliente lo descarta por versión.
+    """
+    if not pagina:
+        return since
+    clave = pagina[-1][0]
+    if not has_more:
+        clave = min(clave, (timezone.now() - MARGEN_CURSOR, '', ''))
+    return codificar_cursor(clave)
+
+
+def consultas_feed(user, clave, limite, solo_versiones=False):
+    """
+    Una consulta por tabla, ya filtrada después del cursor, ordenada y con a lo
+    más limite + 1 filas. Los tombstones van al final con tipo None.
+    Son querysets sin evaluar: la vista async los recorre con el ORM async.
+    Con solo_versiones se leen solo id, fecha y versión (avisos SSE).
+    """
+    consultas = []
+    for tipo in TIPOS_FEED:
+        queryset = queryset_de(tipo, user, borrados=True)
+        if solo_versiones:
+            queryset = queryset.select_related(None).prefetch_related(None).only('pk', 'updated_at', 'version')
+        if clave:
+            queryset = queryset.filter(despues_de(clave, tipo))
+        consultas.append((tipo, queryset.order_by('updated_at', 'pk')[:limite + 1]))
+
+    tombstones = Tombstone.objects.filter(owner=user)
+    if clave:
+        tombstones = tombstones.filter(despues_de(clave, None, campo_tipo='tipo', campo_id='objeto_id'))
+    consultas.append((None, tombstones.order_by('updated_at', 'tipo', 'objeto_id')[:limite + 1]))
+    return consultas
+
+
+def armar_pagina(fuentes, limite):
+    """Mezcla las filas de cada tabla en el orden global. Regresa (página, has_more)."""
+    ordenadas = []
+    for tipo, filas in fuentes:
+        if tipo is None:
+            ordenadas.append([((t.updated_at, t.tipo, t.objeto_id), t) for t in filas])
+        else:
+            ordenadas.append([((fila.updated_at, tipo, str(fila.pk)), fila) for fila in filas])
+
+    pagina = []
+    for elemento in heapq.merge(*ordenadas, key=lambda par: par[0]):
+        pagina.append(elemento)
+        if len(pagina) > limite:
+            break
+    return pagina[:limite], len(pagina) > limite
+
+
+def serializar_cambios(pagina, request):
+    cambios = []
+    for (fecha, tipo, objeto_id), objeto in pagina:
+        cambio = {
+            'type': tipo,
+            'id': objeto_id,
+            'version': objeto.version,
+            'updated_at': fecha.isoformat(),
+            'deleted': isinstance(objeto, Tombstone) or objeto.deleted,
+        }
+        if not cambio['deleted']:
+            serializer_class = ENTIDADES[tipo]['serializer']
+            cambio['data'] = serializer_class(objeto, context={'request': request}).data
+        cambios.append(cambio)
+    return cambios
+
+
+class SyncChangesView(views.APIView):
+    """
+    Feed incremental de cambios: /api/sync/changes/?since=<cursor>&limit=<n>
+    Regresa en orden estable todo lo creado, modificado o borrado después del
+    cursor, incluyendo tombstones para que los borrados también se propaguen.
+    Sin `since` empieza desde el principio.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            limite, clave, since = parametros_feed(request.query_params)
+        except CursorVencido as error:
+            return Response({"error": str(error)}, status=status.HTTP_410_GONE)
+        except ValueError as error:
+            return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Cada tabla aporta a lo más limite + 1 filas ya ordenadas; luego se mezclan
+        fuentes = [(tipo, list(queryset)) for tipo, queryset in consultas_feed(request.user, clave, limite)]
+        pagina, has_more = armar_pagina(fuentes, limite)
+
+        cambios = serializar_cambios(pagina, request)
+        cursor = cursor_siguiente(pagina, has_more, since)
+        return Response({'changes': cambios, 'cursor': cursor, 'has_more': has_more})
+
+
+class SyncSnapshotView(views.APIView):
+    """
+    Exporta todo lo del usuario como NDJSON: /api/sync/snapshot/
+    Una línea por registro ({"type": ..., "data": ...}) en orden de
+    dependencias (espacios, proyectos, tareas, ...) y al final una línea
+    {"type": "cursor", "cursor": ...} para seguir con /api/sync/changes/.
+    Las filas se leen en bloques con iterator(), así la memoria no crece con
+    el tamaño de los datos (en PostgreSQL usa cursores del lado del servidor).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        # El cursor se fija antes de leer: lo que cambie mientras se exporta
+        # vuelve a llegar por el feed de cambios
+        inicio = timezone.now() - MARGEN_CURSOR
+        response = StreamingHttpResponse(self.lineas(request, inicio), content_type='application/x-ndjson')
+        response['Cache-Control'] = 'no-store'
+        return response
+
+    def fuentes(self, request):
+        espacios = Space.objects.filter(owner=request.user, deleted=False)
+        yield 'spaces', espacios.order_by('pk'), SpaceSerializer
+        for tipo in TIPOS_FEED:
+            queryset = queryset_de(tipo, request.user).order_by('pk')
+            yield tipo, queryset, ENTIDADES[tipo]['serializer']
+
+    def lineas(self, request, inicio):
+        encoder = JSONEncoder(ensure_ascii=False)
+        total = 0
+        for tipo, queryset, serializer_class in self.fuentes(request):
+            serializer = serializer_class(context={'request': request})
+            for objeto in queryset.iterator(chunk_size=FILAS_POR_BLOQUE):
+                data = serializer.to_representation(objeto)
+                total += 1
+                yield encoder.encode({'type': tipo, 'data': data}) + '\n'
+
+        cursor = codificar_cursor((inicio, '', ''))
+        yield encoder.encode({'type': 'cursor', 'cursor': cursor, 'count': total}) + '\n'
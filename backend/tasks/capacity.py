@@ -0,0 +1,147 @@
+"""
+Motor de capacidad: horas estimadas por día para una semana.
+Reemplaza el cálculo de capacidad.js, que recorría todas las tareas del usuario
+en el navegador. Aquí la suma se hace en la base de datos y se guarda en caché
+por usuario y semana. Guardar o borrar una tarea quita su semana; los cambios
+masivos (update(), bulk_create()...) no dicen qué semanas tocaron y suben la
+versión de capacidad del usuario, que va dentro de cada valor guardado.
+"""
+import datetime
+import hashlib
+import json
+import time
+
+from django.core.cache import cache
+from django.db.models import Case, DurationField, ExpressionWrapper, F, FloatField, Sum, Value, When
+from django.utils.dateparse import parse_date
+
+from horarios.models import Clase
+from .models import Task
+
+# Mismas palabras clave que usaba capacidad.js; el orden define la prioridad
+PESOS_DEFAULT = {
+    'proyecto': 3.0, 'examen': 3.0, 'tesis': 3.0, 'entrega': 3.0,
+    'leer': 0.5, 'revisar': 0.5, 'mail': 0.5,
+    'clase': 1.5, 'reunion': 1.5, 'junta': 1.5,
+}
+
+CACHE_TTL = 60 * 60 * 24
+
+
+def pesos_de(user):
+    # El usuario puede ajustar los pesos en preferences['pesosCapacidad'] = {"palabra": horas}
+    pesos = (user.preferences or {}).get('pesosCapacidad')
+    if not isinstance(pesos, dict) or not pesos:
+        return PESOS_DEFAULT
+
+    validos = {}
+    for palabra, horas in pesos.items():
+        try:
+            validos[str(palabra).lower()] = float(horas)
+        except (TypeError, ValueError):
+            continue
+    return validos or PESOS_DEFAULT
+
+
+def lunes_de(fecha):
+    if isinstance(fecha, str):
+        fecha = parse_date(fecha)
+    return fecha - datetime.timedelta(days=fecha.weekday())
+
+
+def clave_semana(user_id, lunes):
+    return f'capacidad:{user_id}:{lunes.isoformat()}'
+
+
+def clave_clases(user_id):
+    return f'capacidad:clases:{user_id}'
+
+
+def clave_version(user_id):
+    return f'capacidad:v:{user_id}'
+
+
+def version(user_id):
+    clave = clave_version(user_id)
+    actual = cache.get(clave)
+    if actual is None:
+        # Desde el reloj, como en readcache: una clave perdida no regresa a una versión vieja
+        cache.add(clave, time.time_ns(), CACHE_TTL * 2)
+        actual = cache.get(clave)
+    return actual
+
+
+def invalidar_usuario(user_id):
+    try:
+        cache.incr(clave_version(user_id))
+    except ValueError:
+        # Sin versión guardada, lo que haya en caché ya no coincide con la siguiente
+        pass
+
+
+def invalidar_semana(user_id, fecha):
+    if fecha:
+        cache.delete(clave_semana(user_id, lunes_de(fecha)))
+
+
+def invalidar_clases(user_id):
+    cache.delete(clave_clases(user_id))
+
+
+def horas_tareas(user, lunes, pesos, vigente):
+    """Horas de tareas pendientes por fecha: {'2025-03-03': 4.5, ...}"""
+    huella = hashlib.md5(json.dumps(pesos).encode()).hexdigest()
+    guardado = cache.get(clave_semana(user.pk, lunes))
+    if guardado and guardado['pesos'] == huella and guardado.get('version') == vigente:
+        return guardado['horas']
+
+    # Si el título tiene una palabra clave usamos su peso; si no, la duración de la tarea
+    peso = Case(
+        *[When(title__icontains=palabra, then=Value(horas)) for palabra, horas in pesos.items()],
+        default=F('duration_min') / 60.0,
+        output_field=FloatField(),
+    )
+    filas = (
+        Task.objects.filter(owner=user, deleted=False, date__gte=lunes, date__lte=lunes + datetime.timedelta(days=6))
+        .exclude(status='done')
+        .values('date')
+        .annotate(horas=Sum(peso))
+    )
+    horas = {fila['date'].isoformat(): float(fila['horas']) for fila in filas}
+    cache.set(clave_semana(user.pk, lunes), {'pesos': huella, 'horas': horas, 'version': vigente}, CACHE_TTL)
+    return horas
+
+
+def horas_clases(user, vigente):
+    """Horas de clase por día de la semana (0 = lunes): {0: 3.5, ...}"""
+    guardado = cache.get(clave_clases(user.pk))
+    if guardado is not None and guardado['version'] == vigente:
+        return guardado['horas']
+
+    duracion = ExpressionWrapper(F('hora_fin') - F('hora_inicio'), output_field=DurationField())
+    filas = Clase.objects.filter(owner=user, deleted=False).values('dia_semana').annotate(total=Sum(duracion))
+    horas = {fila['dia_semana']: fila['total'].total_seconds() / 3600 for fila in filas if fila['total']}
+    cache.set(clave_clases(user.pk), {'horas': horas, 'version': vigente}, CACHE_TTL)
+    return horas
+
+
+def calcular_semana(user, fecha):
+    lunes = lunes_de(fecha)
+    vigente = version(user.pk)
+    tareas = horas_tareas(user, lunes, pesos_de(user), vigente)
+    clases = horas_clases(user, vigente)
+
+    dias = []
+    for i in range(7):
+        dia = lunes + datetime.timedelta(days=i)
+        horas_tarea = round(tareas.get(dia.isoformat(), 0.0), 2)
+        horas_clase = round(clases.get(i, 0.0), 2)
+        dias.append({
+            'fecha': dia.isoformat(),
+            'horasTareas': horas_tarea,
+            'horasClases': horas_clase,
+            'horasEstimadas': round(horas_tarea + horas_clase, 2),
+        })
+
+    anio, semana, _ = lunes.isocalendar()
+    return {'semana': f'{anio}-W{semana:02d}', 'inicio': lunes.isoformat(), 'dias': dias}
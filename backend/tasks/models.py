@@ -2,6 +2,8 @@ from django.db import models
 from django.conf import settings
 import uuid
 
+from one_backend.readcache import InvalidaCacheQuerySet
+
 class Task(models.Model):
     id = models.CharField(max_length=50, primary_key=True, default=uuid.uuid4, editable=False)
     owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='tasks')
@@ -31,5 +33,27 @@ class Task(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     deleted = models.BooleanField(default=False)
 
+    objects = InvalidaCacheQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['owner', 'updated_at'], name='task_owner_updated_idx'),
+            # Las consultas de filas vivas (listas, capacidad, rachas) no pasan por los borrados
+            models.Index(fields=['owner', 'updated_at'], condition=models.Q(deleted=False), name='task_owner_vivos_idx'),
+            models.Index(fields=['owner', 'date'], condition=models.Q(deleted=False), name='task_owner_date_idx'),
+            # Solo los borrados, para compactar_borrados
+            models.Index(fields=['updated_at'], condition=models.Q(deleted=True), name='task_borrados_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Recordamos la fecha cargada para saber si la tarea cambió de semana
+        instance._fecha_original = instance.__dict__.get('date')
+        # y si contaba para la racha (hecha y no borrada)
+        if {'date', 'status', 'deleted'} <= set(field_names):
+            instance._racha_original = (instance.date, instance.status == 'done' and not instance.deleted)
+        return instance
+
     def __str__(self):
         return f"{self.title} ({self.date})"
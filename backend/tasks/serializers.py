@@ -1,8 +1,11 @@
 from rest_framework import serializers
+from one_backend.metricas import MedirSerializerMixin
+from one_backend.upsert import UpsertSerializerMixin
+from one_backend.versiones import VersionSerializerMixin
 from .models import Task
-from spaces.models import Space
+from spaces.services import resolver_espacio
 
-class TaskSerializer(serializers.ModelSerializer):
+class TaskSerializer(MedirSerializerMixin, VersionSerializerMixin, UpsertSerializerMixin, serializers.ModelSerializer):
     id = serializers.CharField(required=False)
     # Frontend keys mapping
     titulo = serializers.CharField(source='title', required=False)
@@ -32,7 +35,7 @@ class TaskSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'titulo', 'fecha', 'horaInicio', 'horaFin', 
             'color', 'espacio', 'espacio_nombre', 'completada', 'notas', 'status',
-            'owner_email'
+            'owner_email', 'version'
         ]
         extra_kwargs = {
             'title': {'required': False}, 
@@ -59,7 +62,7 @@ class TaskSerializer(serializers.ModelSerializer):
         espacio_name = validated_data.pop('espacio', 'Personal')
         
         # Find or create space
-        space, _ = Space.objects.get_or_create(owner=user, name=espacio_name)
+        space = resolver_espacio(self.context['request'], espacio_name)
         
         validated_data['space'] = space
         validated_data['owner'] = user
@@ -68,9 +71,8 @@ class TaskSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         if 'espacio' in validated_data:
             espacio_name = validated_data.pop('espacio')
-            user = self.context['request'].user
-            space, _ = Space.objects.get_or_create(owner=user, name=espacio_name)
-            instance.space = space
+            space = resolver_espacio(self.context['request'], espacio_name)
+            validated_data['space'] = space
             
         return super().update(instance, validated_data)
 
@@ -0,0 +1,32 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from horarios.models import Clase
+from one_backend.readcache import cambio_masivo
+from .capacity import invalidar_clases, invalidar_semana, invalidar_usuario
+from .models import Task
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def invalidar_capacidad_tarea(sender, instance, **kwargs):
+    invalidar_semana(instance.owner_id, instance.date)
+    # Si la tarea cambió de fecha, la semana anterior también cambia
+    original = getattr(instance, '_fecha_original', None)
+    if original and original != instance.date:
+        invalidar_semana(instance.owner_id, original)
+    instance._fecha_original = instance.date
+
+
+@receiver(post_save, sender=Clase)
+@receiver(post_delete, sender=Clase)
+def invalidar_capacidad_clase(sender, instance, **kwargs):
+    invalidar_clases(instance.owner_id)
+
+
+@receiver(cambio_masivo, sender=Task)
+@receiver(cambio_masivo, sender=Clase)
+def invalidar_capacidad_masiva(sender, duenos, **kwargs):
+    # update(), bulk_create() y borrar_en_bloque no mandan post_save
+    for user_id in duenos:
+        invalidar_usuario(user_id)
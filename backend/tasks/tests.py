@@ -1,3 +1,334 @@
-from django.test import TestCase
+import datetime
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from accounts.models import StreakDay, User
+from horarios.models import Clase
+from one_backend import versiones
+from one_backend.testing import PerfTestCase
+from spaces.models import Space
+from tasks.models import Task
+
+
+class TaskPerfTests(PerfTestCase):
+    def test_list(self):
+        response = self.medir('task-list', 'get', reverse('task-list'), max_consultas=4)
+        self.assertEqual(len(response.data), 60)
+
+    def test_retrieve(self):
+        self.medir('task-detail', 'get', reverse('task-detail', args=['perf-task-1']), max_consultas=3)
+
+    def test_create(self):
+        data = {'id': 1735689600000, 'titulo': 'Nueva', 'fecha': '2025-03-02', 'espacio': 'Escuela'}
+        self.medir('task-create', 'post', reverse('task-list'), max_consultas=4, data=data, esperado=201)
+
+    def test_update(self):
+        data = {'completada': True, 'espacio': 'Trabajo'}
+        self.medir('task-update', 'patch', reverse('task-detail', args=['perf-task-1']), max_consultas=9, data=data)
+
+    def test_delete(self):
+        self.medir('task-delete', 'delete', reverse('task-detail', args=['perf-task-1']), max_consultas=4, esperado=204)
+
+    def test_list_week_filter(self):
+        url = reverse('task-list') + '?from=2025-02-24&to=2025-03-02&status=todo&espacio=Escuela'
+        response = self.medir('task-list-week', 'get', url, max_consultas=4)
+        self.assertTrue(response.data)
+        for tarea in response.data:
+            self.assertTrue('2025-02-24' <= tarea['fecha'] <= '2025-03-02')
+            self.assertEqual(tarea['status'], 'todo')
+            self.assertEqual(tarea['espacio'], 'Escuela')
+
+    def test_list_paginated(self):
+        response = self.medir('task-list-page', 'get', reverse('task-list') + '?page_size=25', max_consultas=4)
+        self.assertEqual(len(response.data['results']), 25)
+
+        vistos = [tarea['id'] for tarea in response.data['results']]
+        siguiente = response.data['next']
+        while siguiente:
+            pagina = self.client.get(siguiente).data
+            vistos += [tarea['id'] for tarea in pagina['results']]
+            siguiente = pagina['next']
+        self.assertEqual(sorted(vistos), sorted(f'perf-task-{i}' for i in range(60)))
+
+
+    def test_put_create(self):
+        url = reverse('task-detail', args=['1735689600000'])
+        data = {'titulo': 'Nueva', 'fecha': '2025-03-02', 'espacio': 'Escuela', 'completada': True}
+        self.medir('task-upsert-create', 'put', url, max_consultas=10, data=data, esperado=201)
+
+    def test_put_update(self):
+        url = reverse('task-detail', args=['perf-task-1'])
+        data = {'titulo': 'Nueva', 'fecha': '2025-03-02', 'espacio': 'Escuela', 'completada': True}
+        self.medir('task-upsert-update', 'put', url, max_consultas=13, data=data)
+
+    def test_patch_with_version(self):
+        url = reverse('task-detail', args=['perf-task-1'])
+        self.medir('task-version-update', 'patch', url, max_consultas=4, data={'titulo': 'Otra', 'version': 1})
+
+
+class TaskTestCase(APITestCase):
+    def setUp(self):
+        # Los ids de usuario se reciclan entre pruebas y la caché de espacios no
+        cache.clear()
+        self.user = User.objects.create_user(username='ana', email='ana@one.mx')
+        self.client.force_authenticate(self.user)
+        self.espacio = Space.objects.create(id='ana-personal', owner=self.user, name='Personal')
+        self.tarea = self.crear_tarea('t1', 'Leer', '2025-02-28')
+
+    def crear_tarea(self, pk, titulo, fecha, espacio=None, **campos):
+        return Task.objects.create(
+            id=pk, owner=espacio.owner if espacio else self.user, space=espacio or self.espacio,
+            title=titulo, date=fecha, **campos,
+        )
+
+    def crear_de_otro(self):
+        otro = User.objects.create_user(username='beto', email='beto@one.mx')
+        espacio = Space.objects.create(id='beto-personal', owner=otro, name='Personal')
+        return self.crear_tarea('ajena', 'Ajena', '2025-02-28', espacio)
+
+
+class TaskTests(TaskTestCase):
+    def test_list_week_filter_uses_date_index(self):
+        # Como en TaskViewSet: el índice es parcial, solo las tareas no borradas
+        plan = Task.objects.filter(
+            owner=self.user, deleted=False, date__gte='2025-02-24', date__lte='2025-03-02'
+        ).explain()
+        self.assertIn('task_owner_date_idx', plan)
+
+    def test_list_invalid_date_filter(self):
+        response = self.client.get(reverse('task-list') + '?from=ayer')
+        self.assertEqual(response.status_code, 400)
+
+    def test_other_user_not_visible(self):
+        self.crear_de_otro()
+        response = self.client.get(reverse('task-detail', args=['ajena']))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual([tarea['id'] for tarea in self.client.get(reverse('task-list')).data], ['t1'])
+
+
+class TaskUpsertTests(TaskTestCase):
+    data = {'titulo': 'Nueva', 'fecha': '2025-03-02', 'espacio': 'Escuela', 'completada': True}
+
+    def test_put_creates_with_one_insert(self):
+        # Las otras consultas son la sesión, el espacio y las de la racha (tarea completada)
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.put(reverse('task-detail', args=['1735689600000']), self.data, format='json')
+        self.assertEqual(response.status_code, 201)
+        tareas = [q['sql'] for q in consultas.captured_queries if '"tasks_task"' in q['sql']]
+        self.assertEqual(len(tareas), 1)
+        self.assertIn('ON CONFLICT ("id") DO NOTHING', tareas[0])
+        tarea = Task.objects.get(pk='1735689600000')
+        self.assertEqual((tarea.title, tarea.space.name, tarea.status), ('Nueva', 'Escuela', 'done'))
+
+        # La racha cuenta la tarea nueva igual que con un POST
+        dia = StreakDay.objects.get(owner=self.user, clave='tasks', fecha=datetime.date(2025, 3, 2))
+        self.assertEqual(dia.total, 1)
+
+    def test_put_updates_existing(self):
+        response = self.client.put(reverse('task-detail', args=['t1']), self.data, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['titulo'], 'Nueva')
+        self.assertEqual(Task.objects.filter(owner=self.user).count(), 1)
+
+    def test_put_partial_payload_on_existing(self):
+        response = self.client.put(reverse('task-detail', args=['t1']), {'notas': 'solo esto'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        tarea = Task.objects.get(pk='t1')
+        self.assertEqual((tarea.title, tarea.notes), ('Leer', 'solo esto'))
+
+    def test_put_other_users_id(self):
+        self.crear_de_otro()
+        response = self.client.put(reverse('task-detail', args=['ajena']), self.data, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Task.objects.get(pk='ajena').title, 'Ajena')
+
+    def test_put_invalid_new(self):
+        response = self.client.put(reverse('task-detail', args=['nueva']), {'fecha': 'ayer'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Task.objects.filter(pk='nueva').exists())
+
+    def test_patch_still_requires_existing(self):
+        response = self.client.patch(reverse('task-detail', args=['nueva']), self.data, format='json')
+        self.assertEqual(response.status_code, 404)
+
+
+class TaskVersionTests(TaskTestCase):
+    url = reverse('task-detail', args=['t1'])
+
+    def test_patch_updates_only_changed_columns(self):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.patch(self.url, {'titulo': 'Otra', 'version': 1}, format='json')
+        self.assertEqual(response.data['version'], 2)
+
+        [update] = [q['sql'] for q in consultas.captured_queries if q['sql'].startswith('UPDATE "tasks_task"')]
+        self.assertIn('"version" = ("tasks_task"."version" + 1)', update)
+        self.assertIn('"tasks_task"."version" = 1', update)
+        self.assertNotIn('"notes"', update)
+        self.assertEqual(Task.objects.get(pk='t1').title, 'Otra')
+
+    def test_stale_version_returns_current_row(self):
+        self.client.patch(self.url, {'titulo': 'Primero', 'version': 1}, format='json')
+
+        response = self.client.patch(self.url, {'titulo': 'Segundo', 'version': 1}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['actual']['titulo'], 'Primero')
+        self.assertEqual(response.data['actual']['version'], 2)
+        self.assertEqual(Task.objects.get(pk='t1').title, 'Primero')
+
+    def test_write_between_read_and_update(self):
+        tarea = Task.objects.get(pk='t1')
+        # Otro dispositivo escribe después de nuestra lectura
+        Task.objects.filter(pk=tarea.pk).update(title='Ajeno', version=2)
+
+        with self.assertRaises(versiones.Conflicto) as error:
+            versiones.actualizar(tarea, {'title': 'Mío', 'status': 'done'})
+        self.assertEqual(error.exception.actual.title, 'Ajeno')
+        # Nada se escribió, tampoco en la racha
+        self.assertFalse(StreakDay.objects.filter(owner=self.user, clave='tasks', fecha=tarea.date).exists())
+
+    def test_unchanged_patch_writes_nothing(self):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.patch(self.url, {'titulo': 'Leer'}, format='json')
+        self.assertEqual(response.data['version'], 1)
+        self.assertFalse([q for q in consultas.captured_queries if q['sql'].startswith('UPDATE')])
+
+    def test_put_create_ignores_client_version(self):
+        url = reverse('task-detail', args=['nueva'])
+        response = self.client.put(url, {'titulo': 'Nueva', 'fecha': '2025-03-02', 'version': 7}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Task.objects.get(pk='nueva').version, 1)
+
+
+class TaskBorradoTests(TaskTestCase):
+    url = reverse('task-detail', args=['t1'])
+
+    def test_delete_marks_row(self):
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.delete(self.url)
+        self.assertFalse([q for q in consultas.captured_queries if q['sql'].startswith('DELETE')])
+
+        tarea = Task.objects.get(pk='t1')
+        self.assertEqual((tarea.deleted, tarea.version), (True, 2))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.assertEqual(self.client.get(reverse('task-list')).data, [])
+
+    def test_delete_done_task_updates_streak(self):
+        self.crear_tarea('t2', 'Correr', '2025-02-28', status='done')
+        self.client.patch(self.url, {'status': 'done'}, format='json')
+        dias = StreakDay.objects.filter(owner=self.user, clave='tasks', fecha=self.tarea.date)
+        self.assertEqual(dias.get().total, 2)
+
+        self.client.delete(self.url)
+        self.assertEqual(dias.get().total, 1)
+        self.client.delete(reverse('task-detail', args=['t2']))
+        self.assertFalse(dias.exists())
+
+    def test_put_on_deleted_id(self):
+        self.client.delete(self.url)
+        response = self.client.put(self.url, {'titulo': 'Viejo', 'fecha': '2025-03-02'}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertIsNone(response.data['actual'])
+        self.assertTrue(Task.objects.get(pk='t1').deleted)
+
+    def test_live_queries_use_partial_index(self):
+        plan = Task.objects.filter(owner=self.user, deleted=False).order_by('updated_at').explain()
+        self.assertIn('task_owner_vivos_idx', plan)
+
+
+class CapacityPerfTests(PerfTestCase):
+    url = reverse('capacity') + '?week=2025-W09'
+
+    def horas_esperadas(self, fecha):
+        # Mismo cálculo que hacía capacidad.js, recorriendo todas las tareas
+        horas = 0.0
+        for tarea in Task.objects.filter(owner=self.user, date=fecha, deleted=False).exclude(status='done'):
+            titulo = tarea.title.lower()
+            if any(palabra in titulo for palabra in ('proyecto', 'examen', 'tesis', 'entrega')):
+                horas += 3.0
+            elif any(palabra in titulo for palabra in ('leer', 'revisar', 'mail')):
+                horas += 0.5
+            elif any(palabra in titulo for palabra in ('clase', 'reunion', 'junta')):
+                horas += 1.5
+            else:
+                horas += tarea.duration_min / 60
+        return horas
+
+    def test_week(self):
+        self.client.post(reverse('task-list'), {'titulo': 'Examen final', 'fecha': '2025-02-24'}, format='json')
+        self.client.post(reverse('task-list'), {'titulo': 'Revisar mail', 'fecha': '2025-02-24'}, format='json')
+
+        response = self.medir('capacity', 'get', self.url, max_consultas=4)
+        self.assertEqual(response.data['inicio'], '2025-02-24')
+        dias = response.data['dias']
+        self.assertEqual(len(dias), 7)
+        for dia in dias:
+            self.assertAlmostEqual(dia['horasTareas'], self.horas_esperadas(dia['fecha']))
+        # 10 clases de 1.5 h repartidas de martes (1) a sábado (5)
+        self.assertEqual([dia['horasClases'] for dia in dias], [0, 3.0, 3.0, 3.0, 3.0, 3.0, 0])
+
+    def test_cached_until_week_changes(self):
+        antes = self.client.get(self.url).data['dias'][4]
+        self.medir('capacity-cached', 'get', self.url, max_consultas=2)
+
+        self.client.patch(reverse('task-detail', args=['perf-task-1']), {'completada': True}, format='json')
+        despues = self.client.get(self.url).data['dias'][4]
+        self.assertEqual(despues['fecha'], '2025-02-28')
+        self.assertEqual(despues['horasTareas'], antes['horasTareas'] - 1)
+        self.assertAlmostEqual(despues['horasTareas'], self.horas_esperadas('2025-02-28'))
+
+
+class CapacityTests(TaskTestCase):
+    url = reverse('capacity') + '?week=2025-W09'
+
+    def setUp(self):
+        super().setUp()
+        # Viernes 28: Leer (0.5 h) + Examen (3 h) + Comprar pan (su duración, 1 h)
+        self.crear_tarea('t2', 'Examen', '2025-02-28')
+        self.crear_tarea('t3', 'Comprar pan', '2025-02-28')
+        Clase.objects.create(
+            id='c1', owner=self.user, space=self.espacio, materia='Álgebra', dia_semana=2,
+            hora_inicio=datetime.time(9, 0), hora_fin=datetime.time(10, 30),
+        )
+
+    def dias(self, url=None):
+        return self.client.get(url or self.url).data['dias']
+
+    def test_moving_task_invalidates_both_weeks(self):
+        otra_semana = reverse('capacity') + '?week=2025-01-06'
+        self.assertEqual(self.dias()[4]['horasTareas'], 4.5)
+        self.assertEqual(self.dias(otra_semana)[0]['horasTareas'], 0)
+
+        self.client.patch(reverse('task-detail', args=['t3']), {'fecha': '2025-01-06'}, format='json')
+        self.assertEqual(self.dias()[4]['horasTareas'], 3.5)
+        self.assertEqual(self.dias(otra_semana)[0]['horasTareas'], 1.0)
+
+    def test_bulk_changes_invalidate(self):
+        self.assertEqual(self.dias()[4]['horasTareas'], 4.5)
+        Task.objects.filter(pk='t2').update(status='done')
+        self.assertEqual(self.dias()[4]['horasTareas'], 1.5)
+
+        # Borrar un espacio marca sus tareas y clases con borrar_en_bloque
+        self.client.delete(reverse('space-detail', args=['ana-personal']))
+        dias = self.dias()
+        self.assertEqual([dia['horasTareas'] for dia in dias], [0] * 7)
+        self.assertEqual([dia['horasClases'] for dia in dias], [0] * 7)
+
+    def test_class_change_invalidates(self):
+        self.assertEqual(self.dias()[2]['horasClases'], 1.5)
+        self.client.patch(reverse('clase-detail', args=['c1']), {'diaSemana': 3}, format='json')
+        self.assertEqual([dia['horasClases'] for dia in self.dias()], [0, 0, 0, 1.5, 0, 0, 0])
+        self.client.delete(reverse('clase-detail', args=['c1']))
+        self.assertEqual([dia['horasClases'] for dia in self.dias()], [0] * 7)
+
+    def test_user_weights(self):
+        self.user.preferences = {'pesosCapacidad': {'examen': 2, 'pan': 0.25}}
+        self.user.save()
+        # Leer ya no tiene peso: cuenta su duración
+        self.assertEqual(self.dias()[4]['horasTareas'], 1 + 2 + 0.25)
+
+    def test_invalid_week(self):
+        self.assertEqual(self.client.get(reverse('capacity') + '?week=semana').status_code, 400)
@@ -1,8 +1,19 @@
-from rest_framework import viewsets, permissions
+import datetime
+
+from django.utils import timezone
+from rest_framework import viewsets, permissions, views, status
+from rest_framework.response import Response
+from one_backend.borrado import BorradoLogicoMixin
+from one_backend.conditional import ConditionalGetMixin
+from one_backend.readcache import CachedReadMixin
+from one_backend.upsert import UpsertMixin
+from one_backend.versiones import VersionMixin
+from one_backend.filters import parametro_fecha
+from .capacity import calcular_semana
 from .models import Task
 from .serializers import TaskSerializer
 
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(BorradoLogicoMixin, VersionMixin, UpsertMixin, CachedReadMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     # Usamos el serializador de Tareas para convertir los datos
     serializer_class = TaskSerializer
     # Solo permitimos que usuarios logueados vean esto
@@ -10,5 +21,51 @@ class TaskViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         # Filtramos las tareas para que solo salgan las del usuario actual
-        return Task.objects.filter(owner=self.request.user)
+        queryset = Task.objects.filter(owner=self.request.user, deleted=False).select_related('space', 'owner')
+        if self.action != 'list':
+            return queryset
+
+        # Filtros opcionales: ?from=2025-03-03&to=2025-03-09&status=todo&espacio=Escuela&proyecto=<id>
+        # El rango de fechas usa el índice (owner, date)
+        desde = parametro_fecha(self.request, 'from')
+        hasta = parametro_fecha(self.request, 'to')
+        if desde:
+            queryset = queryset.filter(date__gte=desde)
+        if hasta:
+            queryset = queryset.filter(date__lte=hasta)
+
+        params = self.request.query_params
+        if params.get('status'):
+            queryset = queryset.filter(status=params['status'])
+        if params.get('espacio'):
+            queryset = queryset.filter(space__name=params['espacio'])
+        if params.get('proyecto'):
+            queryset = queryset.filter(project_id=params['proyecto'])
+        return queryset
+
+
+class CapacityView(views.APIView):
+    """
+    Carga estimada por día de una semana: /api/capacity/?week=2025-W10
+    También acepta cualquier fecha de la semana (?week=2025-03-05).
+    Sin parámetro usa la semana actual.
+    """
+    permission_classes = [permissions.IsAuthenticated]
 
+    def get(self, request):
+        semana = request.query_params.get('week')
+        if not semana:
+            fecha = timezone.localdate()
+        else:
+            try:
+                if '-W' in semana:
+                    anio, numero = semana.split('-W')
+                    fecha = datetime.date.fromisocalendar(int(anio), int(numero), 1)
+                else:
+                    fecha = datetime.date.fromisoformat(semana)
+            except ValueError:
+                return Response(
+                    {"error": "Semana inválida, usa 2025-W10 o una fecha YYYY-MM-DD"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        return Response(calcular_semana(request.user, fecha))
@@ -3,17 +3,50 @@
  * Lógica de cálculo de carga laboral (Semáforo)
  */
 
-document.addEventListener('DOMContentLoaded', () => {
+// Horas por día calculadas en el servidor (/api/capacity/); null si no hay conexión
+let capacidadServidor = null;
+
+document.addEventListener('DOMContentLoaded', async () => {
+    await cargarCapacidadServidor();
     calcularCapacidad();
     Icons.init();
 });
 
+async function cargarCapacidadServidor() {
+    if (!navigator.onLine) return;
+
+    const API_HOST = window.location.hostname || 'localhost';
+    const API_PROTOCOL = window.location.protocol === 'file:' ? 'http:' : window.location.protocol;
+    const baseUrl = `${API_PROTOCOL}//${API_HOST === '' ? 'localhost' : API_HOST}:8000/api`;
+
+    try {
+        const response = await fetch(`${baseUrl}/capacity/?week=${Store.fechaIsoLocal(new Date())}`, {
+            credentials: 'include'
+        });
+        if (!response.ok) return;
+
+        const data = await response.json();
+        capacidadServidor = {};
+        data.dias.forEach(dia => {
+            capacidadServidor[dia.fecha] = dia.horasEstimadas;
+        });
+    } catch (error) {
+        console.warn('⚠️ Capacidad calculada localmente:', error);
+    }
+}
+
 function calcularCapacidad() {
     const horasProductivas = parseFloat(document.getElementById('input-horas-productivas').value) || 6;
     const tareas = Store.state.tareas;
     const hoyIso = Store.fechaIsoLocal(new Date());
 
-    // 1. Calcular carga de HOY
+    // 1. Calcular carga de HOY (del servidor si está disponible)
+    if (capacidadServidor && hoyIso in capacidadServidor) {
+        actualizarUI(capacidadServidor[hoyIso], horasProductivas);
+        renderizarPrediccion(horasProductivas);
+        return;
+    }
+
     const tareasHoy = tareas.filter(t => t.fecha === hoyIso && !t.completada);
 
     let horasEstimadas = 0;
@@ -85,15 +118,19 @@ function renderizarPrediccion(limite) {
         const diaNombre = d.toLocaleDateString('es-ES', { weekday: 'short' });
 
         // Calcular carga del día basado en tareas (usando peso simplificado 1h para predicción)
-        const tareasDia = Store.state.tareas.filter(t => t.fecha === iso && !t.completada);
         let cargaDia = 0;
-        tareasDia.forEach(t => {
-            let peso = 1.0;
-            const titulo = (t.titulo || "").toLowerCase();
-            if (titulo.includes('proyecto') || titulo.includes('examen')) peso = 3.0;
-            else if (titulo.includes('clase')) peso = 1.5;
-            cargaDia += peso;
-        });
+        if (capacidadServidor && iso in capacidadServidor) {
+            cargaDia = capacidadServidor[iso];
+        } else {
+            const tareasDia = Store.state.tareas.filter(t => t.fecha === iso && !t.completada);
+            tareasDia.forEach(t => {
+                let peso = 1.0;
+                const titulo = (t.titulo || "").toLowerCase();
+                if (titulo.includes('proyecto') || titulo.includes('examen')) peso = 3.0;
+                else if (titulo.includes('clase')) peso = 1.5;
+                cargaDia += peso;
+            });
+        }
 
         const porcentaje = Math.min((cargaDia / limite) * 100, 100);
         let claseColor = '#429155'; // Verde
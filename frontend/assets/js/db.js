@@ -288,7 +288,7 @@ const DBManager = {
         });
     },
 
-    delete: async (storeName, id) => {
+    delete: async (storeName, id, fromBackend = false) => {
         if (!db) await DBManager.init();
 
         return new Promise((resolve, reject) => {
@@ -297,12 +297,14 @@ const DBManager = {
             const request = store.delete(id);
 
             request.onsuccess = () => {
-                // Registrar borrado en la cola de salida
-                DBManager.addToOutbox({
-                    type: storeName,
-                    action: 'delete',
-                    data: { id }
-                });
+                // Registrar borrado en la cola de salida (si lo borró el servidor ya está sincronizado)
+                if (!fromBackend) {
+                    DBManager.addToOutbox({
+                        type: storeName,
+                        action: 'delete',
+                        data: { id }
+                    });
+                }
                 resolve();
             };
             request.onerror = () => reject(request.error);
@@ -369,25 +371,155 @@ const DBManager = {
         });
 
         let failedCount = 0;
+        let conflictCount = 0;
 
-        for (const operation of pending) {
-            try {
-                await DBManager.executeSync(operation);
+        const marcarSincronizado = (operation) => {
+            const transaction = db.transaction(['outbox'], 'readwrite');
+            const store = transaction.objectStore('outbox');
+            operation.synced = true;
+            store.put(operation);
+        };
 
-                // Marcar como sincronizado
-                const transaction = db.transaction(['outbox'], 'readwrite');
-                const store = transaction.objectStore('outbox');
-                operation.synced = true;
-                store.put(operation);
+        // Mandamos el outbox en bloques a /sync/batch/ (una petición por bloque)
+        for (let i = 0; i < pending.length; i += DBManager.BATCH_SIZE) {
+            const chunk = pending.slice(i, i + DBManager.BATCH_SIZE);
+            let results = null;
 
+            try {
+                results = await DBManager.executeBatch(chunk);
             } catch (error) {
-                failedCount += 1;
-                console.error('❌ Error sincronizando:', operation, error);
+                console.warn('⚠️ Sync por lotes no disponible, usamos una petición por operación:', error);
+            }
+
+            if (results) {
+                for (const [index, operation] of chunk.entries()) {
+                    const result = results[index];
+                    const ok = result && (result.status < 300
+                        || (operation.action === 'delete' && result.status === 404));
+                    if (ok) {
+                        if (result.data) await DBManager.recordarVersion(operation, result.data.version, pending);
+                        marcarSincronizado(operation);
+                    } else if (result && result.status === 409 && 'actual' in result) {
+                        conflictCount += 1;
+                        await DBManager.resolverConflicto(operation, result.actual);
+                        marcarSincronizado(operation);
+                    } else {
+                        failedCount += 1;
+                        console.error('❌ Error sincronizando:', operation, result);
+                    }
+                }
+                continue;
+            }
+
+            for (const operation of chunk) {
+                try {
+                    const body = await DBManager.executeSync(operation);
+                    if (body && body.conflicto) {
+                        conflictCount += 1;
+                        await DBManager.resolverConflicto(operation, body.actual);
+                    } else if (body) {
+                        await DBManager.recordarVersion(operation, body.version, pending);
+                    }
+                    marcarSincronizado(operation);
+                } catch (error) {
+                    failedCount += 1;
+                    console.error('❌ Error sincronizando:', operation, error);
+                }
             }
         }
 
+        if (typeof Store !== 'undefined' && Store.guardarEstado) Store.guardarEstado();
         console.log('✅ Sincronización completada');
-        return { ok: failedCount === 0, failedCount, skippedCount };
+        return { ok: failedCount === 0, failedCount, skippedCount, conflictCount };
+    },
+
+    // Cada respuesta trae la versión nueva del registro. La guardamos en la
+    // copia local y en las operaciones del outbox que partían de la misma
+    // versión: si no, el siguiente cambio del registro le chocaría al servidor
+    // (responde 409 cuando la versión que mandamos ya no es la suya)
+    recordarVersion: async (operation, version, pending = []) => {
+        const data = operation.data || {};
+        if (version == null || data.id == null || operation.action === 'delete') return;
+        const mismoRegistro = (item) => item && String(item.id) === String(data.id);
+
+        const outbox = db.transaction(['outbox'], 'readwrite').objectStore('outbox');
+        pending.forEach(otra => {
+            if (otra !== operation && otra.type === operation.type && !otra.synced
+                && mismoRegistro(otra.data) && otra.data.version === data.version) {
+                otra.data.version = version;
+                outbox.put(otra);
+            }
+        });
+
+        const enMemoria = (typeof Store !== 'undefined' && Store.state && Store.state[operation.type]) || [];
+        enMemoria.forEach(item => { if (mismoRegistro(item)) item.version = version; });
+
+        return new Promise((resolve) => {
+            const store = db.transaction([operation.type], 'readwrite').objectStore(operation.type);
+            const request = store.get(data.id);
+            request.onsuccess = () => {
+                if (request.result) store.put({ ...request.result, version });
+                resolve();
+            };
+            request.onerror = () => resolve();
+        });
+    },
+
+    // Otro dispositivo cambió el registro antes que nosotros: nos quedamos con
+    // la fila del servidor (llega en la respuesta 409) en lugar de pisarla.
+    // Sin fila (actual null) es que allá lo borraron: lo borramos aquí también
+    resolverConflicto: async (operation, actual) => {
+        console.warn('⚠️ El registro cambió en otro dispositivo, usamos la versión del servidor:', operation);
+        const tipo = Object.keys(DBManager.LOCAL_TYPES).find(clave => DBManager.LOCAL_TYPES[clave] === operation.type);
+        if (!tipo) return;
+        if (!actual) {
+            await DBManager.delete(operation.type, operation.data.id, true);
+            if (typeof Store !== 'undefined' && Store.state && Store.state[operation.type]) {
+                Store.state[operation.type] = Store.state[operation.type]
+                    .filter(item => String(item.id) !== String(operation.data.id));
+            }
+            return;
+        }
+        const servidor = DBManager.normalizeFromBackend(tipo, actual);
+        await DBManager.save(operation.type, servidor, true);
+
+        const enMemoria = (typeof Store !== 'undefined' && Store.state && Store.state[operation.type]) || [];
+        enMemoria.forEach(item => {
+            if (String(item.id) === String(servidor.id)) Object.assign(item, servidor);
+        });
+    },
+
+    BATCH_SIZE: 200,
+
+    executeBatch: async (operations) => {
+        const API_HOST = window.location.hostname || 'localhost';
+        const API_PROTOCOL = window.location.protocol === 'file:' ? 'http:' : window.location.protocol;
+        const baseUrl = `${API_PROTOCOL}//${API_HOST === '' ? 'localhost' : API_HOST}:8000/api`;
+
+        const payload = operations.map(operation => ({
+            type: operation.type,
+            action: operation.action,
+            data: operation.action !== 'delete'
+                ? DBManager.normalizePayload(operation.type, operation.data)
+                : { id: operation.data.id }
+        }));
+
+        const response = await fetch(`${baseUrl}/sync/batch/`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': DBManager.getCookie('csrftoken') || ''
+            },
+            credentials: 'include',
+            body: JSON.stringify({ operations: payload })
+        });
+
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}`);
+        }
+
+        const body = await response.json();
+        return body.results;
     },
 
     executeSync: async (operation) => {
@@ -428,7 +560,9 @@ const DBManager = {
             method = 'PATCH';
         } else if (operation.action === 'upsert') {
             if (operation.data && operation.data.id) {
-                method = 'PATCH';
+                // PUT crea o actualiza en una sola petición; los registros de
+                // hábito siguen con PATCH y, si no existen, POST
+                method = operation.type === 'habitLogs' ? 'PATCH' : 'PUT';
                 urlSuffix = `${operation.data.id}/`;
             } else {
                 method = 'POST';
@@ -459,6 +593,13 @@ const DBManager = {
             });
         }
 
+        if (response.status === 409 && method === 'PUT') {
+            // Con `actual` es un choque de versiones (null si allá lo borraron);
+            // sin esa llave, un id ajeno
+            const body = await response.json().catch(() => ({}));
+            if ('actual' in body) return { conflicto: true, actual: body.actual };
+        }
+
         if (!response.ok) {
             throw new Error(`HTTP ${response.status}`);
         }
@@ -478,28 +619,86 @@ const DBManager = {
         }
     },
 
-    // Cargar todo del backend (Restore Backup)
-    loadAllFromBackend: async () => {
-        if (!navigator.onLine) return;
+    // Tipos de la API -> stores de IndexedDB
+    LOCAL_TYPES: {
+        'tasks': 'tareas',
+        'projects': 'proyectos',
+        'habits': 'habitos',
+        'gastos': 'gastos',
+        'presupuestos': 'presupuestos',
+        'clases': 'clases'
+    },
 
-        console.log("⬇️ Descargando datos del servidor...");
+    // Lee /sync/snapshot/ línea por línea (NDJSON) conforme va llegando
+    loadSnapshot: async (baseUrl) => {
+        const response = await fetch(`${baseUrl}/sync/snapshot/`, { credentials: 'include' });
+        if (!response.ok || !response.body) return false;
+        if (!db) await DBManager.init();
+
+        Object.values(DBManager.LOCAL_TYPES).forEach(store => { Store.state[store] = []; });
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let pendiente = '';
+        let cursor = null;
+        // Una transacción de IndexedDB se cierra sola mientras esperamos la red:
+        // las filas se juntan aquí y se escriben todas al final
+        const filas = {};
+        Object.values(DBManager.LOCAL_TYPES).forEach(store => { filas[store] = []; });
+
+        const procesar = (linea) => {
+            if (!linea.trim()) return;
+            const { type, data, cursor: fin } = JSON.parse(linea);
+            if (type === 'cursor') {
+                cursor = fin;
+                return;
+            }
+            const localStore = DBManager.LOCAL_TYPES[type];
+            if (!localStore) return; // Los espacios no se guardan localmente
+            const normalizado = DBManager.normalizeFromBackend(type, data);
+            normalizado.syncStatus = 'synced';
+            filas[localStore].push(normalizado);
+        };
+
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            pendiente += decoder.decode(value, { stream: true });
+            const lineas = pendiente.split('\n');
+            pendiente = lineas.pop();
+            lineas.forEach(procesar);
+        }
+        procesar(pendiente + decoder.decode());
+
+        // Sin la línea final el snapshot llegó cortado: lo local se queda como estaba
+        if (!cursor) throw new Error('Snapshot incompleto');
+
+        // Vaciar y escribir en la misma transacción: lo borrado en el servidor
+        // no se queda en el navegador y un error no deja los stores a medias
+        const stores = Object.keys(filas);
+        const transaction = db.transaction(stores, 'readwrite');
+        stores.forEach(storeName => {
+            const store = transaction.objectStore(storeName);
+            store.clear();
+            filas[storeName].forEach(fila => store.put(fila));
+        });
+
+        await new Promise((resolve, reject) => {
+            transaction.oncomplete = () => resolve();
+            transaction.onerror = () => reject(transaction.error);
+            transaction.onabort = () => reject(transaction.error);
+        });
+        localStorage.setItem('one_sync_cursor', cursor);
+        return true;
+    },
+
+    loadByType: async (baseUrl) => {
         // Importante: Proyectos antes de Tareas (para que no falten referencias)
         const types = ['projects', 'tasks', 'habits', 'gastos', 'presupuestos', 'clases'];
-        const localTypes = {
-            'tasks': 'tareas',
-            'projects': 'proyectos',
-            'habits': 'habitos',
-            'gastos': 'gastos',
-            'presupuestos': 'presupuestos',
-            'clases': 'clases'
-        };
+        const localTypes = DBManager.LOCAL_TYPES;
 
         for (const type of types) {
             try {
-                const API_HOST = window.location.hostname || 'localhost';
-                const API_PROTOCOL = window.location.protocol === 'file:' ? 'http:' : window.location.protocol;
-                const baseUrl = `${API_PROTOCOL}//${API_HOST === '' ? 'localhost' : API_HOST}:8000/api`;
-
                 const response = await fetch(`${baseUrl}/${type}/`, {
                     credentials: 'include' // Auth cookie
                 });
@@ -535,6 +734,24 @@ const DBManager = {
                 console.error(`Error cargando ${type}:`, err);
             }
         }
+    },
+
+    // Cargar todo del backend (Restore Backup)
+    loadAllFromBackend: async () => {
+        if (!navigator.onLine) return;
+
+        console.log("⬇️ Descargando datos del servidor...");
+        const API_HOST = window.location.hostname || 'localhost';
+        const API_PROTOCOL = window.location.protocol === 'file:' ? 'http:' : window.location.protocol;
+        const baseUrl = `${API_PROTOCOL}//${API_HOST === '' ? 'localhost' : API_HOST}:8000/api`;
+
+        // Primero el snapshot en streaming (una sola petición); si el servidor
+        // no lo tiene, volvemos a pedir tipo por tipo
+        const cargado = await DBManager.loadSnapshot(baseUrl).catch(err => {
+            console.warn('Snapshot no disponible, cargando por tipo:', err);
+            return false;
+        });
+        if (!cargado) await DBManager.loadByType(baseUrl);
 
         // Recargar en memoria desde IDB (o directo arriba)
         Store.state.tareas = await DBManager.getAll('tareas');
@@ -556,6 +773,81 @@ const DBManager = {
         Store.guardarEstado();
         console.log("✅ Datos restaurados del servidor");
     },
+    // Trae solo lo que cambió desde el último cursor (/sync/changes/)
+    pullChanges: async (baseUrl) => {
+        let cursor = localStorage.getItem('one_sync_cursor');
+        if (!cursor) return false;
+
+        let hasMore = true;
+        while (hasMore) {
+            const response = await fetch(`${baseUrl}/sync/changes/?since=${encodeURIComponent(cursor)}`, {
+                credentials: 'include'
+            });
+            if (response.status === 410) {
+                // El cursor es más viejo que lo que guarda el servidor de los
+                // borrados: volvemos a bajar todo (el snapshot deja un cursor nuevo)
+                localStorage.removeItem('one_sync_cursor');
+                await DBManager.loadAllFromBackend();
+                return true;
+            }
+            if (!response.ok) return false;
+            const pagina = await response.json();
+
+            for (const cambio of pagina.changes) {
+                const localStore = DBManager.LOCAL_TYPES[cambio.type];
+                if (!localStore) continue;
+                if (cambio.deleted) {
+                    await DBManager.delete(localStore, cambio.id, true);
+                } else {
+                    await DBManager.save(localStore, DBManager.normalizeFromBackend(cambio.type, cambio.data), true);
+                }
+            }
+            cursor = pagina.cursor || cursor;
+            localStorage.setItem('one_sync_cursor', cursor);
+            hasMore = pagina.has_more;
+        }
+
+        for (const localStore of Object.values(DBManager.LOCAL_TYPES)) {
+            Store.state[localStore] = Store.deduplicarPorId(await DBManager.getAll(localStore));
+        }
+        Store.guardarEstado();
+        window.dispatchEvent(new CustomEvent('one:cambios-servidor'));
+        return true;
+    },
+
+    // Avisos del servidor (SSE): cuando otro dispositivo cambia algo pedimos
+    // solo esos cambios en lugar de volver a descargar todo. Si el servidor
+    // no tiene /sync/events/ (WSGI) simplemente no se escucha.
+    listenForChanges: () => {
+        if (typeof EventSource === 'undefined' || DBManager.eventos) return;
+        const cursor = localStorage.getItem('one_sync_cursor');
+        if (!cursor) return;
+
+        const API_HOST = window.location.hostname || 'localhost';
+        const API_PROTOCOL = window.location.protocol === 'file:' ? 'http:' : window.location.protocol;
+        const baseUrl = `${API_PROTOCOL}//${API_HOST === '' ? 'localhost' : API_HOST}:8000/api`;
+
+        const eventos = new EventSource(`${baseUrl}/sync/events/?since=${encodeURIComponent(cursor)}`, {
+            withCredentials: true
+        });
+        DBManager.eventos = eventos;
+
+        // Varios avisos seguidos (un lote desde otro dispositivo) se juntan en una sola consulta
+        let pendiente = null;
+        const pedirCambios = () => {
+            clearTimeout(pendiente);
+            pendiente = setTimeout(() => {
+                DBManager.pullChanges(baseUrl).catch(err => console.warn('No se pudieron traer los cambios:', err));
+            }, 300);
+        };
+        eventos.onmessage = pedirCambios;
+        eventos.addEventListener('resync', pedirCambios);
+        eventos.onerror = () => {
+            // EventSource reintenta solo (con Last-Event-ID); si el servidor lo rechazó, lo dejamos
+            if (eventos.readyState === EventSource.CLOSED) DBManager.eventos = null;
+        };
+    },
+
     // Limpiar toda la base de datos (Cerrar Sesión)
     clearAll: async () => {
         if (!db) await DBManager.init();
@@ -585,6 +877,13 @@ window.addEventListener('online', () => {
     DBManager.syncWithBackend();
 });
 
+// Escuchar los avisos del servidor mientras haya sesión
+window.addEventListener('load', () => {
+    if (typeof Store !== 'undefined' && Store.state && Store.state.usuario && navigator.onLine) {
+        DBManager.listenForChanges();
+    }
+});
+
 window.addEventListener('offline', () => {
     console.log('📡 Modo offline. Guardando todo localmente.');
 });